@@ -1,15 +1,63 @@
-from typing import Optional, List, Tuple
-import random
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, List, Tuple, Union
+from collections import Counter
 import asyncio
-from openai.types.chat import ChatCompletion
+import copy
+import hashlib
+import time
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
 from .EndPoint import EndPoint
-from .message.Message import Message, get_assistant_message_from_response
+from .message.Message import (
+    Message,
+    get_assistant_message_from_dict,
+    get_assistant_message_from_response,
+)
 from .message.MessageList import MessageList
 from .message.SubstitutionDict import SubstitutionDict
-from .utils import get_logger
+from .ResponseView import ChatCompletionView
+from .traffic.AdaptiveConcurrency import (
+    AdaptiveConcurrencyLimiter,
+    error_kind,
+    is_overload_error,
+)
+from .traffic.Hedging import HedgingPolicy
+from .traffic.ModelRouter import ModelRouter
+from .traffic.Scheduler import DeadlineExceeded, RequestScheduler
+from .traffic.SingleFlight import SingleFlight, canonical_key
+from .tracing.Tracer import NOOP_SPAN, Tracer
+from .vector.SemanticCache import SemanticCache
+from .utils import (
+    IncrementalJsonParser,
+    OrderedListExtractor,
+    PromptCacheTracker,
+    get_logger,
+    json_dumps,
+    json_loads,
+)
+from .utils.StreamingJson import JsonPath
 
 logger = get_logger(__name__)
 
+# request options applied by the SDK instead of being sent in the body
+_SDK_OPTIONS = ("extra_headers", "extra_query", "extra_body")
+
+
+def _sum_usage(usages: List[Optional[dict]]) -> Optional[dict]:
+    """Add up the token counts of several usage objects, including the nested details."""
+    total = None
+    for usage in usages:
+        if usage is None:
+            continue
+        if total is None:
+            total = {}
+        for key, value in usage.items():
+            if isinstance(value, dict):
+                total[key] = _sum_usage([total.get(key), value])
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = (total.get(key) or 0) + value
+            else:
+                total.setdefault(key, value)
+    return total
+
 
 class ChatCompletionEndPoint(EndPoint):
     """
@@ -17,10 +65,26 @@ class ChatCompletionEndPoint(EndPoint):
 
     Attributes:
         _default_model (str): The default model to use for chat completions.
+        _hedging_policy (HedgingPolicy): The policy deciding when slow requests are hedged.
+        _single_flight (Optional[SingleFlight]): The group coalescing identical in-flight requests, if enabled.
+        _concurrency_limiter (Optional[AdaptiveConcurrencyLimiter]): The limiter bounding concurrent upstream requests, if any.
+        _scheduler (Optional[RequestScheduler]): The scheduler admitting requests by lane, tenant and deadline, if any.
+        _semantic_cache (Optional[SemanticCache]): The cache answering requests similar to earlier ones, if any.
+        _prompt_cache_tracker (Optional[PromptCacheTracker]): The tracker collecting cached prompt tokens per template, if any.
+        _tracer (Optional[Tracer]): The tracer timing the stages of every request, if any.
+        _max_n_per_request (Optional[int]): The largest `n` sent in one request; larger ones are split into concurrent sub-requests, if set.
+        _fallback_models (List[str]): The models tried, in order, when the requested model is overloaded or unhealthy.
+        _model_router (Optional[ModelRouter]): The router ordering a model and its fallbacks by health, if any.
 
     Methods:
         completions(messages, substitution_dict=None, model=None, **kwargs):
             Generate chat completions using the provided messages and optional substitutions.
+        stream(messages, substitution_dict=None, model=None, **kwargs):
+            Stream the chunks of a chat completion.
+        stream_structured(messages, substitution_dict=None, model=None, max_depth=2, **kwargs):
+            Stream the values of a JSON chat completion as soon as each one is closed.
+        stream_ordered_list(messages, substitution_dict=None, model=None, **kwargs):
+            Stream the items of an ordered list in a chat completion as soon as each one is complete.
     """
 
     def __init__(
@@ -28,6 +92,20 @@ class ChatCompletionEndPoint(EndPoint):
         default_model: str,
         organization: Optional[str] = None,
         project_id: Optional[str] = None,
+        hedging_policy: Optional[HedgingPolicy] = None,
+        single_flight: bool = False,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        prompt_cache_tracker: Optional[PromptCacheTracker] = None,
+        base_url: Optional[str] = None,
+        tracer: Optional[Tracer] = None,
+        max_n_per_request: Optional[int] = None,
+        fallback_models: Optional[List[str]] = None,
+        model_router: Optional[ModelRouter] = None,
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+        backoff: Optional[Callable[[int], float]] = None,
     ):
         """
         Initialize the ChatCompletionEndPoint instance with a default model, organization, and project ID.
@@ -36,9 +114,167 @@ class ChatCompletionEndPoint(EndPoint):
             default_model (str): The default model to use for chat completions.
             organization (Optional[str]): The organization identifier (optional).
             project_id (Optional[str]): The project ID (optional).
+            hedging_policy (Optional[HedgingPolicy]): The policy used for hedged requests (optional). Latencies are tracked for every request so the policy is warm when hedging is requested.
+            single_flight (bool): Whether concurrent deterministic requests with identical payloads, retries, fallback models, hedging, and scheduler lane and tenant share a single upstream call. Every caller waits for it until its own deadline, and a caller whose deadline has not passed when the shared call runs out of another caller's shorter deadline sends its own request. Defaults to False.
+            concurrency_limiter (Optional[AdaptiveConcurrencyLimiter]): A limiter adapting the number of concurrent upstream requests to 429s, 5xx responses and latency (optional).
+            scheduler (Optional[RequestScheduler]): A scheduler admitting every attempt by priority lane, tenant and deadline (optional). With a `concurrency_limiter` too, the scheduler admits no more attempts than the limiter's current limit, so that overload queues attempts in the scheduler's lanes rather than first come first served in the limiter.
+            semantic_cache (Optional[SemanticCache]): A cache returning earlier responses to requests whose prompt is similar enough (optional). Its lookups count against the deadline of the call, and a failed lookup is a miss.
+            prompt_cache_tracker (Optional[PromptCacheTracker]): A tracker recording the cached prompt tokens of every response, keyed by the `prompt_cache_key` of the request or else the hash of the static prefix of its messages (optional).
+            base_url (Optional[str]): The base URL of an OpenAI-compatible API (optional).
+            tracer (Optional[Tracer]): A tracer receiving a span for every stage of `completions`: substitution, encoding, each attempt, the network call, decoding, parsing and retry sleeps (optional).
+            max_n_per_request (Optional[int]): The largest number of choices asked for in one request (optional). A `completions` call with a larger `n` is split into concurrent sub-requests of at most this many choices, each retried on its own, and their choices and usage are merged.
+            fallback_models (Optional[List[str]]): The models to fall back to, in order, when the requested model returns 429 or 5xx errors, is over its latency SLO or has its circuit open (optional).
+            model_router (Optional[ModelRouter]): The router tracking the latency and errors of every model and ordering a model and its fallbacks (optional). Defaults to a `ModelRouter` with default settings when fallback models are used.
+            max_retries (Optional[int]): The number of retries of the OpenAI client itself, under the `retry` attempts of `completions` (optional). Defaults to the SDK's default.
+            timeout (Optional[float]): The HTTP timeout of the OpenAI client in seconds, for attempts without a deadline (optional). Defaults to the SDK's default.
+            backoff (Optional[Callable[[int], float]]): A function returning the seconds to wait after a failed attempt, given its number (optional). Defaults to exponential backoff with jitter.
+
+        Raises:
+            ValueError: If `max_n_per_request` is not positive.
         """
-        super().__init__(organization, project_id)
+        super().__init__(
+            organization,
+            project_id,
+            base_url,
+            max_retries=max_retries,
+            timeout=timeout,
+            backoff=backoff,
+        )
         self._default_model = default_model
+        self._hedging_policy = (
+            hedging_policy if hedging_policy is not None else HedgingPolicy()
+        )
+        self._single_flight = SingleFlight() if single_flight else None
+        self._concurrency_limiter = concurrency_limiter
+        self._scheduler = scheduler
+        if scheduler is not None and concurrency_limiter is not None:
+            scheduler.set_limit_source(lambda: concurrency_limiter.limit)
+        self._semantic_cache = semantic_cache
+        self._prompt_cache_tracker = prompt_cache_tracker
+        self._tracer = tracer
+        if max_n_per_request is not None and max_n_per_request < 1:
+            raise ValueError("max_n_per_request must be positive")
+        self._max_n_per_request = max_n_per_request
+        self._fallback_models = list(fallback_models or [])
+        if model_router is None and self._fallback_models:
+            model_router = ModelRouter()
+        self._model_router = model_router
+        self._retry_counts: Counter = Counter()
+
+    @property
+    def hedging_policy(self) -> HedgingPolicy:
+        return self._hedging_policy
+
+    @property
+    def concurrency_limiter(self) -> Optional[AdaptiveConcurrencyLimiter]:
+        return self._concurrency_limiter
+
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        return self._scheduler
+
+    @property
+    def semantic_cache(self) -> Optional[SemanticCache]:
+        return self._semantic_cache
+
+    @property
+    def retry_counts(self) -> Counter:
+        """The number of retried attempts by error, keyed by HTTP status code or exception name."""
+        return self._retry_counts
+
+    @property
+    def prompt_cache_tracker(self) -> Optional[PromptCacheTracker]:
+        return self._prompt_cache_tracker
+
+    @property
+    def tracer(self) -> Optional[Tracer]:
+        return self._tracer
+
+    @property
+    def max_n_per_request(self) -> Optional[int]:
+        return self._max_n_per_request
+
+    @property
+    def fallback_models(self) -> List[str]:
+        return self._fallback_models
+
+    @property
+    def model_router(self) -> Optional[ModelRouter]:
+        return self._model_router
+
+    def _span(self, name: str, **attributes):
+        """Open a tracing span, or the no-op span without a tracer."""
+        if self._tracer is None:
+            return NOOP_SPAN
+        return self._tracer.span(name, **attributes)
+
+    @staticmethod
+    async def _post_body(client, body: bytes, options: dict) -> bytes:
+        """
+        Post a pre-encoded request body and return the JSON of the response.
+
+        Uses the public `post` method of the client for requests the SDK does not
+        encode, with the `content` argument of openai 3.31 and later.
+        """
+        return await client.post(
+            "/chat/completions", cast_to=bytes, content=body, options=options
+        )
+
+    async def _create(
+        self,
+        request: dict,
+        raw: bool = False,
+        body: Optional[bytes] = None,
+        deadline: Optional[float] = None,
+    ) -> Union[ChatCompletion, ChatCompletionView]:
+        """Send one chat completion request and record its latency."""
+
+        async def _send():
+            # the async client aborts the HTTP request when the caller is cancelled
+            client = self.get_async_client()
+            options = {}
+            if deadline is not None:
+                options["timeout"] = max(0.0, deadline - time.monotonic())
+            if body is not None:
+                # `_encode_body` left these out for the SDK to apply
+                if request.get("extra_headers"):
+                    options["headers"] = request["extra_headers"]
+                if request.get("extra_query"):
+                    options["params"] = request["extra_query"]
+            start = time.perf_counter()
+            try:
+                with self._span("network"):
+                    if body is not None:
+                        response = await self._post_body(client, body, options)
+                    elif raw:
+                        response = (
+                            await client.chat.completions.with_raw_response.create(
+                                **request, **options
+                            )
+                        )
+                    else:
+                        res = await client.chat.completions.create(**request, **options)
+            except Exception as e:
+                if self._model_router is not None:
+                    self._model_router.record_failure(request["model"], e)
+                raise
+            if body is not None:
+                with self._span("decode"):
+                    res = ChatCompletionView(json_loads(response))
+                    if not raw:
+                        res = res.to_chat_completion()
+            elif raw:
+                with self._span("decode"):
+                    res = ChatCompletionView(json_loads(response.content))
+            latency = time.perf_counter() - start
+            self._hedging_policy.record_latency(request["model"], latency)
+            if self._model_router is not None:
+                self._model_router.record_success(request["model"], latency)
+            return res
+
+        if self._concurrency_limiter is not None:
+            return await self._concurrency_limiter.run(_send)
+        return await _send()
 
     async def completions(
         self,
@@ -47,8 +283,16 @@ class ChatCompletionEndPoint(EndPoint):
         model: Optional[str] = None,
         store: bool = False,
         retry: int = 5,
+        hedge: bool = False,
+        lane: Optional[str] = None,
+        tenant: Optional[str] = None,
+        deadline: Optional[float] = None,
+        timeout: Optional[float] = None,
+        raw: bool = False,
+        fallback_models: Optional[List[str]] = None,
+        coalesce_sampled: bool = False,
         **kwargs,
-    ) -> Tuple[List[Message], ChatCompletion]:
+    ) -> Tuple[List[Message], Union[ChatCompletion, ChatCompletionView]]:
         """
         Generate chat completions using the provided message_list and optional substitutions. The completions are generated without streaming.
 
@@ -58,49 +302,542 @@ class ChatCompletionEndPoint(EndPoint):
             model (Optional[str]): The model to use for generating completions. Defaults to the instance's default model if not provided.
             store (bool): Whether to store the chat completion in the database. Defaults to False.
             retry (int): The number of retry attempts for the API call. Defaults to 5.
-            **kwargs: Additional arguments to pass to the chat completions API.
+            hedge (bool): Whether to send a duplicate request when the first one is slower than the model's tracked latency quantile. The first successful response wins. Defaults to False.
+            lane (Optional[str]): The scheduler lane of the request, e.g. "interactive" or "batch". Only used with a scheduler.
+            tenant (Optional[str]): The tenant the request is fairly queued under. Only used with a scheduler.
+            deadline (Optional[float]): The `time.monotonic()` time by which the call must finish (optional). Every attempt, scheduler wait and backoff sleep is limited to the time left, which is also the HTTP timeout of each attempt; once it has passed, or a backoff sleep would pass it, a `DeadlineExceeded` error, a `TimeoutError`, is raised.
+            timeout (Optional[float]): The number of seconds the call may take, as a deadline relative to now (optional). The earlier of `deadline` and `timeout` applies.
+            raw (bool): Whether to decode the response JSON directly into messages and return a light `ChatCompletionView` instead of the pydantic `ChatCompletion`, which is then only built on demand. Defaults to False.
+            fallback_models (Optional[List[str]]): The models to fall back to, in order, for this call. Defaults to the instance's fallback models. Each attempt goes to the first model the router prefers that has not failed yet in this call, without a backoff sleep when switching models; the model that answered is the `model` of the response.
+            coalesce_sampled (bool): Whether, with single flight enabled, a sampled request may share the call of an identical one and so get the same samples. Defaults to False, which only coalesces requests with a `seed`, or with a `temperature` of 0 and one choice.
+            **kwargs: Additional arguments to pass to the chat completions API. When the message list has a frozen prefix, the request body is encoded here instead of by the SDK, so they must be JSON serializable; `extra_headers`, `extra_query` and `extra_body` are still applied as the SDK does. An `n` above `max_n_per_request` is split into concurrent sub-requests.
 
         Returns:
             Message: The generated chat completion.
+
+        Raises:
+            DeadlineExceeded: If the deadline or timeout passes before a response is received.
         """
         if "stream" in kwargs:
             logger.warning(
-                "The 'stream' parameter is not supported in the 'completions' method"
+                "The 'stream' parameter is not supported in the 'completions' method, use 'stream' instead"
             )
             del kwargs["stream"]
         if model is None:
             model = self._default_model
+        if fallback_models is None:
+            fallback_models = self._fallback_models
+        models = None
+        if fallback_models:
+            if self._model_router is None:
+                self._model_router = ModelRouter()
+            models = list(dict.fromkeys([model, *fallback_models]))
+        if timeout is not None:
+            expiry = time.monotonic() + timeout
+            deadline = expiry if deadline is None else min(deadline, expiry)
+
+        with self._span("completions", model=model) as span:
+            body = None
+            messages_json = None
+            if message_list.frozen_length:
+                # splice the cached prefix bytes into the body instead of encoding every message
+                request = {"model": model, "store": store, **kwargs}
+                with self._span("substitute"):
+                    messages_json = message_list.to_json(substitution_dict)
+                with self._span("encode"):
+                    body = self._encode_body(request, messages_json)
+                if self._semantic_cache is not None:
+                    request["messages"] = json_loads(messages_json)
+            else:
+                with self._span("substitute"):
+                    messages = message_list.to_dict(substitution_dict)
+                request = {
+                    "model": model,
+                    "messages": messages,
+                    "store": store,
+                    **kwargs,
+                }
+
+            cache_key = None
+            if self._semantic_cache is not None:
+                cached, cache_key = await self._lookup_semantic_cache(request, deadline)
+                if cached is not None:
+                    responses, res = cached
+                    span.set_attribute("semantic_cache_hit", True)
+                    return responses, self._as_response_type(res, raw)
+
+            template = None
+            if self._prompt_cache_tracker is not None:
+                template = kwargs.get("prompt_cache_key") or message_list.template_key()
+
+            def _send():
+                return self._request(
+                    request,
+                    retry,
+                    messages_json,
+                    models=models,
+                    hedge=hedge,
+                    raw=raw,
+                    lane=lane,
+                    tenant=tenant,
+                    deadline=deadline,
+                    body=body,
+                    template=template,
+                )
+
+            if self._single_flight is None or not (
+                coalesce_sampled or self._is_deterministic(request)
+            ):
+                responses, res = await _send()
+            else:
+                # callers only share a call made with the same policy
+                key = canonical_key(
+                    {
+                        "payload": (
+                            canonical_key(request)
+                            if body is None
+                            else hashlib.sha256(body).hexdigest()
+                        ),
+                        "retry": retry,
+                        "models": models,
+                        "hedge": hedge,
+                        "lane": lane,
+                        "tenant": tenant,
+                    }
+                )
+                try:
+                    (responses, res), shared = await self._wait_before_deadline(
+                        self._single_flight.do(key, _send), deadline
+                    )
+                except DeadlineExceeded:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise
+                    # the shared call was made with the shorter deadline of another caller
+                    (responses, res), shared = await _send(), False
+                span.set_attribute("shared", shared)
+                if shared:
+                    # every caller gets its own messages, the ChatCompletion is read-only
+                    responses = copy.deepcopy(responses)
+                    res = self._as_response_type(res, raw)
+
+            if cache_key is not None:
+                try:
+                    self._semantic_cache.add(cache_key, responses, res)
+                except Exception as e:
+                    logger.warning(
+                        f"Failed to add the response to the semantic cache: {e}"
+                    )
+            return responses, res
+
+    @staticmethod
+    async def _wait_before_deadline(
+        awaitable: Awaitable[Any], deadline: Optional[float]
+    ) -> Any:
+        """Await `awaitable`, raising `DeadlineExceeded` once the deadline has passed."""
+        if deadline is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(
+                awaitable, max(0.0, deadline - time.monotonic())
+            )
+        except (TimeoutError, asyncio.TimeoutError) as e:
+            if isinstance(e, DeadlineExceeded) or time.monotonic() < deadline:
+                raise
+            raise DeadlineExceeded("The deadline of the request has passed") from e
+
+    async def _lookup_semantic_cache(
+        self, request: dict, deadline: Optional[float]
+    ) -> Tuple[Optional[Tuple[List[Message], Any]], Optional[Any]]:
+        """
+        Look a request up in the semantic cache within the time left.
+
+        The cache is only an optimization, so a failed or late lookup, e.g. during an
+        embedding outage, is logged and treated as a miss without a key to add.
+        """
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return None, None
+        try:
+            return await asyncio.wait_for(self._semantic_cache.lookup(request), timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(
+                f"Semantic cache lookup failed, treating it as a miss: {e!r}"
+            )
+            return None, None
+
+    async def stream(
+        self,
+        message_list: MessageList,
+        substitution_dict: Optional[SubstitutionDict] = None,
+        model: Optional[str] = None,
+        store: bool = False,
+        retry: int = 5,
+        **kwargs,
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        """
+        Stream the chunks of a chat completion.
+
+        The request is sent with the async client of the running event loop, so closing
+        the iterator early closes the HTTP response. Opening the stream is retried with
+        exponential backoff; errors after the first chunk are raised to the caller.
+
+        Args:
+            message_list (MessageList): The list of messages to use for generating completions.
+            substitution_dict (Optional[SubstitutionDict]): A dictionary for substituting variables in messages (optional).
+            model (Optional[str]): The model to use. Defaults to the instance's default model if not provided.
+            store (bool): Whether to store the chat completion in the database. Defaults to False.
+            retry (int): The number of attempts to open the stream. Defaults to 5.
+            **kwargs: Additional arguments to pass to the chat completions API.
 
-        async def _call():
-            # Offload blocking SDK call to a thread
-            return await asyncio.to_thread(
-                self._client.chat.completions.create,
-                model=model,
-                messages=message_list.to_dict(substitution_dict),
-                store=store,
+        Yields:
+            ChatCompletionChunk: The chunks of the response.
+        """
+        request = {
+            "model": model if model is not None else self._default_model,
+            "messages": message_list.to_dict(substitution_dict),
+            "store": store,
+            **kwargs,
+            "stream": True,
+        }
+        client = self.get_async_client()
+        for attempt in range(1, retry + 1):
+            try:
+                response = await client.chat.completions.create(**request)
+                break
+            except Exception:
+                if attempt == retry:
+                    raise
+                # exponential backoff with jitter
+                await asyncio.sleep(self._backoff_delay(attempt))
+        try:
+            async for chunk in response:
+                yield chunk
+        finally:
+            await response.close()
+
+    async def stream_structured(
+        self,
+        message_list: MessageList,
+        substitution_dict: Optional[SubstitutionDict] = None,
+        model: Optional[str] = None,
+        max_depth: int = 2,
+        **kwargs,
+    ) -> AsyncIterator[Tuple[JsonPath, Any]]:
+        """
+        Stream the values of a JSON chat completion as soon as each one is closed.
+
+        Use with a `response_format` asking for JSON. With the default `max_depth`, each
+        element of a top-level list field, such as one result of a list of results, is
+        yielded as soon as the model closes it, so it can be processed while the rest is
+        still being generated. The last value yielded is the whole document, with path ().
+
+        Args:
+            message_list (MessageList): The list of messages to use for generating completions.
+            substitution_dict (Optional[SubstitutionDict]): A dictionary for substituting variables in messages (optional).
+            model (Optional[str]): The model to use. Defaults to the instance's default model if not provided.
+            max_depth (int): The maximum length of the path of yielded values. Defaults to 2.
+            **kwargs: Additional arguments to pass to `stream`.
+
+        Yields:
+            Tuple[JsonPath, Any]: The object keys and array indices leading to a value, and the value.
+
+        Raises:
+            ValueError: If more than one choice is requested, or the response is not valid JSON or is cut off.
+            RuntimeError: If the model refused the request.
+        """
+        if kwargs.get("n", 1) != 1:
+            raise ValueError("Structured streaming supports a single choice")
+        parser = IncrementalJsonParser(max_depth)
+        refusal = []
+        finish_reason = None
+        async for chunk in self.stream(
+            message_list, substitution_dict, model, **kwargs
+        ):
+            for choice in chunk.choices:
+                if choice.delta.refusal:
+                    refusal.append(choice.delta.refusal)
+                if choice.delta.content:
+                    for event in parser.feed(choice.delta.content):
+                        yield event
+                if choice.finish_reason is not None:
+                    finish_reason = choice.finish_reason
+        if refusal:
+            raise RuntimeError(f"The model refused the request: {''.join(refusal)}")
+        if finish_reason == "length":
+            raise ValueError("The JSON response was cut off by the token limit")
+        for event in parser.close():
+            yield event
+
+    async def stream_ordered_list(
+        self,
+        message_list: MessageList,
+        substitution_dict: Optional[SubstitutionDict] = None,
+        model: Optional[str] = None,
+        remove_markdown_types: List[str] = [
+            "heading",
+            "emphasis",
+            "strong",
+            "horizontal_rule",
+            "block_quote",
+        ],
+        **kwargs,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the items of the first ordered list of a chat completion.
+
+        Each item is yielded as soon as the next item starts or the list ends, with
+        markdown removed by `split_ordered_list`. The list is found as described for
+        `OrderedListExtractor`. The stream is closed as soon as the list ends.
+
+        Args:
+            message_list (MessageList): The list of messages to use for generating completions.
+            substitution_dict (Optional[SubstitutionDict]): A dictionary for substituting variables in messages (optional).
+            model (Optional[str]): The model to use. Defaults to the instance's default model if not provided.
+            remove_markdown_types (List[str]): The type of format to be removed from each item. Defaults to [ "heading", "emphasis", "strong", "horizontal_rule", "block_quote", ].
+            **kwargs: Additional arguments to pass to `stream`.
+
+        Yields:
+            str: The items of the list.
+
+        Raises:
+            ValueError: If more than one choice is requested.
+        """
+        if kwargs.get("n", 1) != 1:
+            raise ValueError("Ordered list streaming supports a single choice")
+        extractor = OrderedListExtractor(remove_markdown_types)
+        chunks = self.stream(message_list, substitution_dict, model, **kwargs)
+        try:
+            async for chunk in chunks:
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        for item in extractor.feed(choice.delta.content):
+                            yield item
+                if extractor.done:
+                    return
+        finally:
+            await chunks.aclose()
+        for item in extractor.close():
+            yield item
+
+    @staticmethod
+    def _as_response_type(
+        res: Union[ChatCompletion, ChatCompletionView], raw: bool
+    ) -> Union[ChatCompletion, ChatCompletionView]:
+        """Convert a response shared by another request to the type this request asked for."""
+        if raw and isinstance(res, ChatCompletion):
+            return ChatCompletionView(res.model_dump(mode="json", exclude_unset=True))
+        if not raw and isinstance(res, ChatCompletionView):
+            return res.to_chat_completion()
+        return res
+
+    @staticmethod
+    def _parse_choices(res: Union[ChatCompletion, ChatCompletionView]) -> List[Message]:
+        """Build the messages of all choices of a response."""
+        if isinstance(res, ChatCompletionView):
+            return [get_assistant_message_from_dict(c["message"]) for c in res.choices]
+        return [get_assistant_message_from_response(c.message) for c in res.choices]
+
+    @staticmethod
+    def _is_deterministic(request: dict) -> bool:
+        """Whether identical requests are expected to get the same response."""
+        if request.get("seed") is not None:
+            return True
+        return request.get("temperature") == 0 and (request.get("n") or 1) == 1
+
+    @staticmethod
+    def _encode_body(request: dict, messages_json: bytes) -> bytes:
+        """Encode a request body around the already encoded messages, with `extra_body` merged in and the other SDK options left out."""
+        head = {
+            key: value
+            for key, value in request.items()
+            if key != "messages" and key not in _SDK_OPTIONS
+        }
+        head.update(request.get("extra_body") or {})
+        return json_dumps(head)[:-1] + b',"messages":' + messages_json + b"}"
+
+    @staticmethod
+    def _merge_responses(
+        results: List[Union[ChatCompletion, ChatCompletionView]], raw: bool
+    ) -> Union[ChatCompletion, ChatCompletionView]:
+        """Merge the responses of sub-requests into one, with renumbered choices and summed usage."""
+        datas = [
+            (
+                res.data
+                if isinstance(res, ChatCompletionView)
+                else res.model_dump(mode="json", exclude_unset=True)
+            )
+            for res in results
+        ]
+        merged = dict(datas[0])
+        choices = [choice for data in datas for choice in data.get("choices") or []]
+        merged["choices"] = [
+            {**choice, "index": index} for index, choice in enumerate(choices)
+        ]
+        usage = _sum_usage([data.get("usage") for data in datas])
+        if usage is not None:
+            merged["usage"] = usage
+        return (
+            ChatCompletionView(merged) if raw else ChatCompletion.model_validate(merged)
+        )
+
+    async def _request(
+        self,
+        request: dict,
+        retry: int,
+        messages_json: Optional[bytes] = None,
+        body: Optional[bytes] = None,
+        raw: bool = False,
+        **kwargs,
+    ) -> Tuple[List[Message], Union[ChatCompletion, ChatCompletionView]]:
+        """Send a request, split into concurrent sub-requests if it asks for more than `max_n_per_request` choices."""
+        n = request.get("n") or 1
+        size = self._max_n_per_request
+        if size is None or n <= size:
+            return await self._request_with_retry(
+                request,
+                retry,
+                raw=raw,
+                body=body,
+                messages_json=messages_json,
                 **kwargs,
             )
 
+        tasks = []
+        seed = request.get("seed")
+        for index, start in enumerate(range(0, n, size)):
+            sub_request = {**request, "n": min(size, n - start)}
+            if seed is not None:
+                # a shared seed would make every sub-request return the same samples
+                sub_request["seed"] = seed + index
+            sub_body = (
+                self._encode_body(sub_request, messages_json)
+                if body is not None
+                else None
+            )
+            tasks.append(
+                asyncio.ensure_future(
+                    self._request_with_retry(
+                        sub_request,
+                        retry,
+                        raw=raw,
+                        body=sub_body,
+                        messages_json=messages_json,
+                        **kwargs,
+                    )
+                )
+            )
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        responses = [message for messages, _ in results for message in messages]
+        return responses, self._merge_responses([res for _, res in results], raw)
+
+    async def _request_with_retry(
+        self,
+        request: dict,
+        retry: int,
+        hedge: bool = False,
+        raw: bool = False,
+        lane: Optional[str] = None,
+        tenant: Optional[str] = None,
+        deadline: Optional[float] = None,
+        body: Optional[bytes] = None,
+        template: Optional[str] = None,
+        messages_json: Optional[bytes] = None,
+        models: Optional[List[str]] = None,
+    ) -> Tuple[List[Message], Union[ChatCompletion, ChatCompletionView]]:
+        """Send a request, retrying with exponential backoff and falling back to other models, and parse the returned choices."""
+        failed = set()
+
+        def _pick_model() -> str:
+            if models is None:
+                return request["model"]
+            order = self._model_router.route(models)
+            return next((model for model in order if model not in failed), order[0])
+
+        async def _attempt(model):
+            attempt_request, attempt_body = request, body
+            if model != request["model"]:
+                attempt_request = {**request, "model": model}
+                if body is not None:
+                    attempt_body = self._encode_body(attempt_request, messages_json)
+            if hedge:
+                return await self._hedging_policy.run(
+                    model,
+                    lambda: self._create(attempt_request, raw, attempt_body, deadline),
+                )
+            return await self._create(attempt_request, raw, attempt_body, deadline)
+
+        async def _call(model):
+            if self._scheduler is not None:
+                return await self._scheduler.run(
+                    lambda: _attempt(model), lane, tenant, deadline
+                )
+            return await _attempt(model)
+
+        async def _call_before_deadline(model):
+            if deadline is None:
+                return await _call(model)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded("The deadline of the request has passed")
+            try:
+                # cancels the attempt, and its HTTP request, when the deadline passes
+                return await asyncio.wait_for(_call(model), remaining)
+            except asyncio.TimeoutError as e:
+                if time.monotonic() < deadline:
+                    # a timeout of the attempt itself, which may be retried
+                    raise
+                raise DeadlineExceeded("The deadline of the request has passed") from e
+
         last_exc = None
 
         for attempt in range(1, retry + 1):
             try:
-                res: ChatCompletion = await _call()
-                choices = getattr(res, "choices", None) or []
-                if not choices:
+                start = time.perf_counter()
+                model = _pick_model()
+                with self._span("attempt", attempt=attempt, model=model):
+                    res = await _call_before_deadline(model)
+                if not (getattr(res, "choices", None) or []):
                     raise RuntimeError("No choices returned from completion API.")
-                responses = [
-                    get_assistant_message_from_response(c.message) for c in choices
-                ]
-                return responses, res
+                if template is not None:
+                    self._prompt_cache_tracker.record(
+                        template, res.usage, time.perf_counter() - start
+                    )
+                with self._span("parse"):
+                    return self._parse_choices(res), res
+            except DeadlineExceeded:
+                # the deadline has passed, retrying cannot help
+                raise
             except Exception as e:
                 last_exc = e
                 # decide if error is retryable; if not, raise immediately
                 # if not is_retryable(e): raise
                 if attempt == retry:
                     raise
+                kind = error_kind(e)
+                self._retry_counts[kind] += 1
+                if is_overload_error(e) or isinstance(
+                    e, (TimeoutError, asyncio.TimeoutError)
+                ):
+                    # other errors, e.g. a bad request, would fail on any model
+                    failed.add(model)
+                    if models is not None and not failed.issuperset(models):
+                        # a fallback model that has not failed yet is tried right away
+                        continue
                 # exponential backoff with jitter
-                base = 2 ** (attempt - 1)
-                delay = base + random.uniform(-0.2 * base, 0.2 * base)
-                await asyncio.sleep(max(0.0, delay))
-            raise last_exc
+                delay = self._backoff_delay(attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise DeadlineExceeded(
+                        "The deadline of the request would pass before the next attempt"
+                    ) from e
+                with self._span("retry_sleep", attempt=attempt, error=kind):
+                    await asyncio.sleep(delay)
+        raise last_exc
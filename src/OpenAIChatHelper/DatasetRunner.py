@@ -0,0 +1,320 @@
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+import asyncio
+import csv
+import json
+import os
+import time
+
+from .ChatCompletionEndPoint import ChatCompletionEndPoint
+from .message.Contents import TextContent
+from .message.Message import AssistantMessage, DevSysUserMessage, Message
+from .message.MessageList import MessageList
+from .message.SubstitutionDict import SubstitutionDict
+from .utils import get_logger, json_dumps, json_loads
+
+logger = get_logger(__name__)
+
+
+def load_template(path: str) -> MessageList:
+    """
+    Load a message list template from a JSON file.
+
+    The file holds a list of messages such as `{"role": "system", "content": "..."}`.
+    The content is a string or a list of `{"type": "text", "text": "..."}` items, and
+    may contain `{field}` substitution fields filled from each dataset row.
+
+    Args:
+        path (str): The path of the JSON file.
+
+    Returns:
+        MessageList: The template.
+
+    Raises:
+        ValueError: If the file is not a list of messages with text content.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        messages = json.load(f)
+    if not isinstance(messages, list) or not messages:
+        raise ValueError("The template must be a non-empty list of messages")
+    template = MessageList()
+    for message in messages:
+        if not isinstance(message, dict) or "role" not in message:
+            raise ValueError("Template messages must be objects with a role")
+        content = message.get("content")
+        if isinstance(content, str):
+            content = [TextContent(content)]
+        elif isinstance(content, list):
+            if any(
+                not isinstance(item, dict) or item.get("type") != "text"
+                for item in content
+            ):
+                raise ValueError("Template messages can only have text content")
+            content = [TextContent(item["text"]) for item in content]
+        else:
+            raise ValueError("Template message content must be a string or a list")
+        if message["role"] == "assistant":
+            template.add_message(AssistantMessage(content))
+        else:
+            template.add_message(DevSysUserMessage(message["role"], content))
+    return template
+
+
+def _detect_format(path: str, format: Optional[str]) -> str:
+    if format is None:
+        format = "csv" if path.lower().endswith(".csv") else "jsonl"
+    if format not in {"jsonl", "csv"}:
+        raise ValueError(f"Unsupported dataset format: {format}")
+    return format
+
+
+def read_dataset(path: str, format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the rows of a JSONL or CSV dataset.
+
+    Args:
+        path (str): The path of the dataset.
+        format (Optional[str]): "jsonl" or "csv". Defaults to the file extension, with JSONL for anything but ".csv".
+
+    Yields:
+        Dict[str, Any]: One row per JSON line or CSV record.
+
+    Raises:
+        ValueError: If the format is unsupported or a JSON line is not an object.
+    """
+    format = _detect_format(path, format)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if format == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {line_number} is not a JSON object")
+            yield row
+
+
+def count_rows(path: str, format: Optional[str] = None) -> int:
+    """Count the rows of a JSONL or CSV dataset without parsing them as JSON."""
+    format = _detect_format(path, format)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if format == "csv":
+            # an empty file has no header either
+            return max(0, sum(1 for _ in csv.reader(f)) - 1)
+        return sum(1 for line in f if line.strip())
+
+
+def _response_texts(message: Message) -> Optional[str]:
+    texts = [
+        content.text
+        for content in (message.content or [])
+        if isinstance(content, TextContent)
+    ]
+    return "".join(texts) if texts else None
+
+
+class DatasetRunner:
+    """
+    Run a message list template over every row of a dataset.
+
+    Each row fills the substitution fields of the template and is sent with bounded
+    concurrency. Results are appended to a JSONL file as they arrive, and the id of every
+    finished row is appended to a checkpoint log, so an interrupted run resumes without
+    repeating finished rows. Failed rows are written with their error and retried by the
+    next run, which first drops their error records from the output.
+    """
+
+    def __init__(
+        self,
+        endpoint: ChatCompletionEndPoint,
+        template: MessageList,
+        output_path: str,
+        checkpoint_path: Optional[str] = None,
+        concurrency: int = 8,
+        id_field: Optional[str] = "id",
+        report_interval: float = 10.0,
+        **kwargs,
+    ):
+        """
+        Initialize the DatasetRunner.
+
+        Args:
+            endpoint (ChatCompletionEndPoint): The endpoint to send requests with.
+            template (MessageList): The message list whose substitution fields are filled from each row.
+            output_path (str): The JSONL file results are appended to.
+            checkpoint_path (Optional[str]): The checkpoint log. Defaults to `output_path` with a ".checkpoint" suffix.
+            concurrency (int): The maximum number of rows in flight. Defaults to 8.
+            id_field (Optional[str]): The row field identifying a row. Rows without it, or all rows if None, are identified by their position as "#<position>". Defaults to "id".
+            report_interval (float): The number of seconds between progress reports. Defaults to 10.
+            **kwargs: Additional arguments to pass to `completions`, such as `model`, `retry` or `temperature`.
+
+        Raises:
+            ValueError: If `concurrency` or `report_interval` is not positive.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be positive")
+        if report_interval <= 0:
+            raise ValueError("report_interval must be positive")
+        self._endpoint = endpoint
+        self._template = template
+        self._output_path = output_path
+        self._checkpoint_path = (
+            checkpoint_path
+            if checkpoint_path is not None
+            else output_path + ".checkpoint"
+        )
+        self._concurrency = concurrency
+        self._id_field = id_field
+        self._report_interval = report_interval
+        self._kwargs = kwargs
+
+    def _load_checkpoint(self) -> Set[str]:
+        if not os.path.exists(self._checkpoint_path):
+            return set()
+        with open(self._checkpoint_path, "r", encoding="utf-8") as f:
+            return {json.loads(line) for line in f if line.strip()}
+
+    def _row_id(self, position: int, row: Dict[str, Any]) -> str:
+        if self._id_field is not None and row.get(self._id_field) is not None:
+            return str(row[self._id_field])
+        # never the same as the id of another row
+        return f"#{position}"
+
+    def _drop_failed_results(self) -> None:
+        """Remove the error records of an earlier run, whose rows are retried, from the output."""
+        if not os.path.exists(self._output_path):
+            return
+        with open(self._output_path, "rb") as f:
+            # a result is a single JSON object, so only an error record has this top-level key
+            if not any(b',"error":' in line for line in f):
+                return
+        temporary_path = self._output_path + ".tmp"
+        with open(self._output_path, "rb") as source, open(
+            temporary_path, "wb"
+        ) as target:
+            for line in source:
+                if b',"error":' not in line or "error" not in json_loads(line):
+                    target.write(line)
+        os.replace(temporary_path, self._output_path)
+
+    @staticmethod
+    def _substitution_dict(row: Dict[str, Any]) -> SubstitutionDict:
+        substitution_dict = SubstitutionDict()
+        for key, value in row.items():
+            if not isinstance(key, str):
+                continue
+            if value is None:
+                value = ""
+            elif not isinstance(value, str):
+                value = json.dumps(value, ensure_ascii=False)
+            substitution_dict[key] = value
+        return substitution_dict
+
+    async def _complete(self, row_id: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            responses, res = await self._endpoint.completions(
+                self._template, self._substitution_dict(row), raw=True, **self._kwargs
+            )
+        except Exception as e:
+            logger.warning(f"Row {row_id} failed: {e!r}")
+            return {"id": row_id, "error": repr(e)}
+        return {
+            "id": row_id,
+            "responses": [_response_texts(message) for message in responses],
+            "usage": res.data.get("usage"),
+        }
+
+    def _report(
+        self, done: int, failed: int, skipped: int, total: Optional[int], start: float
+    ) -> None:
+        elapsed = time.monotonic() - start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        progress = (
+            f"{done + skipped}/{total}" if total is not None else f"{done + skipped}"
+        )
+        eta = ""
+        if total is not None and rate > 0:
+            eta = f", ETA {max(0, total - done - skipped) / rate:.0f}s"
+        logger.info(
+            f"{progress} rows finished ({failed} failed, {skipped} skipped), "
+            f"{rate:.2f} rows/s{eta}"
+        )
+
+    async def run(
+        self, rows: Iterable[Dict[str, Any]], total: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the template over the rows, skipping those in the checkpoint log.
+
+        Args:
+            rows (Iterable[Dict[str, Any]]): The rows, read lazily.
+            total (Optional[int]): The number of rows, used for the ETA (optional).
+
+        Returns:
+            Dict[str, Any]: The numbers of completed, failed and skipped rows, the elapsed seconds and the throughput in rows per second.
+        """
+        finished = self._load_checkpoint()
+        self._drop_failed_results()
+        semaphore = asyncio.Semaphore(self._concurrency)
+        tasks: Set[asyncio.Future] = set()
+        done = failed = skipped = 0
+        crashed: Optional[Exception] = None
+        start = time.monotonic()
+        last_report = start
+
+        with open(self._output_path, "ab") as output, open(
+            self._checkpoint_path, "a", encoding="utf-8"
+        ) as checkpoint:
+
+            async def _process(row_id: str, row: Dict[str, Any]):
+                nonlocal done, failed, last_report, crashed
+                try:
+                    result = await self._complete(row_id, row)
+                    output.write(json_dumps(result) + b"\n")
+                    output.flush()
+                    if "error" in result:
+                        failed += 1
+                    else:
+                        # only written once the result is on disk
+                        checkpoint.write(json.dumps(row_id) + "\n")
+                        checkpoint.flush()
+                    done += 1
+                except Exception as e:
+                    # e.g. the disk is full, stop reading rows
+                    crashed = e
+                finally:
+                    semaphore.release()
+                now = time.monotonic()
+                if now - last_report >= self._report_interval:
+                    last_report = now
+                    self._report(done, failed, skipped, total, start)
+
+            try:
+                for position, row in enumerate(rows):
+                    row_id = self._row_id(position, row)
+                    if row_id in finished:
+                        skipped += 1
+                        continue
+                    await semaphore.acquire()
+                    task = asyncio.ensure_future(_process(row_id, row))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    if crashed is not None:
+                        break
+                await asyncio.gather(*list(tasks))
+                if crashed is not None:
+                    raise crashed
+            finally:
+                for task in list(tasks):
+                    task.cancel()
+
+        elapsed = time.monotonic() - start
+        self._report(done, failed, skipped, total, start)
+        return {
+            "completed": done - failed,
+            "failed": failed,
+            "skipped": skipped,
+            "elapsed": elapsed,
+            "throughput": done / elapsed if elapsed > 0 else 0.0,
+        }
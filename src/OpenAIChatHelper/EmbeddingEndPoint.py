@@ -0,0 +1,249 @@
+from typing import Callable, Dict, List, Optional, Sequence
+import asyncio
+import base64
+
+import numpy as np
+
+from .EndPoint import EndPoint
+from .vector.EmbeddingStore import EmbeddingStore
+from .utils import get_logger, json_loads
+
+logger = get_logger(__name__)
+
+
+def _default_token_counter(model: str) -> Callable[[str], int]:
+    """
+    Return a function counting the tokens of a text for `model`.
+
+    Uses tiktoken when it is installed. Otherwise the UTF-8 byte length is used,
+    which is an upper bound because every token covers at least one byte.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return lambda text: len(text.encode("utf-8"))
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+class EmbeddingEndPoint(EndPoint):
+    """
+    A class to compute vector embeddings using a specified model.
+
+    Inputs are deduplicated, packed into requests as large as the API allows and the
+    requests are sent concurrently. Embeddings are requested base64 encoded and decoded
+    straight into a float32 matrix.
+
+    Attributes:
+        _default_model (str): The default model to use for embeddings.
+        _max_batch_size (int): The maximum number of inputs per request.
+        _max_batch_tokens (int): The maximum number of tokens per request.
+        _max_concurrency (int): The maximum number of concurrent requests.
+
+    Methods:
+        embeddings(texts, model=None, dimensions=None, retry=5, **kwargs):
+            Embed the texts and return a matrix with one row per text.
+    """
+
+    def __init__(
+        self,
+        default_model: str = "text-embedding-3-small",
+        organization: Optional[str] = None,
+        project_id: Optional[str] = None,
+        max_batch_size: int = 2048,
+        max_batch_tokens: int = 300000,
+        max_concurrency: int = 8,
+        token_counter: Optional[Callable[[str], int]] = None,
+        base_url: Optional[str] = None,
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+        backoff: Optional[Callable[[int], float]] = None,
+    ):
+        """
+        Initialize the EmbeddingEndPoint instance.
+
+        Args:
+            default_model (str): The default model to use for embeddings. Defaults to "text-embedding-3-small".
+            organization (Optional[str]): The organization identifier (optional).
+            project_id (Optional[str]): The project ID (optional).
+            max_batch_size (int): The maximum number of inputs per request. Defaults to 2048.
+            max_batch_tokens (int): The maximum number of tokens per request. Defaults to 300000.
+            max_concurrency (int): The maximum number of concurrent requests. Defaults to 8.
+            token_counter (Optional[Callable[[str], int]]): A function counting the tokens of a text. Defaults to tiktoken if installed, else the UTF-8 byte length.
+            base_url (Optional[str]): The base URL of an OpenAI-compatible API (optional).
+            max_retries (Optional[int]): The number of retries of the OpenAI client itself (optional). Defaults to the SDK's default.
+            timeout (Optional[float]): The HTTP timeout of the OpenAI client in seconds (optional). Defaults to the SDK's default.
+            backoff (Optional[Callable[[int], float]]): A function returning the seconds to wait after a failed attempt, given its number (optional). Defaults to exponential backoff with jitter.
+
+        Raises:
+            ValueError: If any of the limits is not positive.
+        """
+        if max_batch_size < 1 or max_batch_tokens < 1 or max_concurrency < 1:
+            raise ValueError(
+                "max_batch_size, max_batch_tokens and max_concurrency must be positive"
+            )
+        super().__init__(
+            organization,
+            project_id,
+            base_url,
+            max_retries=max_retries,
+            timeout=timeout,
+            backoff=backoff,
+        )
+        self._default_model = default_model
+        self._max_batch_size = max_batch_size
+        self._max_batch_tokens = max_batch_tokens
+        self._max_concurrency = max_concurrency
+        self._token_counter = token_counter
+
+    def _make_batches(self, texts: Sequence[str], model: str) -> List[range]:
+        """Greedily pack consecutive texts into batches that respect the item and token limits."""
+        count_tokens = self._token_counter or _default_token_counter(model)
+        batches = []
+        start = 0
+        tokens = 0
+        for i, text in enumerate(texts):
+            n_tokens = count_tokens(text)
+            if i > start and (
+                i - start == self._max_batch_size
+                or tokens + n_tokens > self._max_batch_tokens
+            ):
+                batches.append(range(start, i))
+                start = i
+                tokens = 0
+            tokens += n_tokens
+        if start < len(texts):
+            batches.append(range(start, len(texts)))
+        return batches
+
+    async def _embed_batch(
+        self, texts: List[str], model: str, retry: int, **kwargs
+    ) -> List[Dict]:
+        """Send one embedding request and return the decoded `data` items."""
+        client = self.get_async_client()
+        for attempt in range(1, retry + 1):
+            try:
+                raw = await client.embeddings.with_raw_response.create(
+                    input=texts,
+                    model=model,
+                    encoding_format="base64",
+                    **kwargs,
+                )
+                data = json_loads(raw.content)["data"]
+                if len(data) != len(texts):
+                    raise RuntimeError(
+                        f"Expected {len(texts)} embeddings, got {len(data)}"
+                    )
+                return data
+            except Exception:
+                if attempt == retry:
+                    raise
+                # exponential backoff with jitter
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+    async def _cached_embeddings(
+        self,
+        texts: Sequence[str],
+        model: str,
+        dimensions: Optional[int],
+        retry: int,
+        cache: EmbeddingStore,
+        **kwargs,
+    ) -> np.ndarray:
+        """Embed only the texts missing from `cache`, add them to it and read all rows from it."""
+        if cache.model != model or (
+            dimensions is not None and cache.dimensions != dimensions
+        ):
+            raise ValueError(
+                f"Cache holds {cache.model} embeddings with {cache.dimensions} dimensions"
+            )
+        rows = await asyncio.to_thread(cache.lookup, texts)
+        missing = [text for text, row in zip(texts, rows) if row < 0]
+        if missing:
+            vectors = await self.embeddings(missing, model, dimensions, retry, **kwargs)
+            await asyncio.to_thread(cache.add, missing, vectors)
+            rows = await asyncio.to_thread(cache.lookup, texts)
+        logger.debug(f"{len(texts) - len(missing)} of {len(texts)} embeddings cached")
+        return np.ascontiguousarray(cache.vectors[rows])
+
+    async def embeddings(
+        self,
+        texts: Sequence[str],
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        retry: int = 5,
+        cache: Optional[EmbeddingStore] = None,
+        **kwargs,
+    ) -> np.ndarray:
+        """
+        Embed the texts and return a matrix with one row per text, in input order.
+
+        Identical texts are only sent once. The unique texts are packed into as few
+        requests as the item and token limits allow, and up to `max_concurrency`
+        requests are in flight at the same time.
+
+        Args:
+            texts (Sequence[str]): The texts to embed.
+            model (Optional[str]): The model to use. Defaults to the instance's default model if not provided.
+            dimensions (Optional[int]): The number of dimensions of the embeddings, for models that support it (optional).
+            retry (int): The number of retry attempts per request. Defaults to 5.
+            cache (Optional[EmbeddingStore]): A persistent store to read embeddings from; only texts missing from it are embedded and then added to it (optional).
+            **kwargs: Additional arguments to pass to the embeddings API.
+
+        Returns:
+            np.ndarray: A C-contiguous float32 matrix of shape (len(texts), dimensions).
+        """
+        if model is None:
+            model = self._default_model
+        if cache is not None:
+            return await self._cached_embeddings(
+                texts, model, dimensions, retry, cache, **kwargs
+            )
+        if dimensions is not None:
+            kwargs["dimensions"] = dimensions
+
+        positions: Dict[str, int] = {}
+        unique: List[str] = []
+        inverse = np.empty(len(texts), dtype=np.intp)
+        for i, text in enumerate(texts):
+            if not isinstance(text, str):
+                raise ValueError("Texts must be strings")
+            position = positions.get(text)
+            if position is None:
+                position = positions[text] = len(unique)
+                unique.append(text)
+            inverse[i] = position
+        if not unique:
+            return np.empty((0, dimensions or 0), dtype=np.float32)
+
+        batches = self._make_batches(unique, model)
+        logger.debug(
+            f"Embedding {len(texts)} texts ({len(unique)} unique) in {len(batches)} requests"
+        )
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        matrix: Optional[np.ndarray] = (
+            np.empty((len(unique), dimensions), dtype=np.float32)
+            if dimensions is not None
+            else None
+        )
+
+        async def _run(batch: range):
+            nonlocal matrix
+            async with semaphore:
+                data = await self._embed_batch(
+                    unique[batch.start : batch.stop], model, retry, **kwargs
+                )
+            for item in data:
+                vector = np.frombuffer(base64.b64decode(item["embedding"]), dtype="<f4")
+                if matrix is None:
+                    matrix = np.empty((len(unique), len(vector)), dtype=np.float32)
+                matrix[batch.start + item["index"]] = vector
+
+        await asyncio.gather(*[_run(batch) for batch in batches])
+
+        if len(unique) == len(texts):
+            return matrix
+        return matrix[inverse]
@@ -1,6 +1,9 @@
+import asyncio
 import os
-from typing import Optional
-from openai import OpenAI
+import random
+import weakref
+from typing import Callable, Optional
+from openai import AsyncOpenAI, OpenAI
 
 from .utils import get_logger
 
@@ -15,16 +18,22 @@ class EndPoint:
     Attributes:
         __organization__ (Optional[str]): The organization ID for the OpenAI client.
         __project_id__ (Optional[str]): The project ID for the OpenAI client.
+        _base_url (Optional[str]): The base URL of the API, if not the default.
+        _max_retries (Optional[int]): The number of retries of the OpenAI clients, if not the SDK's default.
+        _timeout (Optional[float]): The HTTP timeout of the OpenAI clients, if not the SDK's default.
+        _backoff (Optional[Callable[[int], float]]): The delay before retrying after a failed attempt, if not exponential backoff.
 
     Methods:
-        __init__(organization: Optional[str], project_id: Optional[str]):
-            Initializes the EndPoint instance with optional organization and project IDs.
+        __init__(organization: Optional[str], project_id: Optional[str], base_url: Optional[str], max_retries: Optional[int], timeout: Optional[float], backoff: Optional[Callable[[int], float]]):
+            Initializes the EndPoint instance with optional organization and project IDs, base URL and retry settings.
         set_organization(organization: Optional[str]):
             Sets the organization ID at the class level.
         set_project_id(project_id: Optional[str]):
             Sets the project ID at the class level.
         get_client(organization: Optional[str], project_id: Optional[str]) -> OpenAI:
             Returns an instance of the OpenAI client using the provided or default organization and project IDs.
+        get_async_client() -> AsyncOpenAI:
+            Returns the AsyncOpenAI client of the running event loop.
         reset_client():
             Resets the OpenAI client instance using the current configuration.
     """
@@ -33,7 +42,13 @@ class EndPoint:
     __project_id__: Optional[str] = None
 
     def __init__(
-        self, organization: Optional[str] = None, project_id: Optional[str] = None
+        self,
+        organization: Optional[str] = None,
+        project_id: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+        backoff: Optional[Callable[[int], float]] = None,
     ):
         """
         Initializes the EndPoint instance.
@@ -41,13 +56,22 @@ class EndPoint:
         Args:
             organization (Optional[str]): The organization ID. Defaults to None.
             project_id (Optional[str]): The project ID. Defaults to None.
+            base_url (Optional[str]): The base URL of an OpenAI-compatible API, such as a local test server. Defaults to the `OPENAI_BASE_URL` environment variable or the OpenAI API.
+            max_retries (Optional[int]): The number of retries of the OpenAI clients themselves. Defaults to the SDK's default.
+            timeout (Optional[float]): The HTTP timeout of the OpenAI clients in seconds. Defaults to the SDK's default.
+            backoff (Optional[Callable[[int], float]]): A function returning the seconds to wait before retrying after the given failed attempt, starting at 1. Defaults to exponential backoff with jitter.
         """
         EndPoint.verify_openai_api_key()
         if organization is not None:
             self.__organization__ = organization
         if project_id is not None:
             self.__project_id__ = project_id
+        self._base_url = base_url
+        self._max_retries = max_retries
+        self._timeout = timeout
+        self._backoff = backoff
         self._client = self.get_client()
+        self._async_clients = weakref.WeakKeyDictionary()
 
     @classmethod
     def verify_openai_api_key(cls) -> None:
@@ -119,10 +143,65 @@ class EndPoint:
         logger.info(
             f"Creating OpenAI client with organization {organization} and project {project_id}"
         )
-        return OpenAI(organization=organization, project=project_id)
+        options = {}
+        if self._max_retries is not None:
+            options["max_retries"] = self._max_retries
+        if self._timeout is not None:
+            options["timeout"] = self._timeout
+        return OpenAI(
+            organization=organization,
+            project=project_id,
+            base_url=self._base_url,
+            **options,
+        )
+
+    def get_async_client(self) -> AsyncOpenAI:
+        """
+        Returns the AsyncOpenAI client of the running event loop, creating it on first use.
+
+        The connection pool of an async client is bound to the event loop it is used on,
+        so one client is kept per loop and dropped with the loop. The clients take the
+        retry and timeout settings of the sync client.
+
+        Returns:
+            AsyncOpenAI: The async client using the instance's organization and project IDs.
+
+        Raises:
+            RuntimeError: If no event loop is running.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = AsyncOpenAI(
+                organization=self.__organization__,
+                project=self.__project_id__,
+                base_url=self._base_url,
+                max_retries=self._client.max_retries,
+                timeout=self._client.timeout,
+            )
+        return client
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """
+        Return the delay before retrying after the given failed attempt.
+
+        Unless a `backoff` function was given, the delay grows exponentially with the
+        attempt number and has a +/-20% jitter.
+
+        Args:
+            attempt (int): The number of the failed attempt, starting at 1.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        if self._backoff is not None:
+            return self._backoff(attempt)
+        base = 2 ** (attempt - 1)
+        return max(0.0, base + random.uniform(-0.2 * base, 0.2 * base))
 
     def reset_client(self):
         """
         Resets the OpenAI client instance using the current organization and project IDs.
         """
         self._client = self.get_client()
+        self._async_clients = weakref.WeakKeyDictionary()
@@ -0,0 +1,163 @@
+from typing import Callable, List, Optional, Tuple
+import asyncio
+
+from openai.types import Moderation
+from openai.types.chat import ChatCompletion
+
+from .ChatCompletionEndPoint import ChatCompletionEndPoint
+from .EndPoint import EndPoint
+from .message.Message import Message, last_user_message_view
+from .message.MessageList import MessageList
+from .message.SubstitutionDict import SubstitutionDict
+from .traffic.MicroBatcher import MicroBatcher
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class ModerationEndPoint(EndPoint):
+    """
+    A class to classify texts with the moderation API.
+
+    Texts passed to `moderate` by concurrent coroutines are gathered into batched
+    requests, so screening every message of a busy service costs far fewer requests.
+
+    Attributes:
+        _default_model (str): The default model to use for moderation.
+        _batcher (MicroBatcher): The batcher gathering texts into requests.
+
+    Methods:
+        moderate(text):
+            Classify a single text, batched with concurrent calls.
+        moderate_batch(texts, model=None, retry=5):
+            Classify a list of texts in one request.
+        guarded_completions(chat_endpoint, message_list, substitution_dict=None, cancel_on_flag=True, **kwargs):
+            Run a chat completion and the moderation of its last user message at the same time.
+    """
+
+    def __init__(
+        self,
+        default_model: str = "omni-moderation-latest",
+        organization: Optional[str] = None,
+        project_id: Optional[str] = None,
+        max_batch_size: int = 32,
+        max_wait: float = 0.01,
+        retry: int = 5,
+        base_url: Optional[str] = None,
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+        backoff: Optional[Callable[[int], float]] = None,
+    ):
+        """
+        Initialize the ModerationEndPoint instance.
+
+        Args:
+            default_model (str): The default model to use for moderation. Defaults to "omni-moderation-latest".
+            organization (Optional[str]): The organization identifier (optional).
+            project_id (Optional[str]): The project ID (optional).
+            max_batch_size (int): The maximum number of texts per batched request. Defaults to 32.
+            max_wait (float): The maximum number of seconds a text waits for its batch to fill. Defaults to 0.01.
+            retry (int): The number of retry attempts for batched requests. Defaults to 5.
+            base_url (Optional[str]): The base URL of an OpenAI-compatible API (optional).
+            max_retries (Optional[int]): The number of retries of the OpenAI client itself (optional). Defaults to the SDK's default.
+            timeout (Optional[float]): The HTTP timeout of the OpenAI client in seconds (optional). Defaults to the SDK's default.
+            backoff (Optional[Callable[[int], float]]): A function returning the seconds to wait after a failed attempt, given its number (optional). Defaults to exponential backoff with jitter.
+        """
+        super().__init__(
+            organization,
+            project_id,
+            base_url,
+            max_retries=max_retries,
+            timeout=timeout,
+            backoff=backoff,
+        )
+        self._default_model = default_model
+        self._batcher = MicroBatcher(
+            lambda texts: self.moderate_batch(texts, retry=retry),
+            max_batch_size,
+            max_wait,
+        )
+
+    @property
+    def batcher(self) -> MicroBatcher:
+        return self._batcher
+
+    async def moderate_batch(
+        self, texts: List[str], model: Optional[str] = None, retry: int = 5
+    ) -> List[Moderation]:
+        """
+        Classify a list of texts in one request.
+
+        Args:
+            texts (List[str]): The texts to classify.
+            model (Optional[str]): The model to use. Defaults to the instance's default model if not provided.
+            retry (int): The number of retry attempts for the API call. Defaults to 5.
+
+        Returns:
+            List[Moderation]: The moderation result of every text, in order.
+        """
+        if model is None:
+            model = self._default_model
+        for attempt in range(1, retry + 1):
+            try:
+                res = await asyncio.to_thread(
+                    self._client.moderations.create, input=texts, model=model
+                )
+                return res.results
+            except Exception:
+                if attempt == retry:
+                    raise
+                # exponential backoff with jitter
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+    async def moderate(self, text: str) -> Moderation:
+        """
+        Classify a text. Concurrent calls are gathered into batched requests.
+
+        Args:
+            text (str): The text to classify.
+
+        Returns:
+            Moderation: The moderation result of the text.
+        """
+        if not isinstance(text, str):
+            raise ValueError("Text must be a string")
+        return await self._batcher.submit(text)
+
+    async def guarded_completions(
+        self,
+        chat_endpoint: ChatCompletionEndPoint,
+        message_list: MessageList,
+        substitution_dict: Optional[SubstitutionDict] = None,
+        cancel_on_flag: bool = True,
+        **kwargs,
+    ) -> Tuple[Optional[List[Message]], Optional[ChatCompletion], Moderation]:
+        """
+        Generate chat completions while the last user message is moderated, instead of moderating first.
+
+        Args:
+            chat_endpoint (ChatCompletionEndPoint): The endpoint generating the completions.
+            message_list (MessageList): The list of messages to use for generating completions.
+            substitution_dict (Optional[SubstitutionDict]): A dictionary for substituting variables in messages (optional).
+            cancel_on_flag (bool): Whether to cancel the completion when the message is flagged. Defaults to True.
+            **kwargs: Additional arguments to pass to `chat_endpoint.completions`.
+
+        Returns:
+            Tuple[Optional[List[Message]], Optional[ChatCompletion], Moderation]: The generated messages and
+            the ChatCompletion, both None if the completion was cancelled, and the moderation result.
+        """
+        text = last_user_message_view(message_list.to_dict(substitution_dict))
+        completion = asyncio.ensure_future(
+            chat_endpoint.completions(message_list, substitution_dict, **kwargs)
+        )
+        try:
+            moderation = await self.moderate(text)
+        except BaseException:
+            completion.cancel()
+            raise
+        if moderation.flagged and cancel_on_flag:
+            logger.info("User message flagged by moderation, cancelling completion")
+            completion.cancel()
+            return None, None, moderation
+        responses, res = await completion
+        return responses, res, moderation
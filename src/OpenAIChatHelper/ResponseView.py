@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Optional
+
+from openai.types.chat import ChatCompletion
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, dict):
+        return AttributeView(value)
+    if isinstance(value, list):
+        return [_wrap(item) for item in value]
+    return value
+
+
+class AttributeView:
+    """
+    Read-only attribute access over a decoded JSON object.
+
+    Missing keys read as None, like unset optional fields of the SDK's models.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict):
+        self._data = data
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _wrap(self._data.get(name))
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def to_dict(self) -> Dict:
+        return self._data
+
+    def __repr__(self) -> str:
+        return f"AttributeView({self._data!r})"
+
+
+class ChatCompletionView:
+    """
+    A light view of a chat completion response decoded straight from its JSON.
+
+    The ids, usage and other top-level fields are read from the decoded JSON without
+    building pydantic models. The full `ChatCompletion` is only built, once, when
+    `to_chat_completion` is called or an attribute the view does not know is read.
+    """
+
+    def __init__(self, data: Dict):
+        """
+        Initialize the ChatCompletionView.
+
+        Args:
+            data (Dict): The decoded JSON of the response.
+        """
+        self._data = data
+        self._completion: Optional[ChatCompletion] = None
+
+    @property
+    def data(self) -> Dict:
+        """The decoded JSON of the response."""
+        return self._data
+
+    @property
+    def id(self) -> str:
+        return self._data["id"]
+
+    @property
+    def model(self) -> str:
+        return self._data["model"]
+
+    @property
+    def created(self) -> int:
+        return self._data["created"]
+
+    @property
+    def system_fingerprint(self) -> Optional[str]:
+        return self._data.get("system_fingerprint")
+
+    @property
+    def choices(self) -> List[Dict]:
+        """The raw choices, as decoded from the JSON."""
+        return self._data.get("choices") or []
+
+    @property
+    def usage(self) -> Optional[AttributeView]:
+        """The token usage, with attribute access like `usage.prompt_tokens`."""
+        return _wrap(self._data.get("usage"))
+
+    def to_chat_completion(self) -> ChatCompletion:
+        """
+        Build the full ChatCompletion model from the response.
+
+        Returns:
+            ChatCompletion: The validated response, built on first use and cached.
+        """
+        if self._completion is None:
+            self._completion = ChatCompletion.model_validate(self._data)
+        return self._completion
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.to_chat_completion(), name)
+
+    def __repr__(self) -> str:
+        return f"ChatCompletionView(id={self._data.get('id')!r}, model={self._data.get('model')!r})"
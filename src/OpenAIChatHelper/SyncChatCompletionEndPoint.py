@@ -0,0 +1,139 @@
+from typing import List, Optional, Sequence, Tuple, Union
+import asyncio
+import time
+
+from openai.types.chat import ChatCompletion
+
+from .ChatCompletionEndPoint import ChatCompletionEndPoint
+from .message.Message import Message
+from .message.MessageList import MessageList
+from .message.SubstitutionDict import SubstitutionDict
+from .ResponseView import ChatCompletionView
+from .utils import BackgroundLoop, get_logger
+
+logger = get_logger(__name__)
+
+
+class SyncChatCompletionEndPoint(ChatCompletionEndPoint):
+    """
+    A ChatCompletionEndPoint with blocking methods for synchronous code.
+
+    Calls run on a long-lived background event loop instead of a new loop per call, so
+    the async client with its connection pool and the state of the traffic components
+    are reused. The blocking methods can be called from any number of threads.
+
+    Attributes:
+        _background_loop (BackgroundLoop): The loop the requests run on.
+
+    Methods:
+        completions_sync(message_list, substitution_dict=None, timeout=None, **kwargs):
+            Generate chat completions and block until they are returned.
+        completions_batch(message_lists, substitution_dicts=None, return_exceptions=False, timeout=None, **kwargs):
+            Generate chat completions for many message lists concurrently and block until all are returned.
+    """
+
+    def __init__(
+        self,
+        default_model: str,
+        organization: Optional[str] = None,
+        project_id: Optional[str] = None,
+        background_loop: Optional[BackgroundLoop] = None,
+        **kwargs,
+    ):
+        """
+        Initialize the SyncChatCompletionEndPoint instance.
+
+        Args:
+            default_model (str): The default model to use for chat completions.
+            organization (Optional[str]): The organization identifier (optional).
+            project_id (Optional[str]): The project ID (optional).
+            background_loop (Optional[BackgroundLoop]): The loop to run requests on. Defaults to the process-wide shared loop.
+            **kwargs: Additional arguments to pass to ChatCompletionEndPoint, such as `hedging_policy` or `scheduler`.
+        """
+        super().__init__(default_model, organization, project_id, **kwargs)
+        self._background_loop = (
+            background_loop if background_loop is not None else BackgroundLoop.shared()
+        )
+
+    @property
+    def background_loop(self) -> BackgroundLoop:
+        return self._background_loop
+
+    def completions_sync(
+        self,
+        message_list: MessageList,
+        substitution_dict: Optional[SubstitutionDict] = None,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Tuple[List[Message], Union[ChatCompletion, ChatCompletionView]]:
+        """
+        Generate chat completions and block until they are returned.
+
+        Args:
+            message_list (MessageList): The list of messages to use for generating completions.
+            substitution_dict (Optional[SubstitutionDict]): A dictionary for substituting variables in messages (optional).
+            timeout (Optional[float]): The number of seconds the call may take, passed to `completions` as its timeout. Defaults to no limit.
+            **kwargs: Additional arguments to pass to `completions`, such as its `deadline`.
+
+        Returns:
+            Tuple[List[Message], Union[ChatCompletion, ChatCompletionView]]: The generated messages and the response.
+
+        Raises:
+            DeadlineExceeded: If the timeout or deadline expires.
+        """
+        # the call enforces its own deadline, so waiting for it needs no limit
+        return self._background_loop.run(
+            self.completions(message_list, substitution_dict, timeout=timeout, **kwargs)
+        )
+
+    def completions_batch(
+        self,
+        message_lists: Sequence[MessageList],
+        substitution_dicts: Optional[Sequence[Optional[SubstitutionDict]]] = None,
+        return_exceptions: bool = False,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> List[
+        Union[
+            Tuple[List[Message], Union[ChatCompletion, ChatCompletionView]], Exception
+        ]
+    ]:
+        """
+        Generate chat completions for many message lists concurrently and block until all are returned.
+
+        Args:
+            message_lists (Sequence[MessageList]): The message lists to generate completions for.
+            substitution_dicts (Optional[Sequence[Optional[SubstitutionDict]]]): One substitution dictionary per message list (optional).
+            return_exceptions (bool): Whether a failed request returns its exception in place of its result instead of raising it. Defaults to False.
+            timeout (Optional[float]): The number of seconds the whole batch may take, a deadline shared by every call. Defaults to no limit.
+            **kwargs: Additional arguments to pass to `completions` for every message list, such as its `deadline`.
+
+        Returns:
+            List[Union[Tuple[List[Message], Union[ChatCompletion, ChatCompletionView]], Exception]]: The results, in the order of `message_lists`.
+
+        Raises:
+            ValueError: If `substitution_dicts` does not have one entry per message list.
+            DeadlineExceeded: If the timeout or deadline of a call expires, unless `return_exceptions` is set.
+        """
+        if timeout is not None:
+            expiry = time.monotonic() + timeout
+            deadline = kwargs.get("deadline")
+            kwargs["deadline"] = expiry if deadline is None else min(deadline, expiry)
+        if substitution_dicts is None:
+            substitution_dicts = [None] * len(message_lists)
+        elif len(substitution_dicts) != len(message_lists):
+            raise ValueError("substitution_dicts must have one entry per message list")
+
+        async def _batch():
+            return await asyncio.gather(
+                *[
+                    self.completions(message_list, substitution_dict, **kwargs)
+                    for message_list, substitution_dict in zip(
+                        message_lists, substitution_dicts
+                    )
+                ],
+                return_exceptions=return_exceptions,
+            )
+
+        logger.debug(f"Running a batch of {len(message_lists)} completions")
+        return list(self._background_loop.run(_batch()))
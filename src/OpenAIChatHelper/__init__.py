@@ -1,4 +1,12 @@
 from .message import *
 from .Config import *
 from .utils import *
+from .traffic import *
+from .vector import *
+from .tracing import *
+from .ResponseView import *
 from .ChatCompletionEndPoint import *
+from .SyncChatCompletionEndPoint import *
+from .DatasetRunner import *
+from .EmbeddingEndPoint import *
+from .ModerationEndPoint import *
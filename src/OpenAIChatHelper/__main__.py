@@ -0,0 +1,109 @@
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+
+from .ChatCompletionEndPoint import ChatCompletionEndPoint
+from .DatasetRunner import DatasetRunner, count_rows, load_template, read_dataset
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _parse_params(params: List[str]) -> Dict:
+    """Parse KEY=VALUE arguments, decoding values as JSON when possible."""
+    parsed = {}
+    for param in params:
+        key, sep, value = param.partition("=")
+        if not sep or not key:
+            raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got {param!r}")
+        try:
+            parsed[key] = json.loads(value)
+        except json.JSONDecodeError:
+            parsed[key] = value
+    return parsed
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m OpenAIChatHelper")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run = subparsers.add_parser(
+        "run",
+        help="Run a message list template over a JSONL or CSV dataset",
+        description="Fill a message list template with every row of a dataset, send the "
+        "requests with bounded concurrency and append the results to a JSONL file. "
+        "Rows recorded in the checkpoint log are skipped, so an interrupted run resumes "
+        "where it stopped.",
+    )
+    run.add_argument("--template", required=True, help="JSON file with the messages")
+    run.add_argument("--input", required=True, help="JSONL or CSV dataset")
+    run.add_argument("--output", required=True, help="JSONL file to append results to")
+    run.add_argument("--format", choices=["jsonl", "csv"], help="Dataset format")
+    run.add_argument("--checkpoint", help="Checkpoint log (default: OUTPUT.checkpoint)")
+    run.add_argument("--model", default="gpt-4o-mini", help="Model to use")
+    run.add_argument("--concurrency", type=int, default=8, help="Rows in flight")
+    run.add_argument("--retry", type=int, default=5, help="Attempts per row")
+    run.add_argument("--id-field", default="id", help="Row field identifying a row")
+    run.add_argument(
+        "--report-interval", type=float, default=10.0, help="Seconds between reports"
+    )
+    run.add_argument(
+        "--no-count",
+        action="store_true",
+        help="Do not count the rows up front, and report no ETA",
+    )
+    run.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Additional request parameter, VALUE is decoded as JSON if possible",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the command line interface.
+
+    Args:
+        argv (Optional[List[str]]): The arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        int: The exit code, 1 if any row failed.
+    """
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    try:
+        params = _parse_params(args.param)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    template = load_template(args.template)
+    endpoint = ChatCompletionEndPoint(args.model)
+    runner = DatasetRunner(
+        endpoint,
+        template,
+        args.output,
+        checkpoint_path=args.checkpoint,
+        concurrency=args.concurrency,
+        id_field=args.id_field,
+        report_interval=args.report_interval,
+        retry=args.retry,
+        **params,
+    )
+    total = None if args.no_count else count_rows(args.input, args.format)
+    try:
+        stats = asyncio.run(runner.run(read_dataset(args.input, args.format), total))
+    except KeyboardInterrupt:
+        logger.warning("Interrupted, rerun the same command to resume")
+        return 130
+    logger.info(
+        f"Completed {stats['completed']} rows, {stats['failed']} failed, "
+        f"{stats['skipped']} skipped in {stats['elapsed']:.1f}s"
+    )
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
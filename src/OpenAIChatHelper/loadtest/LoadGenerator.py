@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, Optional
+from collections import Counter
+import asyncio
+import random
+import time
+
+from ..ChatCompletionEndPoint import ChatCompletionEndPoint
+from ..message.MessageList import MessageList
+from ..traffic.AdaptiveConcurrency import error_kind
+from ..utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run_load(
+    endpoint: ChatCompletionEndPoint,
+    message_list: MessageList,
+    qps: float,
+    duration: float,
+    poisson: bool = True,
+    seed: Optional[int] = None,
+    **kwargs,
+) -> Dict[str, Any]:
+    """
+    Send requests at a target rate for a fixed time and report how the endpoint coped.
+
+    Requests are started on an open-loop schedule, independent of how fast earlier ones
+    finish, so a slow or failing upstream shows up as growing latency and failures
+    rather than as a lower request rate.
+
+    Args:
+        endpoint (ChatCompletionEndPoint): The endpoint to drive.
+        message_list (MessageList): The messages of every request.
+        qps (float): The target number of requests started per second.
+        duration (float): The number of seconds to keep starting requests.
+        poisson (bool): Whether the gaps between requests are exponentially distributed instead of constant. Defaults to True.
+        seed (Optional[int]): The seed of the arrival times (optional).
+        **kwargs: Additional arguments to pass to `completions`, such as `retry`.
+
+    Returns:
+        Dict[str, Any]: The numbers of sent, succeeded and failed requests, the failures by
+        error, the achieved throughput, the latency percentiles in seconds, and the attempts
+        retried by the endpoint by error.
+
+    Raises:
+        ValueError: If `qps` or `duration` is not positive.
+    """
+    if qps <= 0 or duration <= 0:
+        raise ValueError("qps and duration must be positive")
+    rng = random.Random(seed)
+    retries_before = Counter(endpoint.retry_counts)
+    latencies: List[float] = []
+    failures: Counter = Counter()
+
+    async def _one():
+        start = time.perf_counter()
+        try:
+            await endpoint.completions(message_list, **kwargs)
+        except Exception as e:
+            failures[error_kind(e)] += 1
+        else:
+            latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    start = time.perf_counter()
+    next_start = start
+    while next_start - start < duration:
+        delay = next_start - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(_one()))
+        next_start += rng.expovariate(qps) if poisson else 1 / qps
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    report = {
+        "sent": len(tasks),
+        "succeeded": len(latencies),
+        "failed": sum(failures.values()),
+        "failures": dict(failures),
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "latency": {
+            "p50": _percentile(latencies, 0.5),
+            "p90": _percentile(latencies, 0.9),
+            "p99": _percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else None,
+        },
+        "retries": dict(Counter(endpoint.retry_counts) - retries_before),
+    }
+    logger.info(
+        f"{report['succeeded']}/{report['sent']} requests succeeded, "
+        f"{report['throughput']:.1f} req/s, p50 {report['latency']['p50']}, "
+        f"p99 {report['latency']['p99']}"
+    )
+    return report
@@ -0,0 +1,339 @@
+from typing import Callable, Dict, Optional, Tuple
+from collections import Counter
+import asyncio
+import json
+import math
+import random
+import time
+
+from ..utils import get_logger
+
+logger = get_logger(__name__)
+
+LatencyDistribution = Callable[[random.Random], float]
+
+
+def constant_latency(seconds: float) -> LatencyDistribution:
+    """Return a latency distribution that always takes `seconds`."""
+    return lambda rng: seconds
+
+
+def uniform_latency(low: float, high: float) -> LatencyDistribution:
+    """Return a latency distribution uniform between `low` and `high` seconds."""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median: float, sigma: float = 0.5) -> LatencyDistribution:
+    """Return a log-normal latency distribution, whose long right tail resembles real APIs."""
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+def parse_latency(spec: str) -> LatencyDistribution:
+    """
+    Parse a latency distribution such as "constant:0.2", "uniform:0.1,0.5" or "lognormal:0.3,0.6".
+
+    Args:
+        spec (str): The name of the distribution and its parameters in seconds.
+
+    Returns:
+        LatencyDistribution: The distribution.
+
+    Raises:
+        ValueError: If the distribution is unknown or its parameters are invalid.
+    """
+    name, _, args = spec.partition(":")
+    factories = {
+        "constant": constant_latency,
+        "uniform": uniform_latency,
+        "lognormal": lognormal_latency,
+    }
+    if name not in factories:
+        raise ValueError(f"Unknown latency distribution: {name}")
+    try:
+        params = [float(arg) for arg in args.split(",") if arg]
+        return factories[name](*params)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid latency distribution {spec!r}: {e}")
+
+
+_REASONS = {
+    200: "OK",
+    404: "Not Found",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+class MockOpenAIServer:
+    """
+    A local HTTP server answering chat completion requests like the OpenAI API.
+
+    It is built on asyncio streams only and serves `POST .../chat/completions`, with or
+    without streaming. Every request first waits for a time drawn from the latency
+    distribution, then generates `completion_tokens` tokens per choice at
+    `tokens_per_second`. A fraction of requests fail with a 429 or 500 response, or hang
+    until the client times out.
+
+    Example:
+        >>> async with MockOpenAIServer(fault_429=0.1) as server:
+        ...     endpoint = ChatCompletionEndPoint("mock", base_url=server.base_url)
+    """
+
+    def __init__(
+        self,
+        latency: LatencyDistribution = constant_latency(0.0),
+        tokens_per_second: Optional[float] = None,
+        completion_tokens: int = 16,
+        fault_429: float = 0.0,
+        fault_500: float = 0.0,
+        fault_timeout: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize the MockOpenAIServer.
+
+        Args:
+            latency (LatencyDistribution): The distribution of the time before the first token. Defaults to none.
+            tokens_per_second (Optional[float]): The generation speed of every choice. Defaults to instant.
+            completion_tokens (int): The number of tokens generated per choice. Defaults to 16.
+            fault_429 (float): The fraction of requests answered with a 429 rate limit error. Defaults to 0.
+            fault_500 (float): The fraction of requests answered with a 500 server error. Defaults to 0.
+            fault_timeout (float): The fraction of requests that are never answered. Defaults to 0.
+            host (str): The host to listen on. Defaults to "127.0.0.1".
+            port (int): The port to listen on. Defaults to a free port.
+            seed (Optional[int]): The seed of the latency and fault draws (optional).
+
+        Raises:
+            ValueError: If the fault fractions are negative or sum to more than 1, or a count or rate is not positive.
+        """
+        if min(fault_429, fault_500, fault_timeout) < 0:
+            raise ValueError("Fault fractions must not be negative")
+        if fault_429 + fault_500 + fault_timeout > 1:
+            raise ValueError("Fault fractions must not sum to more than 1")
+        if completion_tokens < 1:
+            raise ValueError("completion_tokens must be positive")
+        if tokens_per_second is not None and tokens_per_second <= 0:
+            raise ValueError("tokens_per_second must be positive")
+        self._latency = latency
+        self._tokens_per_second = tokens_per_second
+        self._completion_tokens = completion_tokens
+        self._faults = (
+            (fault_429, "429"),
+            (fault_500, "500"),
+            (fault_timeout, "timeout"),
+        )
+        self._host = host
+        self._port = port
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._closing: Optional[asyncio.Event] = None
+        self.requests = 0
+        self.outcomes: Counter = Counter()
+
+    @property
+    def base_url(self) -> str:
+        """The base URL to pass to an endpoint, once started."""
+        if self._server is None:
+            raise RuntimeError("The server is not started")
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    async def start(self) -> "MockOpenAIServer":
+        """Start listening."""
+        self._closing = asyncio.Event()
+        self._server = await asyncio.start_server(
+            self._handle_connection, self._host, self._port
+        )
+        logger.debug(f"Mock OpenAI server listening on {self.base_url}")
+        return self
+
+    async def close(self) -> None:
+        """Stop listening and drop all connections, including hung requests."""
+        if self._server is not None:
+            self._server.close()
+            self._closing.set()
+            tasks = list(self._connections.values())
+            for writer in list(self._connections):
+                writer.close()
+            if tasks:
+                await asyncio.wait(tasks)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "MockOpenAIServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _draw_fault(self) -> Optional[str]:
+        draw = self._rng.random()
+        for fraction, fault in self._faults:
+            if draw < fraction:
+                return fault
+            draw -= fraction
+        return None
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return method, path, headers, body
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                await self._handle_request(writer, method, path, body)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            del self._connections[writer]
+            writer.close()
+
+    @staticmethod
+    def _write_response(
+        writer: asyncio.StreamWriter, status: int, payload: Dict, headers: str = ""
+    ) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n{headers}\r\n".encode() + body
+        )
+
+    @staticmethod
+    def _error(message: str, error_type: str) -> Dict:
+        return {"error": {"message": message, "type": error_type, "code": None}}
+
+    async def _handle_request(
+        self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes
+    ) -> None:
+        if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+            self._write_response(
+                writer, 404, self._error("Not found", "invalid_request_error")
+            )
+            await writer.drain()
+            return
+        self.requests += 1
+        request = json.loads(body)
+        fault = self._draw_fault()
+        await asyncio.sleep(self._latency(self._rng))
+        if fault is not None:
+            self.outcomes[fault] += 1
+        if fault == "timeout":
+            # never answer, the client gives up
+            await self._closing.wait()
+            return
+        if fault == "429":
+            self._write_response(
+                writer,
+                429,
+                self._error("Rate limit reached", "rate_limit_exceeded"),
+                "Retry-After: 0\r\n",
+            )
+        elif fault == "500":
+            self._write_response(
+                writer, 500, self._error("Server error", "server_error")
+            )
+        elif request.get("stream"):
+            await self._stream(writer, request)
+            self.outcomes["200"] += 1
+            return
+        else:
+            await self._generate_delay()
+            self._write_response(writer, 200, self._completion(request))
+            self.outcomes["200"] += 1
+        await writer.drain()
+
+    async def _generate_delay(self) -> None:
+        if self._tokens_per_second is not None:
+            await asyncio.sleep(self._completion_tokens / self._tokens_per_second)
+
+    def _usage(self, request: Dict) -> Dict:
+        prompt_tokens = len(json.dumps(request.get("messages", []))) // 4
+        completion_tokens = self._completion_tokens * request.get("n", 1)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _completion(self, request: Dict) -> Dict:
+        text = " ".join(["token"] * self._completion_tokens)
+        return {
+            "id": f"chatcmpl-mock{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [
+                {
+                    "index": index,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": text},
+                }
+                for index in range(request.get("n", 1))
+            ],
+            "usage": self._usage(request),
+        }
+
+    async def _stream(self, writer: asyncio.StreamWriter, request: Dict) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        chunk_id = f"chatcmpl-mock{self.requests}"
+        choices = range(request.get("n", 1))
+
+        def _send(payload) -> None:
+            data = b"data: " + (
+                payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            )
+            data += b"\n\n"
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+        def _chunk(delta: Dict, finish_reason: Optional[str] = None) -> Dict:
+            return {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [
+                    {"index": index, "delta": delta, "finish_reason": finish_reason}
+                    for index in choices
+                ],
+            }
+
+        _send(_chunk({"role": "assistant", "content": ""}))
+        for token in range(self._completion_tokens):
+            if self._tokens_per_second is not None:
+                await asyncio.sleep(1 / self._tokens_per_second)
+            _send(_chunk({"content": "token" if token == 0 else " token"}))
+            await writer.drain()
+        _send(_chunk({}, "stop"))
+        _send(b"[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
@@ -0,0 +1,2 @@
+from .MockServer import *
+from .LoadGenerator import run_load
@@ -0,0 +1,106 @@
+from typing import List, Optional
+import argparse
+import asyncio
+import json
+import os
+
+from ..ChatCompletionEndPoint import ChatCompletionEndPoint
+from ..message.Contents import TextContent
+from ..message.Message import DevSysUserMessage
+from ..message.MessageList import MessageList
+from .LoadGenerator import run_load
+from .MockServer import MockOpenAIServer, parse_latency
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m OpenAIChatHelper.loadtest",
+        description="Drive ChatCompletionEndPoint at a target rate against a local mock "
+        "server with injected faults, or against --base-url, and print a JSON report.",
+    )
+    parser.add_argument("--qps", type=float, default=20.0, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--retry", type=int, default=3, help="Attempts per request")
+    parser.add_argument(
+        "--timeout", type=float, default=5.0, help="HTTP timeout per attempt"
+    )
+    parser.add_argument("--model", default="mock", help="Model name to send")
+    parser.add_argument("--base-url", help="Use this API instead of the mock server")
+    parser.add_argument(
+        "--latency",
+        default="lognormal:0.2,0.5",
+        help='Mock time to first token: "constant:S", "uniform:LOW,HIGH" or "lognormal:MEDIAN,SIGMA"',
+    )
+    parser.add_argument("--tokens-per-second", type=float, help="Mock generation speed")
+    parser.add_argument(
+        "--completion-tokens", type=int, default=16, help="Mock tokens per choice"
+    )
+    parser.add_argument("--fault-429", type=float, default=0.0, help="Mock 429 rate")
+    parser.add_argument("--fault-500", type=float, default=0.0, help="Mock 500 rate")
+    parser.add_argument(
+        "--fault-timeout", type=float, default=0.0, help="Mock unanswered rate"
+    )
+    parser.add_argument("--seed", type=int, help="Seed of the mock and the arrivals")
+    return parser
+
+
+async def _main(args: argparse.Namespace) -> dict:
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = await MockOpenAIServer(
+            latency=parse_latency(args.latency),
+            tokens_per_second=args.tokens_per_second,
+            completion_tokens=args.completion_tokens,
+            fault_429=args.fault_429,
+            fault_500=args.fault_500,
+            fault_timeout=args.fault_timeout,
+            seed=args.seed,
+        ).start()
+        base_url = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock")
+    try:
+        # retries are done by the endpoint, so they show up in its retry breakdown
+        endpoint = ChatCompletionEndPoint(
+            args.model, base_url=base_url, max_retries=0, timeout=args.timeout
+        )
+        message_list = MessageList()
+        message_list.add_message(
+            DevSysUserMessage("user", TextContent("Write a short sentence."))
+        )
+        report = await run_load(
+            endpoint,
+            message_list,
+            args.qps,
+            args.duration,
+            seed=args.seed,
+            retry=args.retry,
+        )
+        if server is not None:
+            report["server"] = {
+                "requests": server.requests,
+                "outcomes": dict(server.outcomes),
+            }
+        return report
+    finally:
+        if server is not None:
+            await server.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the load test and print its report.
+
+    Args:
+        argv (Optional[List[str]]): The arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        int: The exit code.
+    """
+    args = _build_parser().parse_args(argv)
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+from typing import Dict, Literal, Optional, Tuple
+import sys
+import threading
+import weakref
+
+from .Contents import AudioContent, Content, ImageContent, RefusalContent, TextContent
+from .Message import Message
+from .MessageList import MessageList
+from .SpillingMessageList import SpillingMessageList
+
+
+def _payload(content: Content) -> Optional[Tuple]:
+    """Return the fields identifying a content, or None for content types that are not interned."""
+    content_type = type(content)
+    if content_type is TextContent:
+        return (content.text,)
+    if content_type is ImageContent:
+        return (content.image_url, content.image_details)
+    if content_type is AudioContent:
+        return (content.audio_data, content.audio_format)
+    if content_type is RefusalContent:
+        return (content.refusal,)
+    return None
+
+
+class ContentInterner:
+    """
+    A flyweight store sharing one Content object per distinct payload.
+
+    Contents are looked up by their type and payload, so a document, data URL or audio
+    string attached to many message lists is held once. Content objects are immutable,
+    so sharing them is safe. The store only holds weak references: an entry disappears
+    as soon as no message uses its content anymore.
+    """
+
+    def __init__(self):
+        """Initialize an empty ContentInterner."""
+        self._contents: "weakref.WeakValueDictionary[Tuple, Content]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def __len__(self) -> int:
+        """Return the number of distinct contents still in use."""
+        return len(self._contents)
+
+    def intern(self, content: Content) -> Content:
+        """
+        Return the shared content equal to `content`, storing `content` if there is none.
+
+        Args:
+            content (Content): The content.
+
+        Returns:
+            Content: The shared content, or `content` itself if it is the first of its payload or of a custom type.
+        """
+        payload = _payload(content)
+        if payload is None:
+            return content
+        key = (type(content), payload)
+        with self._lock:
+            shared = self._contents.get(key)
+            if shared is None:
+                self._contents[key] = content
+                self.misses += 1
+                return content
+            self.hits += 1
+        return shared
+
+    def text(self, text: str) -> TextContent:
+        """Return the shared TextContent of `text`."""
+        return self.intern(TextContent(text))
+
+    def image(
+        self,
+        image_url: str,
+        image_details: Optional[Literal["low", "high", "auto"]] = None,
+    ) -> ImageContent:
+        """Return the shared ImageContent of `image_url` and `image_details`."""
+        return self.intern(ImageContent(image_url, image_details))
+
+    def audio(
+        self, audio_data: str, audio_format: Literal["mp3", "wav"]
+    ) -> AudioContent:
+        """Return the shared AudioContent of `audio_data` and `audio_format`."""
+        return self.intern(AudioContent(audio_data, audio_format))
+
+    def intern_message(self, message: Message) -> Message:
+        """
+        Replace the content items of a message by their shared copies, in place.
+
+        Only here are duplicates known to be dropped, so only here do they count
+        towards `bytes_saved`.
+
+        Args:
+            message (Message): The message.
+
+        Returns:
+            Message: The same message.
+        """
+        content = message.content
+        if content is None:
+            return message
+        saved = 0
+        for index, item in enumerate(content):
+            shared = self.intern(item)
+            if shared is not item:
+                # the duplicate strings can now be freed
+                saved += sum(
+                    sys.getsizeof(value)
+                    for value, kept in zip(_payload(item), _payload(shared))
+                    if isinstance(value, str) and value is not kept
+                )
+                content[index] = shared
+        if saved:
+            with self._lock:
+                self.bytes_saved += saved
+        return message
+
+    def intern_message_list(self, message_list: MessageList) -> MessageList:
+        """
+        Replace the content items of all messages of a list by their shared copies, in place.
+
+        The spilled messages of a SpillingMessageList are skipped: they are rebuilt from
+        disk on every access, so there is nothing in memory to share.
+
+        Args:
+            message_list (MessageList): The message list.
+
+        Returns:
+            MessageList: The same message list.
+        """
+        start = (
+            message_list.spilled if isinstance(message_list, SpillingMessageList) else 0
+        )
+        for index in range(start, len(message_list)):
+            self.intern_message(message_list[index])
+        return message_list
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the effect of the store.
+
+        Returns:
+            Dict[str, int]: The number of distinct contents in use, the lookups that found a shared content and those that did not, and the bytes of duplicate strings replaced in messages.
+        """
+        return {
+            "contents": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_saved": self.bytes_saved,
+        }
@@ -1,4 +1,4 @@
-from typing import Dict, Optional, Literal, List
+from typing import Dict, Optional, Literal, List, Union
 from .SubstitutionDict import SubstitutionDict
 from ..utils import remove_markdown, split_ordered_list
 
@@ -13,6 +13,15 @@ class Content:
     def content_type(self) -> str:
         return self._content_type
 
+    def validate(self) -> None:
+        """
+        Check the content, e.g. after building it with `from_trusted`.
+
+        Raises:
+            ValueError: If the content is invalid.
+        """
+        return None
+
     def to_dict(
         self, substitution_dict: Optional[SubstitutionDict] = SubstitutionDict()
     ) -> Dict:
@@ -46,9 +55,20 @@ class TextContent(Content):
             ValueError: If `text` is not a string.
         """
         super().__init__("text")
-        if not isinstance(text, str):
-            raise ValueError("Text must be a string")
         self._text = text
+        self.validate()
+
+    @classmethod
+    def from_trusted(cls, text: str) -> "TextContent":
+        """Build TextContent from trusted data without validating it."""
+        content = cls.__new__(cls)
+        content._content_type = "text"
+        content._text = text
+        return content
+
+    def validate(self) -> None:
+        if not isinstance(self._text, str):
+            raise ValueError("Text must be a string")
 
     @property
     def text(self) -> str:
@@ -117,14 +137,30 @@ class ImageContent(Content):
             ValueError: If `image_url` is not a string or `image_details` is invalid.
         """
         super().__init__("image")
-        if not isinstance(image_url, str):
+        self._image_url = image_url
+        self._image_details = image_details
+        self.validate()
+
+    @classmethod
+    def from_trusted(
+        cls,
+        image_url: str,
+        image_details: Optional[Literal["low", "high", "auto"]] = None,
+    ) -> "ImageContent":
+        """Build ImageContent from trusted data without validating it."""
+        content = cls.__new__(cls)
+        content._content_type = "image"
+        content._image_url = image_url
+        content._image_details = image_details
+        return content
+
+    def validate(self) -> None:
+        if not isinstance(self._image_url, str):
             raise ValueError("Image URL must be a string")
-        if image_details not in {None, "low", "high", "auto"}:
+        if self._image_details not in {None, "low", "high", "auto"}:
             raise ValueError(
                 "Invalid image details; if provided, must be 'low', 'high', or 'auto'"
             )
-        self._image_url = image_url
-        self._image_details = image_details
 
     @property
     def image_url(self) -> str:
@@ -164,12 +200,26 @@ class AudioContent(Content):
             ValueError: If `audio_data` is not a string or `audio_format` is invalid.
         """
         super().__init__("audio")
-        if not isinstance(audio_data, str):
-            raise ValueError("Audio data must be a string")
-        if audio_format not in {"mp3", "wav"}:
-            raise ValueError("Invalid audio format; must be 'mp3' or 'wav'")
         self._audio_data = audio_data
         self._audio_format = audio_format
+        self.validate()
+
+    @classmethod
+    def from_trusted(
+        cls, audio_data: str, audio_format: Literal["mp3", "wav"]
+    ) -> "AudioContent":
+        """Build AudioContent from trusted data without validating it."""
+        content = cls.__new__(cls)
+        content._content_type = "audio"
+        content._audio_data = audio_data
+        content._audio_format = audio_format
+        return content
+
+    def validate(self) -> None:
+        if not isinstance(self._audio_data, str):
+            raise ValueError("Audio data must be a string")
+        if self._audio_format not in {"mp3", "wav"}:
+            raise ValueError("Invalid audio format; must be 'mp3' or 'wav'")
 
     @property
     def audio_data(self) -> str:
@@ -205,9 +255,20 @@ class RefusalContent(Content):
             ValueError: If `refusal` is not a string.
         """
         super().__init__("refusal")
-        if not isinstance(refusal, str):
-            raise ValueError("Refusal must be a string")
         self._refusal = refusal
+        self.validate()
+
+    @classmethod
+    def from_trusted(cls, refusal: str) -> "RefusalContent":
+        """Build RefusalContent from trusted data without validating it."""
+        content = cls.__new__(cls)
+        content._content_type = "refusal"
+        content._refusal = refusal
+        return content
+
+    def validate(self) -> None:
+        if not isinstance(self._refusal, str):
+            raise ValueError("Refusal must be a string")
 
     @property
     def refusal(self) -> str:
@@ -223,3 +284,63 @@ class RefusalContent(Content):
 
     def __repr__(self):
         return f"\033[36mRefusal:\033[0m {self._refusal}".replace("\n", "\n" + " " * 9)
+
+
+def get_content_from_dict(
+    content_dict: Union[Dict, str], validate: bool = True
+) -> Content:
+    """Build a Content object from its `to_dict` representation.
+
+    Args:
+        content_dict (Union[Dict, str]): The dictionary representation of the content, or a string for text content.
+        validate (bool, optional): Whether to validate the content. Pass False for trusted data, such as content stored by this package. Defaults to True.
+
+    Returns:
+        Content: The Content object.
+
+    Raises:
+        ValueError: If the content type is unknown, or the content is invalid and `validate` is True.
+    """
+    if isinstance(content_dict, str):
+        return (
+            TextContent(content_dict)
+            if validate
+            else TextContent.from_trusted(content_dict)
+        )
+    content_type = content_dict.get("type")
+    if content_type == "text":
+        args = (content_dict["text"],)
+        cls = TextContent
+    elif content_type == "image_url":
+        image = content_dict["image_url"]
+        args = (image["url"], image.get("detail"))
+        cls = ImageContent
+    elif content_type == "input_audio":
+        audio = content_dict["input_audio"]
+        args = (audio["data"], audio["format"])
+        cls = AudioContent
+    elif content_type == "refusal":
+        args = (content_dict["refusal"],)
+        cls = RefusalContent
+    else:
+        raise ValueError(f"Invalid content type: {content_type}")
+    return cls(*args) if validate else cls.from_trusted(*args)
+
+
+def get_dict_from_content(content: Content) -> Dict:
+    """Convert a Content object to its `to_dict` representation without substituting anything.
+
+    Unlike `to_dict`, the text is kept verbatim, so `get_content_from_dict` restores the same content.
+
+    Args:
+        content (Content): The content.
+
+    Returns:
+        Dict: The dictionary representation of the content.
+    """
+    if isinstance(content, TextContent):
+        return {"type": "text", "text": content.text}
+    if isinstance(content, RefusalContent):
+        return {"type": "refusal", "refusal": content.refusal}
+    # images and audio are never substituted
+    return content.to_dict()
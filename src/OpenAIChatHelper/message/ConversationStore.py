@@ -0,0 +1,474 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+import asyncio
+import functools
+import itertools
+import sqlite3
+import threading
+import time
+import weakref
+
+from .Message import Message, get_dict_from_message
+from .MessageList import MessageList
+from ..utils import get_logger, json_dumps, json_loads
+
+logger = get_logger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS conversations (id TEXT PRIMARY KEY, created REAL, updated REAL)",
+    "CREATE TABLE IF NOT EXISTS metadata (conversation_id TEXT, key TEXT, value, "
+    "PRIMARY KEY (conversation_id, key)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS metadata_key_value ON metadata (key, value)",
+    "CREATE TABLE IF NOT EXISTS turns (conversation_id TEXT, position INTEGER, "
+    "timestamp REAL, role TEXT, data BLOB, PRIMARY KEY (conversation_id, position)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS turns_timestamp ON turns (conversation_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS turns_role ON turns (conversation_id, role, position)",
+)
+
+
+class ConversationStore:
+    """
+    A persistent store of conversations in SQLite.
+
+    Every message of a conversation is an append-only turn indexed by the conversation
+    id, its position, its timestamp and its role, so the last turns of a long
+    conversation are loaded without reading its history. Loaded messages were validated
+    when appended and are rebuilt without validating them again. Conversations carry
+    key-value metadata that can be searched.
+
+    Appended turns are buffered and written in batches. Inside a running event loop, a
+    batch is written by the loop's default executor once it holds `batch_size` turns or
+    `flush_interval` seconds after its first turn, so appending never blocks the loop on
+    disk I/O. Outside of an event loop, a full batch is written on the spot. Reads and
+    `close` write the pending turns first and block on disk I/O; inside an event loop,
+    use `aload`, `afind` and `aexport`, which run in the loop's default executor. A store
+    supports a single writer process.
+    """
+
+    def __init__(self, path: str, batch_size: int = 64, flush_interval: float = 0.05):
+        """
+        Open or create a ConversationStore.
+
+        Args:
+            path (str): The SQLite file of the store.
+            batch_size (int): The number of buffered turns that triggers a write. Defaults to 64.
+            flush_interval (float): The maximum number of seconds a turn stays buffered inside an event loop. Defaults to 0.05.
+
+        Raises:
+            ValueError: If `batch_size` is not positive or `flush_interval` is negative.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        if flush_interval < 0:
+            raise ValueError("flush_interval must not be negative")
+        self._path = path
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, int, float, str, bytes]] = []
+        # the number of turns of every conversation seen, including pending ones
+        self._lengths: Dict[str, int] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+        # the message lists loaded without some of their turns, which `save` rejects
+        self._partial: "weakref.WeakSet[MessageList]" = weakref.WeakSet()
+        self._flushes: Set[asyncio.Future] = set()
+        self._closed = False
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _length(self, conversation_id: str) -> int:
+        length = self._lengths.get(conversation_id)
+        if length is None:
+            row = self._db.execute(
+                "SELECT MAX(position) FROM turns WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+            length = self._lengths[conversation_id] = (
+                0 if row[0] is None else row[0] + 1
+            )
+        return length
+
+    def __len__(self) -> int:
+        """Return the number of conversations with turns or metadata, writing the buffered turns first."""
+        self.flush()
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def count_turns(self, conversation_id: str) -> int:
+        """Return the number of turns of a conversation."""
+        with self._lock:
+            return self._length(conversation_id)
+
+    def append(
+        self,
+        conversation_id: str,
+        messages: Union[Message, Iterable[Message]],
+        timestamp: Optional[float] = None,
+    ) -> int:
+        """
+        Append turns to a conversation.
+
+        Args:
+            conversation_id (str): The id of the conversation, created on its first turn.
+            messages (Union[Message, Iterable[Message]]): The message or messages to append.
+            timestamp (Optional[float]): The UNIX time of the turns. Defaults to now.
+
+        Returns:
+            int: The number of turns of the conversation.
+
+        Raises:
+            ValueError: If a message is not a Message object.
+            RuntimeError: If the store is closed.
+        """
+        if isinstance(messages, Message):
+            messages = [messages]
+        rows = []
+        for message in messages:
+            if not isinstance(message, Message):
+                raise ValueError("message must be a Message object")
+            rows.append((message.role, json_dumps(get_dict_from_message(message))))
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ConversationStore is closed")
+            start = self._length(conversation_id)
+            self._pending.extend(
+                (conversation_id, start + offset, timestamp, role, data)
+                for offset, (role, data) in enumerate(rows)
+            )
+            length = self._lengths[conversation_id] = start + len(rows)
+            pending = len(self._pending)
+        self._schedule_flush(pending)
+        return length
+
+    def save(self, conversation_id: str, message_list: MessageList) -> int:
+        """
+        Append the messages of a full conversation that are not stored yet.
+
+        A list loaded with `last_n`, `role` or `since` lacks turns of the conversation,
+        so its new messages cannot be told apart; pass them to `append` instead.
+
+        Args:
+            conversation_id (str): The id of the conversation.
+            message_list (MessageList): All messages of the conversation, starting with its first turn.
+
+        Returns:
+            int: The number of appended turns.
+
+        Raises:
+            ValueError: If the list was loaded partially or has fewer messages than the stored conversation.
+        """
+        if message_list in self._partial:
+            raise ValueError(
+                "The message list was loaded partially, append its new messages instead"
+            )
+        stored = self.count_turns(conversation_id)
+        if len(message_list) < stored:
+            raise ValueError(
+                f"The message list has {len(message_list)} messages but the conversation "
+                f"has {stored} turns, append its new messages instead"
+            )
+        new_messages = [message_list[i] for i in range(stored, len(message_list))]
+        if new_messages:
+            self.append(conversation_id, new_messages)
+        return len(new_messages)
+
+    def _schedule_flush(self, pending: int) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            if pending >= self._batch_size:
+                self.flush()
+            return
+        if pending >= self._batch_size:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._flush_in_background(loop)
+        elif self._timer is None or self._timer_loop is not loop:
+            # a timer of a loop that ended before it fired never runs
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = loop.call_later(
+                self._flush_interval, self._flush_in_background, loop
+            )
+            self._timer_loop = loop
+
+    def _flush_in_background(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._timer = None
+        future = loop.run_in_executor(None, self.flush)
+        self._flushes.add(future)
+        future.add_done_callback(self._flush_done)
+
+    def _flush_done(self, future: asyncio.Future) -> None:
+        self._flushes.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Failed to write conversation turns: {future.exception()}")
+
+    def flush(self) -> None:
+        """Write the buffered turns now."""
+        with self._lock:
+            if self._closed or not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO conversations VALUES (?, ?, ?)",
+                    ((row[0], row[2], row[2]) for row in batch),
+                )
+                self._db.executemany("INSERT INTO turns VALUES (?, ?, ?, ?, ?)", batch)
+                self._db.executemany(
+                    "UPDATE conversations SET updated = MAX(updated, ?) WHERE id = ?",
+                    ((row[2], row[0]) for row in batch),
+                )
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                self._pending = batch + self._pending
+                raise
+
+    async def aflush(self) -> None:
+        """Write the buffered turns from the loop's default executor, waiting for running writes."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def load(
+        self,
+        conversation_id: str,
+        last_n: Optional[int] = None,
+        role: Optional[str] = None,
+        since: Optional[float] = None,
+    ) -> MessageList:
+        """
+        Rebuild the messages of a conversation.
+
+        Args:
+            conversation_id (str): The id of the conversation.
+            last_n (Optional[int]): The number of most recent turns to load. Defaults to all turns.
+            role (Optional[str]): Only load turns of this role (optional).
+            since (Optional[float]): Only load turns appended at or after this UNIX time (optional).
+
+        Returns:
+            MessageList: The turns in their order, empty for an unknown conversation.
+
+        Raises:
+            ValueError: If `last_n` is negative.
+        """
+        if last_n is not None and last_n < 0:
+            raise ValueError("last_n must not be negative")
+        self.flush()
+        query = "SELECT data FROM turns WHERE conversation_id = ?"
+        params: List[Any] = [conversation_id]
+        if role is not None:
+            query += " AND role = ?"
+            params.append(role)
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        query += " ORDER BY position DESC"
+        if last_n is not None:
+            query += " LIMIT ?"
+            params.append(last_n)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        message_list = MessageList()
+        message_list.extend_trusted(json_loads(data) for (data,) in reversed(rows))
+        if last_n is not None or role is not None or since is not None:
+            self._partial.add(message_list)
+        return message_list
+
+    async def _run_in_executor(
+        self, function: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(function, *args, **kwargs)
+        )
+
+    async def aload(
+        self,
+        conversation_id: str,
+        last_n: Optional[int] = None,
+        role: Optional[str] = None,
+        since: Optional[float] = None,
+    ) -> MessageList:
+        """`load` from the loop's default executor, without blocking the event loop."""
+        return await self._run_in_executor(
+            self.load, conversation_id, last_n=last_n, role=role, since=since
+        )
+
+    def set_metadata(self, conversation_id: str, **metadata: Any) -> None:
+        """
+        Set metadata of a conversation, creating the conversation if needed.
+
+        Args:
+            conversation_id (str): The id of the conversation.
+            **metadata (Any): The keys and values to set. A value must be a string, number or None; None removes the key.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO conversations VALUES (?, ?, ?)",
+                (conversation_id, now, now),
+            )
+            self._db.executemany(
+                "DELETE FROM metadata WHERE conversation_id = ? AND key = ?",
+                (
+                    (conversation_id, key)
+                    for key, value in metadata.items()
+                    if value is None
+                ),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?)",
+                (
+                    (conversation_id, key, value)
+                    for key, value in metadata.items()
+                    if value is not None
+                ),
+            )
+            self._db.commit()
+
+    def get_metadata(self, conversation_id: str) -> Dict[str, Any]:
+        """Return the metadata of a conversation."""
+        with self._lock:
+            return dict(
+                self._db.execute(
+                    "SELECT key, value FROM metadata WHERE conversation_id = ?",
+                    (conversation_id,),
+                )
+            )
+
+    def find(
+        self,
+        updated_since: Optional[float] = None,
+        limit: Optional[int] = None,
+        **metadata: Any,
+    ) -> List[str]:
+        """
+        Search conversations by metadata.
+
+        Args:
+            updated_since (Optional[float]): Only return conversations with a turn or metadata change at or after this UNIX time (optional).
+            limit (Optional[int]): The maximum number of ids to return (optional).
+            **metadata (Any): The metadata values the conversations must all have.
+
+        Returns:
+            List[str]: The ids of the matching conversations, most recently updated first.
+        """
+        self.flush()
+        query = "SELECT id FROM conversations AS c WHERE 1"
+        params: List[Any] = []
+        for key, value in metadata.items():
+            query += (
+                " AND EXISTS (SELECT 1 FROM metadata WHERE conversation_id = c.id"
+                " AND key = ? AND value = ?)"
+            )
+            params.extend((key, value))
+        if updated_since is not None:
+            query += " AND updated >= ?"
+            params.append(updated_since)
+        query += " ORDER BY updated DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._db.execute(query, params)]
+
+    async def afind(
+        self,
+        updated_since: Optional[float] = None,
+        limit: Optional[int] = None,
+        **metadata: Any,
+    ) -> List[str]:
+        """`find` from the loop's default executor, without blocking the event loop."""
+        return await self._run_in_executor(
+            self.find, updated_since=updated_since, limit=limit, **metadata
+        )
+
+    def export(
+        self, path: str, conversation_ids: Optional[Iterable[str]] = None
+    ) -> int:
+        """
+        Write conversations to a JSON Lines file, one conversation per line.
+
+        Every line holds the `id`, the `metadata` and the `messages` of a conversation,
+        the messages in their `to_dict` representation. Turns are streamed from the
+        database, so the export does not hold the whole store in memory.
+
+        Args:
+            path (str): The file to write.
+            conversation_ids (Optional[Iterable[str]]): The conversations to export. Defaults to all conversations.
+
+        Returns:
+            int: The number of exported conversations.
+        """
+        self.flush()
+        if conversation_ids is None:
+            with self._lock:
+                conversation_ids = [
+                    row[0]
+                    for row in self._db.execute(
+                        "SELECT id FROM conversations ORDER BY id"
+                    )
+                ]
+        count = 0
+        with open(path, "wb") as f:
+            for conversation_id in conversation_ids:
+                with self._lock:
+                    rows = self._db.execute(
+                        "SELECT data FROM turns WHERE conversation_id = ? ORDER BY position",
+                        (conversation_id,),
+                    ).fetchall()
+                    metadata = dict(
+                        self._db.execute(
+                            "SELECT key, value FROM metadata WHERE conversation_id = ?",
+                            (conversation_id,),
+                        )
+                    )
+                # the stored turns are JSON already, splice them in as they are
+                f.write(
+                    b'{"id":'
+                    + json_dumps(conversation_id)
+                    + b',"metadata":'
+                    + json_dumps(metadata)
+                    + b',"messages":['
+                    + b",".join(itertools.chain.from_iterable(rows))
+                    + b"]}\n"
+                )
+                count += 1
+        return count
+
+    async def aexport(
+        self, path: str, conversation_ids: Optional[Iterable[str]] = None
+    ) -> int:
+        """`export` from the loop's default executor, without blocking the event loop."""
+        return await self._run_in_executor(self.export, path, conversation_ids)
+
+    def close(self) -> None:
+        """Write the buffered turns and close the store."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.flush()
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._db.close()
+
+    def __enter__(self) -> "ConversationStore":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
@@ -1,7 +1,13 @@
 from typing import Dict, Optional, Literal, List, Union
 from openai.types.chat.chat_completion_message import ChatCompletionMessage
 from .SubstitutionDict import SubstitutionDict
-from .Contents import Content, RefusalContent, TextContent
+from .Contents import (
+    Content,
+    RefusalContent,
+    TextContent,
+    get_content_from_dict,
+    get_dict_from_content,
+)
 from .ToolCall import ToolCall, get_tool_call_from_dict
 
 
@@ -14,17 +20,43 @@ class Message:
         content: Optional[List[Content]] = None,
         name: Optional[str] = None,
     ):
-        if role not in {"user", "system", "assistant", "developer", "tool"}:
+        self._role = role
+        self._name = name
+        self._content = content
+        self._check()
+
+    @classmethod
+    def _new_trusted(
+        cls, role: str, content: Optional[List[Content]], name: Optional[str]
+    ) -> "Message":
+        """Create a message of this class without running any constructor or check."""
+        message = cls.__new__(cls)
+        message._role = role
+        message._name = name
+        message._content = content
+        return message
+
+    def _check(self) -> None:
+        """Check the fields of the message, but not the content items themselves."""
+        if self._role not in {"user", "system", "assistant", "developer", "tool"}:
             raise ValueError(
-                f"Invalid role: {role}, must be one of 'user', 'system', 'assistant', 'developer', or 'tool'"
+                f"Invalid role: {self._role}, must be one of 'user', 'system', 'assistant', 'developer', or 'tool'"
             )
-        if content is not None and not isinstance(content, list):
+        if self._content is not None and not isinstance(self._content, list):
             raise ValueError("Content must be a list")
-        if name is not None and not isinstance(name, str):
+        if self._name is not None and not isinstance(self._name, str):
             raise ValueError("name must be a string")
-        self._role = role
-        self._name = name
-        self._content = content
+
+    def validate(self) -> None:
+        """
+        Check the message and all of its content, e.g. after building it with `from_trusted`.
+
+        Raises:
+            ValueError: If the message or any of its content is invalid.
+        """
+        self._check()
+        for item in self._content or []:
+            item.validate()
 
     @property
     def role(self) -> str:
@@ -84,11 +116,34 @@ class DevSysUserMessage(Message):
         Raises:
             ValueError: If `role` is invalid, `content` is empty, or name is not a string.
         """
-        if role not in {"user", "system", "developer"}:
-            raise ValueError(f"Invalid role: {role}")
-
         if isinstance(content, Content):
             content = [content]
+        super().__init__(role, content, name)
+
+    @classmethod
+    def from_trusted(
+        cls,
+        role: Literal["user", "system", "developer"],
+        content: List[Content],
+        name: Optional[str] = None,
+    ) -> "DevSysUserMessage":
+        """
+        Build a message from trusted data, such as messages stored by this package, without validating it.
+
+        Args:
+            role (Literal["user", "system", "developer"]): The role of the sender.
+            content (List[Content]): The content of the message.
+            name (Optional[str]): The name of the sender (if applicable).
+
+        Returns:
+            DevSysUserMessage: The message.
+        """
+        return cls._new_trusted(role, content, name)
+
+    def _check(self) -> None:
+        role, content = self._role, self._content
+        if role not in {"user", "system", "developer"}:
+            raise ValueError(f"Invalid role: {role}")
         if not isinstance(content, list):
             raise ValueError("Content must be a list")
         for item in content:
@@ -103,8 +158,7 @@ class DevSysUserMessage(Message):
                 raise ValueError(
                     "System and developer messages must have exactly one text content item"
                 )
-
-        super().__init__(role, content, name)
+        super()._check()
 
     def to_dict(
         self, substitution_dict: Optional[SubstitutionDict] = SubstitutionDict()
@@ -144,11 +198,57 @@ class AssistantMessage(Message):
             audio (Optional[Union[Dict, str]], optional): Data about previous audio response from the model. Defaults to None.
             tool_calls (Optional[List[ToolCall]], optional): A list of tool calls generated by the model. Defaults to None.
         """
+        if isinstance(content, Content):
+            content = [content]
+        self._refusal = refusal
+        self._audio = audio
+        self._tool_calls = tool_calls
+        super().__init__("assistant", content, name)
+
+    @classmethod
+    def from_trusted(
+        cls,
+        content: Optional[List[Content]] = None,
+        refusal: Optional[str] = None,
+        name: Optional[str] = None,
+        audio: Optional[Dict] = None,
+        tool_calls: Optional[List[ToolCall]] = None,
+    ) -> "AssistantMessage":
+        """Build an assistant message from trusted data, such as a validated API response, without validating it.
+
+        Args:
+            content (Optional[List[Content]], optional): The content of assistant message. Defaults to None.
+            refusal (Optional[str], optional): The refusal message by the assistant. Defaults to None.
+            name (Optional[str], optional): An optional name for the participant. Defaults to None.
+            audio (Optional[Dict], optional): Data about previous audio response from the model. Defaults to None.
+            tool_calls (Optional[List[ToolCall]], optional): A list of tool calls generated by the model. Defaults to None.
+
+        Returns:
+            AssistantMessage: The message.
+        """
+        message = cls._new_trusted("assistant", content, name)
+        message._refusal = refusal
+        message._audio = audio
+        message._tool_calls = tool_calls
+        return message
+
+    @property
+    def refusal(self) -> Optional[str]:
+        return self._refusal
+
+    @property
+    def audio(self) -> Optional[Dict]:
+        return self._audio
+
+    @property
+    def tool_calls(self) -> Optional[List[ToolCall]]:
+        return self._tool_calls
+
+    def _check(self) -> None:
+        content, audio, tool_calls = self._content, self._audio, self._tool_calls
         if tool_calls is None and content is None:
             raise ValueError("Content or tool calls must be provided")
         if content is not None:
-            if isinstance(content, Content):
-                content = [content]
             if not isinstance(content, list):
                 raise ValueError("Content must be a list")
             for item in content:
@@ -159,7 +259,7 @@ class AssistantMessage(Message):
                         "Content items must be TextContent or RefusalContent objects"
                     )
 
-        if refusal is not None and not isinstance(refusal, str):
+        if self._refusal is not None and not isinstance(self._refusal, str):
             raise ValueError("Refusal must be a string")
         if audio is not None:
             if not isinstance(audio, dict):
@@ -172,11 +272,12 @@ class AssistantMessage(Message):
             for item in tool_calls:
                 if not isinstance(item, ToolCall):
                     raise ValueError("Tool calls must be ToolCall objects")
+        super()._check()
 
-        super().__init__("assistant", content, name)
-        self._refusal = refusal
-        self._audio = audio
-        self._tool_calls = tool_calls
+    def validate(self) -> None:
+        super().validate()
+        for item in self._tool_calls or []:
+            item.validate()
 
     def to_dict(self, substitution_dict=SubstitutionDict()):
         message_dict = {"role": self._role}
@@ -226,15 +327,33 @@ class ToolMessage(Message):
         """
         if isinstance(content, Content):
             content = [content]
-        if not isinstance(content, list):
+        self._tool_call_id = tool_call_id
+        super().__init__("tool", content=content)
+
+    @classmethod
+    def from_trusted(cls, content: List[Content], tool_call_id: str) -> "ToolMessage":
+        """Build a tool message from trusted data without validating it.
+
+        Args:
+            content (List[Content]): The content of the message.
+            tool_call_id (str): The ID of the tool call.
+
+        Returns:
+            ToolMessage: The message.
+        """
+        message = cls._new_trusted("tool", content, None)
+        message._tool_call_id = tool_call_id
+        return message
+
+    def _check(self) -> None:
+        if not isinstance(self._content, list):
             raise ValueError("Content must be a list")
-        for item in content:
+        for item in self._content:
             if not isinstance(item, Content):
                 raise ValueError("Content items must be Content objects")
-        if not isinstance(tool_call_id, str):
+        if not isinstance(self._tool_call_id, str):
             raise ValueError("Tool call ID must be a string")
-        super().__init__("tool", content=content)
-        self._tool_call_id = tool_call_id
+        super()._check()
 
     @property
     def tool_call_id(self) -> str:
@@ -266,21 +385,163 @@ def get_assistant_message_from_response(message_dict: ChatCompletionMessage) ->
     Returns:
         Message: The AssistantMessage object.
     """
+    # the SDK has validated the response, so the trusted constructors are used
     role = message_dict.role
     if role == "assistant":
         content = message_dict.content
-        content = TextContent(content) if content else None
-        refusal = message_dict.refusal
         audio = message_dict.audio
         tool_calls = message_dict.tool_calls
-        tool_calls = (
-            [get_tool_call_from_dict(item) for item in tool_calls]
-            if tool_calls
-            else None
+        return AssistantMessage.from_trusted(
+            [TextContent.from_trusted(content)] if content else None,
+            message_dict.refusal,
+            None,
+            audio.model_dump() if audio else None,
+            (
+                [
+                    ToolCall.from_trusted(
+                        item.id,
+                        item.type,
+                        {
+                            "name": item.function.name,
+                            "arguments": item.function.arguments,
+                        },
+                    )
+                    for item in tool_calls
+                ]
+                if tool_calls
+                else None
+            ),
+        )
+    elif role == "user" or role == "system" or role == "developer":
+        return DevSysUserMessage.from_trusted(
+            role, [TextContent.from_trusted(message_dict.content)]
+        )
+    else:
+        raise ValueError(f"Invalid role: {role}")
+
+
+def get_assistant_message_from_dict(message_dict: Dict) -> Message:
+    """generate a Message object from the decoded JSON of a response message, without building the SDK's models.
+
+    Args:
+        message_dict (Dict): The decoded JSON of the message.
+
+    Returns:
+        Message: The AssistantMessage object.
+    """
+    role = message_dict["role"]
+    if role == "assistant":
+        content = message_dict.get("content")
+        tool_calls = message_dict.get("tool_calls")
+        return AssistantMessage.from_trusted(
+            [TextContent.from_trusted(content)] if content else None,
+            message_dict.get("refusal"),
+            None,
+            message_dict.get("audio"),
+            (
+                [get_tool_call_from_dict(item, validate=False) for item in tool_calls]
+                if tool_calls
+                else None
+            ),
+        )
+    elif role == "user" or role == "system" or role == "developer":
+        return DevSysUserMessage.from_trusted(
+            role, [TextContent.from_trusted(message_dict["content"])]
+        )
+    else:
+        raise ValueError(f"Invalid role: {role}")
+
+
+def get_message_from_dict(message_dict: Dict, validate: bool = True) -> Message:
+    """generate a Message object of any role from its `to_dict` representation.
+
+    Args:
+        message_dict (Dict): The dictionary representation of the message, e.g. as stored from `MessageList.to_dict`.
+        validate (bool, optional): Whether to validate the message. Pass False for trusted data, such as messages stored by this package. Defaults to True.
+
+    Returns:
+        Message: The Message object.
+
+    Raises:
+        ValueError: If the role is invalid, or the message is invalid and `validate` is True.
+    """
+    role = message_dict["role"]
+    content = message_dict.get("content")
+    if content is not None:
+        if isinstance(content, str):
+            content = [content]
+        content = [get_content_from_dict(item, validate) for item in content]
+    if role == "assistant":
+        tool_calls = message_dict.get("tool_calls")
+        args = (
+            content,
+            message_dict.get("refusal"),
+            message_dict.get("name"),
+            message_dict.get("audio"),
+            (
+                [get_tool_call_from_dict(item, validate) for item in tool_calls]
+                if tool_calls
+                else None
+            ),
         )
-        return AssistantMessage(content, refusal, None, audio, tool_calls)
+        cls = AssistantMessage
     elif role == "user" or role == "system" or role == "developer":
-        content = TextContent(message_dict.content)
-        return DevSysUserMessage(role, content)
+        args = (role, content, message_dict.get("name"))
+        cls = DevSysUserMessage
+    elif role == "tool":
+        args = (content, message_dict["tool_call_id"])
+        cls = ToolMessage
     else:
         raise ValueError(f"Invalid role: {role}")
+    return cls(*args) if validate else cls.from_trusted(*args)
+
+
+def get_dict_from_message(message: Message) -> Dict:
+    """Convert a Message object to its `to_dict` representation without substituting anything.
+
+    Unlike `to_dict`, the texts are kept verbatim, so `get_message_from_dict` restores the same message.
+
+    Args:
+        message (Message): The message.
+
+    Returns:
+        Dict: The dictionary representation of the message.
+    """
+    message_dict = {"role": message.role}
+    if message.content is not None:
+        message_dict["content"] = [
+            get_dict_from_content(item) for item in message.content
+        ]
+    if message.name is not None:
+        message_dict["name"] = message.name
+    if isinstance(message, AssistantMessage):
+        if message.refusal is not None:
+            message_dict["refusal"] = message.refusal
+        if message.audio is not None:
+            message_dict["audio"] = message.audio
+        if message.tool_calls is not None:
+            message_dict["tool_calls"] = [
+                {"id": item.id, "type": item.type, "function": dict(item.function)}
+                for item in message.tool_calls
+            ]
+    elif isinstance(message, ToolMessage):
+        message_dict["tool_call_id"] = message.tool_call_id
+    return message_dict
+
+
+def last_user_message_view(messages: List[Dict]) -> str:
+    """
+    Return the text of the last user message of a request.
+
+    Args:
+        messages (List[Dict]): The substituted messages of the request.
+
+    Returns:
+        str: The text parts of the last user message, joined by newlines.
+    """
+    for message in reversed(messages):
+        if message["role"] == "user":
+            return "\n".join(
+                item["text"] for item in message["content"] if item["type"] == "text"
+            )
+    return ""
@@ -1,7 +1,41 @@
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, Iterable, List, NamedTuple, Tuple, Union
+import hashlib
 
-from .Message import Message
+from .Message import Message, get_message_from_dict
 from .SubstitutionDict import SubstitutionDict
+from ..utils import get_logger, json_dumps, json_loads
+
+logger = get_logger(__name__)
+
+# a private use character that cannot be escaped differently by the JSON encoders
+_MARKER = "\ue000"
+
+
+class _MarkerDict(dict):
+    """A substitution mapping that replaces every field with a marker naming it."""
+
+    def __missing__(self, key: str) -> str:
+        return f"{_MARKER}{key}{_MARKER}"
+
+
+class PromptCacheReport(NamedTuple):
+    """The result of `MessageList.analyze_prompt_cache`.
+
+    Attributes:
+        first_substitution (Optional[Tuple[int, str]]): The index of the first message with a substitution field and the name of the field, or None if the messages are static.
+        static_prefix_bytes (int): The length of the JSON encoding of the messages before the first substitution field.
+        static_prefix_tokens (int): The estimated number of tokens of the static prefix.
+        total_bytes (int): The length of the JSON encoding of all messages, with empty substitutions.
+        total_tokens (int): The estimated number of tokens of all messages.
+        cacheable (bool): Whether the static prefix is long enough to be cached.
+    """
+
+    first_substitution: Optional[Tuple[int, str]]
+    static_prefix_bytes: int
+    static_prefix_tokens: int
+    total_bytes: int
+    total_tokens: int
+    cacheable: bool
 
 
 class MessageList:
@@ -11,6 +45,10 @@ class MessageList:
         """Initialize an empty MessageList."""
         self._messages = []
         self._system_message = None
+        self._frozen_length = 0
+        self._frozen_prefix = b""
+        # cleared by every change of the messages
+        self._template_key: Optional[str] = None
 
     def __len__(self):
         """Return the number of messages in the list."""
@@ -35,6 +73,40 @@ class MessageList:
         if not isinstance(message, Message):
             raise ValueError("message must be a Message object")
         self._messages.append(message)
+        self._template_key = None
+
+    def extend_trusted(self, messages: Iterable[Union[Message, Dict]]) -> None:
+        """Append many messages from trusted data without validating them.
+
+        Use for messages this package stored or already validated, e.g. when rebuilding
+        conversations from storage; call `validate` to check them on demand.
+
+        Args:
+            messages (Iterable[Union[Message, Dict]]): The messages, as Message objects or in their `to_dict` representation.
+        """
+        self._messages.extend(
+            (
+                message
+                if isinstance(message, Message)
+                else get_message_from_dict(message, validate=False)
+            )
+            for message in messages
+        )
+        self._template_key = None
+
+    def validate(self) -> None:
+        """Check every message and its content, e.g. after `extend_trusted`.
+
+        Raises:
+            ValueError: If a message is not a Message object or is invalid, naming its index.
+        """
+        for index, message in enumerate(self._messages):
+            if not isinstance(message, Message):
+                raise ValueError(f"Message {index} is not a Message object")
+            try:
+                message.validate()
+            except ValueError as e:
+                raise ValueError(f"Message {index} is invalid: {e}") from e
 
     def modify_message(self, index: int, message: Message) -> None:
         """Modify a message at a specific index.
@@ -46,6 +118,11 @@ class MessageList:
         if not isinstance(message, Message):
             raise ValueError("message must be a Message object")
         self._messages[index] = message
+        self._template_key = None
+        if index < 0:
+            index += len(self._messages)
+        if index < self._frozen_length:
+            self.unfreeze_prefix()
 
     def pop_message(self) -> Message:
         """Remove and return the last message from the message list.
@@ -58,6 +135,9 @@ class MessageList:
         """
         if not self._messages:
             raise ValueError("No message to pop")
+        if len(self._messages) <= self._frozen_length:
+            self.unfreeze_prefix()
+        self._template_key = None
         return self._messages.pop()
 
     def pop_messages(self, repeat: int) -> List[Message]:
@@ -74,6 +154,9 @@ class MessageList:
         """
         if len(self._messages) < repeat:
             raise ValueError("Not enough messages to pop")
+        if len(self._messages) - repeat < self._frozen_length:
+            self.unfreeze_prefix()
+        self._template_key = None
         return [self._messages.pop() for _ in range(repeat)]
 
     def to_dict(
@@ -81,13 +164,146 @@ class MessageList:
     ) -> List[Dict]:
         """Convert the message list to a dictionary.
 
+        Like `to_json`, the frozen prefix keeps the substitutions it was frozen with.
+
         Args:
-            substitution_dict (Optional[SubstitutionDict], optional): The substitution dictionary for the message content. Defaults to None.
+            substitution_dict (Optional[SubstitutionDict], optional): The substitution dictionary for the messages after the frozen prefix. Defaults to None.
 
         Returns:
             List[Dict]: The message list as a list of dictionaries.
         """
-        return [message.to_dict(substitution_dict) for message in self._messages]
+        messages = (
+            json_loads(b"[" + self._frozen_prefix + b"]") if self._frozen_length else []
+        )
+        messages.extend(
+            message.to_dict(substitution_dict)
+            for message in self._messages[self._frozen_length :]
+        )
+        return messages
+
+    @property
+    def frozen_length(self) -> int:
+        """The number of leading messages whose JSON encoding is cached, 0 if none."""
+        return self._frozen_length
+
+    def freeze_prefix(
+        self,
+        length: Optional[int] = None,
+        substitution_dict: Optional[SubstitutionDict] = None,
+    ) -> None:
+        """Encode the first `length` messages to JSON once and reuse the bytes in `to_json`.
+
+        The prefix is substituted with `substitution_dict` now; the substitution dictionary
+        given to `to_json` or `to_dict` only applies to the messages after the prefix. Modifying or popping
+        a message of the prefix unfreezes it.
+
+        Args:
+            length (Optional[int], optional): The number of leading messages to freeze. Defaults to all messages.
+            substitution_dict (Optional[SubstitutionDict], optional): The substitution dictionary for the prefix. Defaults to None.
+
+        Raises:
+            ValueError: If `length` is out of range.
+        """
+        if length is None:
+            length = len(self._messages)
+        if not 0 <= length <= len(self._messages):
+            raise ValueError("length must be between 0 and the number of messages")
+        self._frozen_prefix = b",".join(
+            json_dumps(message.to_dict(substitution_dict))
+            for message in self._messages[:length]
+        )
+        self._frozen_length = length
+
+    def unfreeze_prefix(self) -> None:
+        """Drop the cached encoding of the prefix."""
+        self._frozen_length = 0
+        self._frozen_prefix = b""
+
+    def to_json(self, substitution_dict: Optional[SubstitutionDict] = None) -> bytes:
+        """Encode the message list as a JSON array, reusing the bytes of the frozen prefix.
+
+        Args:
+            substitution_dict (Optional[SubstitutionDict], optional): The substitution dictionary for the messages after the frozen prefix. Defaults to None.
+
+        Returns:
+            bytes: The UTF-8 JSON encoding of the message list.
+        """
+        parts = [self._frozen_prefix] if self._frozen_length else []
+        parts.extend(
+            json_dumps(message.to_dict(substitution_dict))
+            for message in self._messages[self._frozen_length :]
+        )
+        return b"[" + b",".join(parts) + b"]"
+
+    def _static_prefix(self) -> Tuple[bytes, Optional[Tuple[int, str]], bytes]:
+        """Return the JSON bytes before the first substitution field, the field and the whole JSON."""
+        marker = json_dumps(_MARKER)[1:-1]
+        encoded = [
+            json_dumps(message.to_dict(_MarkerDict())) for message in self._messages
+        ]
+        full = b"[" + b",".join(encoded) + b"]"
+        prefix = b"["
+        for index, message_json in enumerate(encoded):
+            position = message_json.find(marker)
+            if position >= 0:
+                end = message_json.index(marker, position + len(marker))
+                field = message_json[position + len(marker) : end].decode("utf-8")
+                return prefix + message_json[:position], (index, field), full
+            prefix += message_json + b","
+        return full, None, full
+
+    def analyze_prompt_cache(
+        self,
+        min_cacheable_tokens: int = 1024,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ) -> PromptCacheReport:
+        """Find how much of the prompt can be served from the provider's prompt cache.
+
+        Prompt caching only matches a byte-identical prefix, so everything after the
+        first substitution field differs between requests. A warning is logged when the
+        static prefix is too short to be cached although the prompt is long enough.
+
+        Args:
+            min_cacheable_tokens (int, optional): The minimum number of prompt tokens that are cached. Defaults to 1024.
+            token_counter (Optional[Callable[[str], int]], optional): A function counting the tokens of a text. Defaults to an estimate of 4 bytes per token.
+
+        Returns:
+            PromptCacheReport: The first substitution field and the length of the static prefix.
+        """
+        prefix, first_substitution, full = self._static_prefix()
+        if token_counter is None:
+            prefix_tokens, total_tokens = len(prefix) // 4, len(full) // 4
+        else:
+            prefix_tokens = token_counter(prefix.decode("utf-8"))
+            total_tokens = token_counter(full.decode("utf-8"))
+        report = PromptCacheReport(
+            first_substitution,
+            len(prefix),
+            prefix_tokens,
+            len(full),
+            total_tokens,
+            prefix_tokens >= min_cacheable_tokens,
+        )
+        if not report.cacheable and total_tokens >= min_cacheable_tokens:
+            index, field = first_substitution
+            logger.warning(
+                f"The substitution field '{field}' in message {index} leaves a static "
+                f"prefix of ~{prefix_tokens} of ~{total_tokens} tokens, below the "
+                f"{min_cacheable_tokens} tokens needed for prompt caching. Move "
+                "substituted content after the long static messages."
+            )
+        return report
+
+    def template_key(self) -> str:
+        """Return a short hash identifying the static prefix of the messages.
+
+        The hash is computed once and reused until the messages change, so looking it up
+        for every request of a template is cheap.
+        """
+        if self._template_key is None:
+            prefix, _, _ = self._static_prefix()
+            self._template_key = hashlib.blake2b(prefix, digest_size=8).hexdigest()
+        return self._template_key
 
     def __repr__(self):
         """Return a string representation of the message list."""
@@ -0,0 +1,233 @@
+from typing import Iterable, Iterator, List, Optional, Union
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+
+from .Message import Message, get_dict_from_message, get_message_from_dict
+from .MessageList import MessageList
+from ..utils import get_logger, json_dumps, json_loads
+
+logger = get_logger(__name__)
+
+
+class _SpilledMessages:
+    """
+    The list-like message storage of a `SpillingMessageList`.
+
+    The last `hot_window` messages are kept in memory. Older ones are appended to an
+    SQLite table, one row per position, and read back on access. The connection is
+    shared between threads, e.g. when a sync endpoint encodes the list on its loop
+    thread, so every use of it is serialized by a lock.
+    """
+
+    def __init__(self, path: str, hot_window: int, read_batch: int = 256):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages (position INTEGER PRIMARY KEY, data BLOB)"
+        )
+        self._db.commit()
+        self._spilled = self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        self._hot: List[Message] = []
+        self._hot_window = hot_window
+        # spill in batches instead of on every append
+        self._spill_batch = max(1, hot_window // 4)
+        self._read_batch = read_batch
+
+    @property
+    def spilled(self) -> int:
+        return self._spilled
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._hot)
+
+    def _load(self, position: int) -> Message:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM messages WHERE position = ?", (position,)
+            ).fetchone()
+        return get_message_from_dict(json_loads(row[0]), validate=False)
+
+    def _load_range(self, start: int, stop: int) -> Iterator[Message]:
+        for batch_start in range(start, stop, self._read_batch):
+            # hold the lock per batch only, a paused iterator must not block others
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT data FROM messages WHERE position >= ? AND position < ? ORDER BY position",
+                    (batch_start, min(stop, batch_start + self._read_batch)),
+                ).fetchall()
+            for (data,) in rows:
+                yield get_message_from_dict(json_loads(data), validate=False)
+
+    def _spill(self, keep: Optional[int] = None) -> None:
+        """Write the oldest in-memory messages to the log, keeping `keep` of them in memory."""
+        with self._lock:
+            count = len(self._hot) - (self._hot_window if keep is None else keep)
+            if count <= 0 or (keep is None and count < self._spill_batch):
+                return
+            self._db.executemany(
+                "INSERT INTO messages VALUES (?, ?)",
+                (
+                    (
+                        self._spilled + offset,
+                        json_dumps(get_dict_from_message(message)),
+                    )
+                    for offset, message in enumerate(self._hot[:count])
+                ),
+            )
+            self._db.commit()
+            del self._hot[:count]
+            self._spilled += count
+
+    def _position(self, index: int) -> int:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("message index out of range")
+        return index
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, List[Message]]:
+        with self._lock:
+            if isinstance(index, slice):
+                start, stop, step = index.indices(len(self))
+                if step != 1:
+                    return [self[position] for position in range(start, stop, step)]
+                messages = list(self._load_range(start, min(stop, self._spilled)))
+                return (
+                    messages
+                    + self._hot[
+                        max(0, start - self._spilled) : max(0, stop - self._spilled)
+                    ]
+                )
+            position = self._position(index)
+            if position >= self._spilled:
+                return self._hot[position - self._spilled]
+            return self._load(position)
+
+    def __setitem__(self, index: int, message: Message) -> None:
+        with self._lock:
+            position = self._position(index)
+            if position >= self._spilled:
+                self._hot[position - self._spilled] = message
+                return
+            self._db.execute(
+                "UPDATE messages SET data = ? WHERE position = ?",
+                (json_dumps(get_dict_from_message(message)), position),
+            )
+            self._db.commit()
+
+    def __iter__(self) -> Iterator[Message]:
+        with self._lock:
+            # later spills only add rows after `spilled`
+            spilled, hot = self._spilled, list(self._hot)
+        yield from self._load_range(0, spilled)
+        yield from hot
+
+    def append(self, message: Message) -> None:
+        with self._lock:
+            self._hot.append(message)
+            self._spill()
+
+    def extend(self, messages: Iterable[Message]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def pop(self) -> Message:
+        with self._lock:
+            if self._hot:
+                return self._hot.pop()
+            if not self._spilled:
+                raise IndexError("pop from empty list")
+            message = self._load(self._spilled - 1)
+            self._db.execute(
+                "DELETE FROM messages WHERE position = ?", (self._spilled - 1,)
+            )
+            self._db.commit()
+            self._spilled -= 1
+            return message
+
+    def flush(self) -> None:
+        """Write all in-memory messages to the log."""
+        self._spill(keep=0)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _close_log(messages: _SpilledMessages, path: str, temporary: bool) -> None:
+    """Close a log, deleting it if it is a temporary file and else writing all messages to it."""
+    if not temporary:
+        messages.flush()
+    messages.close()
+    if temporary:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+class SpillingMessageList(MessageList):
+    """
+    A MessageList that keeps only its most recent messages in memory.
+
+    Older messages are spilled to an append-only SQLite log and read back lazily on
+    access, so a long-running session holds a bounded number of messages in memory.
+    Indexing, iteration, `to_dict` and `to_json` work as for a `MessageList`, but a
+    spilled message is rebuilt on every access, so modify it with `modify_message`
+    rather than in place. Reopening an existing log continues the stored session.
+    A list dropped without `close` is closed when it is garbage collected.
+    """
+
+    def __init__(self, path: Optional[str] = None, hot_window: int = 256):
+        """
+        Initialize a SpillingMessageList.
+
+        Args:
+            path (Optional[str]): The SQLite file of the log. Defaults to a temporary file deleted by `close`.
+            hot_window (int): The number of most recent messages kept in memory. Defaults to 256.
+
+        Raises:
+            ValueError: If `hot_window` is negative.
+        """
+        if hot_window < 0:
+            raise ValueError("hot_window must not be negative")
+        super().__init__()
+        self._temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="messages-", suffix=".sqlite")
+            os.close(fd)
+        self._path = path
+        self._messages = _SpilledMessages(path, hot_window)
+        # the finalizer must not reference self, or the list would never be collected
+        self._finalizer = weakref.finalize(
+            self, _close_log, self._messages, path, self._temporary
+        )
+        if self._messages.spilled:
+            logger.info(
+                f"Continuing session with {self._messages.spilled} messages from {path}"
+            )
+
+    @property
+    def path(self) -> str:
+        """The SQLite file of the log."""
+        return self._path
+
+    @property
+    def spilled(self) -> int:
+        """The number of messages stored on disk only."""
+        return self._messages.spilled
+
+    def close(self) -> None:
+        """Close the log, deleting it if it is a temporary file and else writing all messages to it."""
+        self._finalizer()
+
+    def __enter__(self) -> "SpillingMessageList":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
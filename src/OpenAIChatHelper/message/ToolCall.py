@@ -6,19 +6,37 @@ class ToolCall:
     """The tool calls generated by the model."""
 
     def __init__(self, id: str, type: str, function: Dict[str, str]):
-        if not isinstance(id, str):
+        self._id = id
+        self._type = type
+        self._function = function
+        self.validate()
+
+    @classmethod
+    def from_trusted(cls, id: str, type: str, function: Dict[str, str]) -> "ToolCall":
+        """Build a ToolCall from trusted data, such as a validated API response, without validating it."""
+        tool_call = cls.__new__(cls)
+        tool_call._id = id
+        tool_call._type = type
+        tool_call._function = function
+        return tool_call
+
+    def validate(self) -> None:
+        """Check the tool call, e.g. after building it with `from_trusted`.
+
+        Raises:
+            ValueError: If the tool call is invalid.
+        """
+        if not isinstance(self._id, str):
             raise ValueError("ID must be a string")
-        if not isinstance(type, str):
+        if not isinstance(self._type, str):
             raise ValueError("Type must be a string")
+        function = self._function
         if not isinstance(function, dict):
             raise ValueError("Function must be a dictionary")
         if "name" not in function or not isinstance(function["name"], str):
             raise ValueError("Function name must be a string")
         if "arguments" not in function or not isinstance(function["arguments"], str):
             raise ValueError("Function arguments must be a string")
-        self._id = id
-        self._type = type
-        self._function = function
 
     @property
     def id(self) -> str:
@@ -59,16 +77,17 @@ class ToolCall:
         )
 
 
-def get_tool_call_from_dict(tool_call_dict: Dict) -> ToolCall:
+def get_tool_call_from_dict(tool_call_dict: Dict, validate: bool = True) -> ToolCall:
     """Get a ToolCall object from a dictionary.
 
     Args:
         tool_call_dict (Dict): The dictionary representation of the tool call.
+        validate (bool, optional): Whether to validate the tool call. Pass False for trusted data. Defaults to True.
 
     Returns:
         ToolCall: The ToolCall object.
     """
-    return ToolCall(
+    return (ToolCall if validate else ToolCall.from_trusted)(
         tool_call_dict["id"],
         tool_call_dict["type"],
         tool_call_dict["function"],
@@ -3,3 +3,6 @@ from .Message import *
 from .ToolCall import *
 from .MessageList import *
 from .SubstitutionDict import *
+from .SpillingMessageList import *
+from .ContentInterner import *
+from .ConversationStore import *
@@ -0,0 +1,219 @@
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+import cProfile
+import io
+import pstats
+import random
+import sys
+import threading
+
+
+class CProfileHook:
+    """
+    Profile a random sample of requests with cProfile and accumulate the results.
+
+    Passed as the `profiler` of a `Tracer`, it is started when a root span opens and
+    stopped when it ends. Only one cProfile profiler can be active per interpreter, so a
+    request starting while another one is profiled is not profiled.
+    """
+
+    def __init__(self, sample_rate: float = 0.01, seed: Optional[int] = None):
+        """
+        Initialize the CProfileHook.
+
+        Args:
+            sample_rate (float): The fraction of requests profiled. Defaults to 0.01.
+            seed (Optional[int]): The seed of the sampling (optional).
+
+        Raises:
+            ValueError: If `sample_rate` is not between 0 and 1.
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self._sample_rate = sample_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._active = False
+        self._stats: Optional[pstats.Stats] = None
+        self.profiled = 0
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """
+        Start profiling a request if it is sampled.
+
+        Returns:
+            Optional[cProfile.Profile]: The started profile, or None if the request is not profiled.
+        """
+        with self._lock:
+            if self._active or self._rng.random() >= self._sample_rate:
+                return None
+            self._active = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler is active
+            with self._lock:
+                self._active = False
+            return None
+        return profile
+
+    def stop(self, profile: cProfile.Profile) -> None:
+        """Stop a profile returned by `start` and add it to the accumulated statistics."""
+        profile.disable()
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.profiled += 1
+            self._active = False
+
+    @property
+    def stats(self) -> Optional[pstats.Stats]:
+        """The statistics accumulated over the profiled requests, or None if none was profiled."""
+        return self._stats
+
+    def dump(self, path: str) -> None:
+        """
+        Write the accumulated statistics to a file readable by `pstats` and snakeviz.
+
+        Raises:
+            RuntimeError: If no request was profiled.
+        """
+        if self._stats is None:
+            raise RuntimeError("No request was profiled")
+        self._stats.dump_stats(path)
+
+    def print_stats(self, n: int = 20, sort: str = "cumulative") -> str:
+        """
+        Format the functions with the most time spent.
+
+        Args:
+            n (int): The number of functions listed. Defaults to 20.
+            sort (str): The `pstats` sort key. Defaults to "cumulative".
+
+        Returns:
+            str: The report, empty if no request was profiled.
+        """
+        if self._stats is None:
+            return ""
+        stream = io.StringIO()
+        self._stats.stream = stream
+        self._stats.sort_stats(sort).print_stats(n)
+        return stream.getvalue()
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of all threads at a fixed interval from a background thread.
+
+    Unlike cProfile it does not slow the profiled code down, so it can stay on during a
+    load test; its overhead is one stack walk per thread and interval.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Initialize the SamplingProfiler.
+
+        Args:
+            interval (float): The seconds between samples. Defaults to 0.005.
+
+        Raises:
+            ValueError: If `interval` is not positive.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self._interval = interval
+        self._samples: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        """
+        Start sampling.
+
+        Raises:
+            RuntimeError: If the profiler is already running.
+        """
+        if self._thread is not None:
+            raise RuntimeError("The profiler is already running")
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="openai-sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop sampling; the samples are kept."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self._interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                with self._lock:
+                    self._samples[tuple(reversed(stack))] += 1
+
+    def _snapshot(self) -> Dict[Tuple[str, ...], int]:
+        with self._lock:
+            return dict(self._samples)
+
+    @property
+    def samples(self) -> int:
+        """The number of stacks sampled."""
+        return sum(self._snapshot().values())
+
+    def collapsed(self) -> str:
+        """
+        Format the samples in the collapsed stack format read by flamegraph tools.
+
+        Returns:
+            str: One line per distinct stack, its frames separated by ";" and followed by its count.
+        """
+        return "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in self._snapshot().items()
+        )
+
+    def top(self, n: int = 20) -> List[Tuple[str, float]]:
+        """
+        List the functions seen in the most samples.
+
+        Args:
+            n (int): The number of functions listed. Defaults to 20.
+
+        Returns:
+            List[Tuple[str, float]]: The functions and the fraction of samples they are on the stack in.
+        """
+        samples = self._snapshot()
+        total = sum(samples.values())
+        if total == 0:
+            return []
+        inclusive: Dict[str, int] = Counter()
+        for stack, count in samples.items():
+            for function in set(stack):
+                inclusive[function] += count
+        return [
+            (function, count / total) for function, count in inclusive.most_common(n)
+        ]
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.stop()
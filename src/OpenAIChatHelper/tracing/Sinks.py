@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Optional
+from collections import deque
+import json
+import threading
+
+from .Tracer import Span
+
+
+class RingBufferSink:
+    """Keep the most recent spans in memory and summarize them by stage."""
+
+    def __init__(self, capacity: int = 10000):
+        """
+        Initialize the RingBufferSink.
+
+        Args:
+            capacity (int): The number of spans kept. Defaults to 10000.
+
+        Raises:
+            ValueError: If `capacity` is not positive.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self._spans: deque = deque(maxlen=capacity)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self, name: Optional[str] = None) -> List[Span]:
+        """Return the kept spans, oldest first, optionally only those of one stage."""
+        spans = list(self._spans)
+        if name is None:
+            return spans
+        return [span for span in spans if span.name == name]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the kept spans by stage.
+
+        Returns:
+            Dict[str, Dict[str, float]]: The count and the total, mean, median and maximum duration in seconds of every stage.
+        """
+        durations: Dict[str, List[float]] = {}
+        for span in list(self._spans):
+            durations.setdefault(span.name, []).append(span.duration)
+        summary = {}
+        for name, values in durations.items():
+            values.sort()
+            summary[name] = {
+                "count": len(values),
+                "total": sum(values),
+                "mean": sum(values) / len(values),
+                "p50": values[len(values) // 2],
+                "max": values[-1],
+            }
+        return summary
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlSink:
+    """Append every span as a JSON line to a file."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the JsonlSink.
+
+        Args:
+            path (str): The file to append to.
+        """
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetrySink:
+    """
+    Export spans to OpenTelemetry.
+
+    The spans of a request are buffered until its root span ends, and then created with
+    their original timestamps and parents, so the exported trace has the same structure.
+    Requires the `opentelemetry-api` package and a configured tracer provider.
+    """
+
+    def __init__(self, tracer_provider: Optional[Any] = None):
+        """
+        Initialize the OpenTelemetrySink.
+
+        Args:
+            tracer_provider (Optional[Any]): The OpenTelemetry tracer provider. Defaults to the global one.
+
+        Raises:
+            ImportError: If OpenTelemetry is not installed.
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetrySink requires the opentelemetry-api package"
+            ) from e
+        self._trace = trace
+        self._tracer = trace.get_tracer(
+            "OpenAIChatHelper", tracer_provider=tracer_provider
+        )
+        self._pending: Dict[int, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if span.parent_id is not None:
+                return
+            del self._pending[span.trace_id]
+        created = {}
+        for span in sorted(spans, key=lambda span: span.start):
+            parent = created.get(span.parent_id)
+            context = (
+                self._trace.set_span_in_context(parent) if parent is not None else None
+            )
+            otel_span = self._tracer.start_span(
+                span.name,
+                context=context,
+                start_time=int(span.start_time * 1e9),
+                attributes={
+                    key: (
+                        value
+                        if isinstance(value, (str, bool, int, float))
+                        else str(value)
+                    )
+                    for key, value in span.attributes.items()
+                },
+            )
+            created[span.span_id] = otel_span
+        for span in spans:
+            created[span.span_id].end(
+                end_time=int((span.start_time + span.duration) * 1e9)
+            )
+
+    def close(self) -> None:
+        pass
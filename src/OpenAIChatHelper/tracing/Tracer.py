@@ -0,0 +1,203 @@
+from typing import Any, Dict, Optional, Sequence
+import contextvars
+import itertools
+import time
+
+from ..utils import get_logger
+
+logger = get_logger(__name__)
+
+# converts time.perf_counter() readings to seconds since the epoch
+_EPOCH_OFFSET = time.time() - time.perf_counter()
+_span_ids = itertools.count(1)
+_current_span: contextvars.ContextVar = contextvars.ContextVar(
+    "openai_chat_helper_span", default=None
+)
+
+
+class Span:
+    """
+    A timed stage of a request.
+
+    Attributes:
+        name (str): The name of the stage.
+        trace_id (int): The id shared by all spans of a request.
+        span_id (int): The id of the span.
+        parent_id (Optional[int]): The id of the enclosing span, or None for the root span of a request.
+        start (float): The `time.perf_counter()` time the stage started.
+        end (Optional[float]): The `time.perf_counter()` time the stage ended, once ended.
+        attributes (Dict[str, Any]): Details of the stage, such as the model or the attempt number.
+    """
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "end",
+        "attributes",
+        "_tracer",
+        "_token",
+        "_profile",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        parent: Optional["Span"],
+        attributes: Dict[str, Any],
+        start: Optional[float] = None,
+    ):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.start = start if start is not None else time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self._tracer = tracer
+        self._token = None
+        self._profile = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """The duration of the stage in seconds, once ended."""
+        return None if self.end is None else self.end - self.start
+
+    @property
+    def start_time(self) -> float:
+        """The start of the stage in seconds since the epoch."""
+        return self.start + _EPOCH_OFFSET
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Add a detail to the span."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the span to a JSON serializable dictionary."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        if self.parent_id is None and self._tracer.profiler is not None:
+            self._profile = self._tracer.profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.end = time.perf_counter()
+        if self._profile is not None:
+            self._tracer.profiler.stop(self._profile)
+            self._profile = None
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self._tracer._export(self)
+
+    def __repr__(self):
+        return f"Span({self.name!r}, duration={self.duration}, attributes={self.attributes})"
+
+
+class _NoopSpan:
+    """The span returned while tracing is disabled; entering and leaving it does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Create spans for the stages of requests and hand finished spans to sinks.
+
+    Spans opened inside another span, in the same task or in a thread started from it
+    by `asyncio.to_thread`, become its children. Components take an optional tracer and
+    use `NOOP_SPAN` without one, so disabled tracing costs one attribute check per stage.
+    """
+
+    def __init__(self, sinks: Sequence[Any] = (), profiler: Optional[Any] = None):
+        """
+        Initialize the Tracer.
+
+        Args:
+            sinks (Sequence[Any]): The sinks receiving every finished span, such as a `RingBufferSink`, `JsonlSink` or `OpenTelemetrySink`.
+            profiler (Optional[Any]): A hook such as `CProfileHook` started and stopped around root spans (optional).
+        """
+        self._sinks = list(sinks)
+        self.profiler = profiler
+        self.enabled = True
+
+    @property
+    def sinks(self) -> list:
+        return self._sinks
+
+    def add_sink(self, sink: Any) -> None:
+        """Add a sink receiving every span finished from now on."""
+        self._sinks.append(sink)
+
+    def span(self, name: str, **attributes) -> Any:
+        """
+        Open a span as a context manager, as a child of the current span if any.
+
+        Args:
+            name (str): The name of the stage.
+            **attributes: Details of the stage.
+
+        Returns:
+            Span: The span, or `NOOP_SPAN` while the tracer is disabled.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, _current_span.get(), attributes)
+
+    def record(self, name: str, start: float, end: float, **attributes) -> None:
+        """
+        Record a stage measured elsewhere, as a child of the current span if any.
+
+        Args:
+            name (str): The name of the stage.
+            start (float): The `time.perf_counter()` time the stage started.
+            end (float): The `time.perf_counter()` time the stage ended.
+            **attributes: Details of the stage.
+        """
+        if not self.enabled:
+            return
+        span = Span(self, name, _current_span.get(), attributes, start)
+        span.end = end
+        self._export(span)
+
+    def _export(self, span: Span) -> None:
+        for sink in self._sinks:
+            try:
+                sink.export(span)
+            except Exception as e:
+                logger.warning(f"Tracing sink {type(sink).__name__} failed: {e!r}")
+
+    def close(self) -> None:
+        """Close all sinks."""
+        for sink in self._sinks:
+            sink.close()
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost open span of the current task or thread, if any."""
+    return _current_span.get()
@@ -0,0 +1,3 @@
+from .Tracer import *
+from .Sinks import *
+from .Profiling import *
@@ -0,0 +1,230 @@
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+from collections import deque
+import asyncio
+import time
+
+from openai import APIStatusError, APITimeoutError
+
+from ..utils import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """
+    Check whether an exception signals that the upstream is overloaded.
+
+    Rate limits (429), server errors (5xx) and timeouts count as overload.
+
+    Args:
+        exc (BaseException): The exception raised by a request.
+
+    Returns:
+        bool: True if the exception signals overload, False otherwise.
+    """
+    if isinstance(exc, APITimeoutError):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def error_kind(exc: BaseException) -> str:
+    """
+    Name the kind of a failed request, e.g. to count failures by kind.
+
+    Args:
+        exc (BaseException): The exception raised by a request.
+
+    Returns:
+        str: The HTTP status code of an API error, or else the name of the exception type.
+    """
+    status_code = getattr(exc, "status_code", None)
+    return str(status_code) if status_code is not None else type(exc).__name__
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of concurrent requests with an AIMD (additive increase,
+    multiplicative decrease) controller.
+
+    Every successful request raises the limit by `increase / limit`, so the limit grows
+    by about `increase` per round of `limit` requests while the upstream is healthy.
+    A 429, a 5xx, a timeout or a short-term latency average exceeding
+    `latency_tolerance` times the long-term average multiplies the limit by `backoff`.
+    Decreases are spaced by at least one typical request latency so that a single
+    burst of errors only counts once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        increase: float = 1.0,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        history_size: int = 1024,
+    ):
+        """
+        Initialize the AdaptiveConcurrencyLimiter.
+
+        Args:
+            initial_limit (int): The starting concurrency limit. Defaults to 8.
+            min_limit (int): The lowest limit the controller can reach. Defaults to 1.
+            max_limit (int): The highest limit the controller can reach. Defaults to 256.
+            increase (float): The additive increase per round of requests. Defaults to 1.0.
+            backoff (float): The factor applied to the limit on overload. Defaults to 0.5.
+            latency_tolerance (float): The ratio of short-term to long-term latency treated as overload. Defaults to 2.0.
+            history_size (int): The number of limit changes kept for monitoring. Defaults to 1024.
+
+        Raises:
+            ValueError: If any of the arguments is out of range.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit"
+            )
+        if increase <= 0:
+            raise ValueError("increase must be positive")
+        if not 0.0 < backoff < 1.0:
+            raise ValueError("backoff must be between 0 and 1")
+        if latency_tolerance <= 1.0:
+            raise ValueError("latency_tolerance must be greater than 1")
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._increase = increase
+        self._backoff = backoff
+        self._latency_tolerance = latency_tolerance
+        self._in_flight = 0
+        self._waiters: deque = deque()
+        self._short_latency: Optional[float] = None
+        self._long_latency: Optional[float] = None
+        self._samples = 0
+        self._last_decrease = float("-inf")
+        self._history: deque = deque(maxlen=history_size)
+        self._history.append((time.time(), initial_limit, "initial"))
+
+    @property
+    def limit(self) -> int:
+        """The current concurrency limit."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """The number of requests currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """The number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    @property
+    def history(self) -> List[Tuple[float, int, str]]:
+        """The recent limit changes as (unix time, limit, reason) tuples."""
+        return list(self._history)
+
+    async def acquire(self) -> None:
+        """Wait for a free slot and take it."""
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just before the cancellation
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        """Give a slot back and wake up waiters that now fit under the limit."""
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def _set_limit(self, limit: float, reason: str) -> None:
+        old = self.limit
+        self._limit = min(float(self._max_limit), max(float(self._min_limit), limit))
+        if self.limit != old:
+            self._history.append((time.time(), self.limit, reason))
+            logger.debug(f"Concurrency limit {old} -> {self.limit} ({reason})")
+            self._wake()
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        cooldown = self._short_latency if self._short_latency is not None else 1.0
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self._set_limit(self._limit * self._backoff, reason)
+
+    def on_success(self, latency: float) -> None:
+        """
+        Report a successful request.
+
+        Args:
+            latency (float): The latency of the request in seconds.
+        """
+        self._samples += 1
+        if self._short_latency is None:
+            self._short_latency = self._long_latency = latency
+        else:
+            self._short_latency += 0.2 * (latency - self._short_latency)
+            self._long_latency += 0.02 * (latency - self._long_latency)
+        if (
+            self._samples >= 20
+            and self._short_latency > self._latency_tolerance * self._long_latency
+        ):
+            self._decrease("latency")
+        elif self._in_flight >= self.limit:
+            # only grow when the current limit is actually in use
+            self._set_limit(self._limit + self._increase / self._limit, "increase")
+
+    def on_overload(self, exc: BaseException) -> None:
+        """
+        Report a request that failed because the upstream is overloaded.
+
+        Args:
+            exc (BaseException): The exception raised by the request.
+        """
+        status = getattr(exc, "status_code", None)
+        self._decrease(str(status) if status is not None else type(exc).__name__)
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `call` in a slot and feed its outcome back into the controller.
+
+        Args:
+            call (Callable[[], Awaitable[T]]): A function starting the request.
+
+        Returns:
+            T: The result of the request.
+        """
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            res = await call()
+        except Exception as e:
+            if is_overload_error(e):
+                self.on_overload(e)
+            raise
+        else:
+            self.on_success(time.perf_counter() - start)
+            return res
+        finally:
+            self.release()
@@ -0,0 +1,138 @@
+from typing import Awaitable, Callable, Optional, TypeVar
+import asyncio
+import time
+
+from .LatencyTracker import LatencyTracker
+from ..utils import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class HedgingPolicy:
+    """
+    Decides when a slow request gets a duplicate ("hedge") sent alongside it.
+
+    A hedge is sent once the primary request has been outstanding for longer than
+    the configured latency quantile of its model. Hedges draw from a token bucket
+    that is refilled by `budget` tokens per primary request, so the extra traffic
+    never exceeds `budget` times the number of requests. When a hedge wins, the time
+    since the primary request was sent is recorded as a lower bound of its latency, so
+    the cancelled slow requests keep the tracked quantile from drifting low.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        window: int = 512,
+        burst: float = 10.0,
+    ):
+        """
+        Initialize the HedgingPolicy.
+
+        Args:
+            quantile (float): The latency quantile after which a hedge is sent. Defaults to 0.95.
+            budget (float): The maximum fraction of extra requests spent on hedges. Defaults to 0.05.
+            min_samples (int): The number of latency samples a model needs before it is hedged. Defaults to 20.
+            window (int): The number of recent latency samples tracked per model. Defaults to 512.
+            burst (float): The maximum number of hedge tokens that can be saved up. Defaults to 10.0.
+
+        Raises:
+            ValueError: If any of the arguments is out of range.
+        """
+        if not 0.0 < quantile < 1.0:
+            raise ValueError("quantile must be between 0 and 1")
+        if not 0.0 <= budget <= 1.0:
+            raise ValueError("budget must be between 0 and 1")
+        if min_samples < 1:
+            raise ValueError("min_samples must be at least 1")
+        if burst < 1.0:
+            raise ValueError("burst must be at least 1")
+        self._quantile = quantile
+        self._budget = budget
+        self._min_samples = min_samples
+        self._burst = burst
+        self._tokens = 0.0
+        self._latency_tracker = LatencyTracker(window)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def latency_tracker(self) -> LatencyTracker:
+        return self._latency_tracker
+
+    def record_latency(self, model: str, latency: float) -> None:
+        """Record the latency of a completed request to `model`."""
+        self._latency_tracker.record(model, latency)
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """
+        Return how long to wait for a request to `model` before hedging it.
+
+        Returns:
+            Optional[float]: The delay in seconds, or None if there are not enough samples yet.
+        """
+        if self._latency_tracker.count(model) < self._min_samples:
+            return None
+        return self._latency_tracker.quantile(model, self._quantile)
+
+    def _on_request(self) -> None:
+        self.requests += 1
+        self._tokens = min(self._burst, self._tokens + self._budget)
+
+    def _try_acquire(self) -> bool:
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        self.hedges += 1
+        return True
+
+    async def run(self, model: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `call`, hedging it with a second `call` if it is slower than the latency quantile of `model`.
+
+        The first successful result is returned and the other attempt is cancelled. If both
+        attempts fail, the last exception is raised.
+
+        Args:
+            model (str): The model the request is sent to.
+            call (Callable[[], Awaitable[T]]): A function that starts one attempt of the request.
+
+        Returns:
+            T: The result of the first successful attempt.
+        """
+        self._on_request()
+        delay = self.hedge_delay(model)
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(call())
+        pending = {primary}
+        try:
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not self._try_acquire():
+                return await primary
+            logger.debug(f"Hedging request to {model} after {delay:.3f}s")
+            hedge = asyncio.ensure_future(call())
+            pending.add(hedge)
+            last_exc: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                            # the cancelled primary took at least this long
+                            self.record_latency(model, time.perf_counter() - start)
+                        return task.result()
+                    last_exc = task.exception()
+            raise last_exc
+        finally:
+            for task in pending:
+                task.cancel()
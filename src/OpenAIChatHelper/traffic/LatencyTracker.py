@@ -0,0 +1,75 @@
+from typing import Dict, Hashable, List, Optional
+from collections import deque
+import bisect
+
+
+class LatencyTracker:
+    """
+    Tracks a sliding window of recent latencies per key (usually the model name)
+    and answers quantile queries online.
+
+    Each key keeps the last `window` samples both in arrival order, so the oldest
+    sample can be evicted, and in sorted order, so quantiles are a single lookup.
+    """
+
+    def __init__(self, window: int = 512):
+        """
+        Initialize the LatencyTracker.
+
+        Args:
+            window (int): The number of most recent samples kept per key. Defaults to 512.
+
+        Raises:
+            ValueError: If `window` is not a positive integer.
+        """
+        if not isinstance(window, int) or window <= 0:
+            raise ValueError("window must be a positive integer")
+        self._window = window
+        self._samples: Dict[Hashable, deque] = {}
+        self._sorted: Dict[Hashable, List[float]] = {}
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    def record(self, key: Hashable, latency: float) -> None:
+        """
+        Record a latency sample for a key.
+
+        Args:
+            key (Hashable): The key the sample belongs to, e.g. the model name.
+            latency (float): The observed latency in seconds.
+        """
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque()
+            self._sorted[key] = []
+        ordered = self._sorted[key]
+        if len(samples) == self._window:
+            oldest = samples.popleft()
+            del ordered[bisect.bisect_left(ordered, oldest)]
+        samples.append(latency)
+        bisect.insort(ordered, latency)
+
+    def count(self, key: Hashable) -> int:
+        """Return the number of samples currently held for a key."""
+        samples = self._samples.get(key)
+        return len(samples) if samples is not None else 0
+
+    def quantile(self, key: Hashable, q: float) -> Optional[float]:
+        """
+        Return the `q` quantile of the recent latencies of a key.
+
+        Args:
+            key (Hashable): The key to query.
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            Optional[float]: The latency at the quantile, or None if there are no samples.
+        """
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("q must be between 0 and 1")
+        ordered = self._sorted.get(key)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
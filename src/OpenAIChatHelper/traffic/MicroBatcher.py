@@ -0,0 +1,129 @@
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+import asyncio
+
+I = TypeVar("I")
+O = TypeVar("O")
+
+
+def _fail(future: asyncio.Future, error: Exception) -> None:
+    if not future.done():
+        future.set_exception(error)
+
+
+class MicroBatcher(Generic[I, O]):
+    """
+    Gathers items submitted by many coroutines into batches for a single call.
+
+    A batch is flushed as soon as it holds `max_batch_size` items or `max_wait`
+    seconds after its first item arrived, whichever comes first. `process` receives
+    the items of a batch and must return one result per item, in the same order.
+    Batches are gathered on one event loop at a time: items still pending when a new
+    loop submits, e.g. because their loop ended before the flush, fail.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[I]], Awaitable[List[O]]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.01,
+    ):
+        """
+        Initialize the MicroBatcher.
+
+        Args:
+            process (Callable[[List[I]], Awaitable[List[O]]]): The function processing a batch.
+            max_batch_size (int): The maximum number of items per batch. Defaults to 32.
+            max_wait (float): The maximum number of seconds an item waits for its batch to fill. Defaults to 0.01.
+
+        Raises:
+            ValueError: If `max_batch_size` is not positive or `max_wait` is negative.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be positive")
+        if max_wait < 0:
+            raise ValueError("max_wait must not be negative")
+        self._process = process
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._pending: List[Tuple[I, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    @property
+    def mean_batch_size(self) -> float:
+        """The average number of items per flushed batch."""
+        return self.items / self.batches if self.batches else 0.0
+
+    async def submit(self, item: I) -> O:
+        """
+        Add an item to the current batch and wait for its result.
+
+        Args:
+            item (I): The item.
+
+        Returns:
+            O: The result `process` returned for the item.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._reset(loop)
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self._max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self.flush)
+        return await future
+
+    def _reset(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Drop the timer and the pending items of the previous event loop."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        error = RuntimeError("The event loop of the batch changed before it was sent")
+        for _, future in pending:
+            if future.done():
+                continue
+            old_loop = future.get_loop()
+            if old_loop.is_closed():
+                try:
+                    future.set_exception(error)
+                except RuntimeError:
+                    # no loop is left to run its callbacks
+                    pass
+            else:
+                old_loop.call_soon_threadsafe(_fail, future, error)
+        self._loop = loop
+
+    def flush(self) -> None:
+        """Send the current batch now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        task = asyncio.ensure_future(self._run(batch))
+        # keep a reference so that the task is not garbage collected while running
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[I, asyncio.Future]]) -> None:
+        try:
+            results = await self._process([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} results, got {len(results)}")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,233 @@
+from typing import Any, Dict, List, Optional, Sequence
+import random
+import time
+
+from .AdaptiveConcurrency import is_overload_error
+from ..utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class _ModelHealth:
+    """The latency and error averages and the circuit state of one model."""
+
+    __slots__ = (
+        "latency",
+        "error_rate",
+        "samples",
+        "failures",
+        "opened_at",
+        "probing_since",
+    )
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing_since: Optional[float] = None
+
+
+class ModelRouter:
+    """
+    Orders a primary model and its fallbacks by their recent health.
+
+    Every model has an exponentially weighted moving average (EWMA) of its latency and
+    of its rate of overload errors (429, 5xx and timeouts). A model whose latency EWMA
+    is over the SLO, or whose error EWMA is over `error_threshold`, is degraded and
+    tried after the healthy ones; an occasional request still goes to it so that its
+    averages can recover. After `failure_threshold` overload errors in a row the
+    circuit of the model opens and it is only tried as a last resort. Once
+    `open_duration` has passed, one probe request is let through: a success closes
+    the circuit, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        latency_slo: Optional[float] = None,
+        error_threshold: float = 0.2,
+        failure_threshold: int = 5,
+        open_duration: float = 30.0,
+        alpha: float = 0.2,
+        min_samples: int = 5,
+        probe_rate: float = 0.05,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize the ModelRouter.
+
+        Args:
+            latency_slo (Optional[float]): The latency in seconds above which a model is degraded (optional).
+            error_threshold (float): The overload error rate above which a model is degraded. Defaults to 0.2.
+            failure_threshold (int): The number of overload errors in a row that opens the circuit of a model. Defaults to 5.
+            open_duration (float): The number of seconds a circuit stays open before a probe request. Defaults to 30.0.
+            alpha (float): The weight of the latest request in the moving averages. Defaults to 0.2.
+            min_samples (int): The number of requests a model needs before it can be degraded. Defaults to 5.
+            probe_rate (float): The fraction of requests sent to a degraded model although a healthy one is available. Defaults to 0.05.
+            seed (Optional[int]): The seed of the probe sampling (optional).
+
+        Raises:
+            ValueError: If any of the arguments is out of range.
+        """
+        if latency_slo is not None and latency_slo <= 0:
+            raise ValueError("latency_slo must be positive")
+        if not 0.0 < error_threshold <= 1.0:
+            raise ValueError("error_threshold must be between 0 and 1")
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        if open_duration <= 0:
+            raise ValueError("open_duration must be positive")
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be between 0 and 1")
+        if not 0.0 <= probe_rate <= 1.0:
+            raise ValueError("probe_rate must be between 0 and 1")
+        self._latency_slo = latency_slo
+        self._error_threshold = error_threshold
+        self._failure_threshold = failure_threshold
+        self._open_duration = open_duration
+        self._alpha = alpha
+        self._min_samples = min_samples
+        self._probe_rate = probe_rate
+        self._rng = random.Random(seed)
+        self._health: Dict[str, _ModelHealth] = {}
+
+    def _get(self, model: str) -> _ModelHealth:
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = _ModelHealth()
+        return health
+
+    def _state(self, health: _ModelHealth, now: float) -> str:
+        if health.opened_at is None:
+            return "closed"
+        if now - health.opened_at < self._open_duration:
+            return "open"
+        return "half_open"
+
+    def _degraded(self, health: _ModelHealth) -> bool:
+        if health.samples < self._min_samples:
+            return False
+        if health.error_rate > self._error_threshold:
+            return True
+        return (
+            self._latency_slo is not None
+            and health.latency is not None
+            and health.latency > self._latency_slo
+        )
+
+    def state(self, model: str) -> str:
+        """
+        Return the circuit state of a model.
+
+        Returns:
+            str: "closed" while requests flow normally, "open" while the model is avoided, or "half_open" once a probe request is due.
+        """
+        health = self._health.get(model)
+        if health is None:
+            return "closed"
+        return self._state(health, time.monotonic())
+
+    def route(self, models: Sequence[str]) -> List[str]:
+        """
+        Order models by preference for the next request.
+
+        A model whose probe is due comes first, then the healthy models, the degraded
+        ones and the ones with an open circuit, each group in the given order. Choosing
+        a model whose probe is due starts the probe.
+
+        Args:
+            models (Sequence[str]): The primary model followed by its fallbacks.
+
+        Returns:
+            List[str]: The same models, most preferred first.
+        """
+        now = time.monotonic()
+        probes, healthy, degraded, unavailable = [], [], [], []
+        for model in dict.fromkeys(models):
+            health = self._health.get(model)
+            if health is None:
+                healthy.append(model)
+                continue
+            state = self._state(health, now)
+            if state == "closed":
+                (degraded if self._degraded(health) else healthy).append(model)
+            elif state == "half_open" and (
+                health.probing_since is None
+                # a probe that never reported back is given up
+                or now - health.probing_since > self._open_duration
+            ):
+                health.probing_since = now
+                probes.append(model)
+            else:
+                unavailable.append(model)
+        if degraded and healthy and self._rng.random() < self._probe_rate:
+            # let a degraded model show whether it has recovered
+            probes.append(degraded.pop(0))
+        unavailable.sort(key=lambda model: self._health[model].opened_at)
+        return probes + healthy + degraded + unavailable
+
+    def record_success(self, model: str, latency: float) -> None:
+        """
+        Report a successful request to a model.
+
+        Args:
+            model (str): The model that answered.
+            latency (float): The latency of the request in seconds.
+        """
+        health = self._get(model)
+        health.samples += 1
+        if health.latency is None:
+            health.latency = latency
+        else:
+            health.latency += self._alpha * (latency - health.latency)
+        health.error_rate -= self._alpha * health.error_rate
+        health.failures = 0
+        health.probing_since = None
+        if health.opened_at is not None:
+            health.opened_at = None
+            logger.info(f"Circuit of model {model} closed")
+
+    def record_failure(self, model: str, exc: BaseException) -> None:
+        """
+        Report a failed request to a model. Only overload errors count against the model.
+
+        Args:
+            model (str): The model that failed.
+            exc (BaseException): The exception raised by the request.
+        """
+        if not is_overload_error(exc):
+            return
+        health = self._get(model)
+        health.samples += 1
+        health.error_rate += self._alpha * (1.0 - health.error_rate)
+        health.failures += 1
+        now = time.monotonic()
+        reopen = health.probing_since is not None and health.opened_at is not None
+        health.probing_since = None
+        if reopen or (
+            health.opened_at is None and health.failures >= self._failure_threshold
+        ):
+            health.opened_at = now
+            logger.warning(
+                f"Circuit of model {model} opened after {health.failures} overload errors"
+            )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the health of every model seen.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The latency EWMA in seconds, the error rate EWMA, the number of requests, the overload errors in a row and the circuit state of every model.
+        """
+        now = time.monotonic()
+        return {
+            model: {
+                "latency": health.latency,
+                "error_rate": health.error_rate,
+                "requests": health.samples,
+                "failures": health.failures,
+                "state": self._state(health, now),
+            }
+            for model, health in self._health.items()
+        }
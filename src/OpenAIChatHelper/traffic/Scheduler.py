@@ -0,0 +1,248 @@
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from collections import OrderedDict, deque
+import asyncio
+import time
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the deadline of a request passes, unlike timeouts of a single attempt."""
+
+
+class _Waiter:
+    __slots__ = ("future", "deadline", "timer")
+
+    def __init__(self, future: asyncio.Future, deadline: Optional[float]):
+        self.future = future
+        self.deadline = deadline
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class _Lane:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.tenants: "OrderedDict[str, deque]" = OrderedDict()
+        self.queued = 0
+        self.pass_value = 0.0
+
+
+class RequestScheduler:
+    """
+    Admits requests into a fixed number of slots using weighted priority lanes,
+    fair queuing across tenants within a lane and deadline-aware dequeueing.
+
+    Lanes share the slots in proportion to their weights (stride scheduling), so a
+    lane with weight 10 is served ten times as often as a backlogged lane with
+    weight 1. Inside a lane, tenants are served round-robin so that a single tenant
+    flooding the lane only delays its own requests. Requests whose deadline passes
+    while they are queued are dropped with a `DeadlineExceeded` error instead of being sent.
+
+    Requests must not queue again behind the scheduler, where lanes, tenants and
+    deadlines are ignored, so a scheduler running in front of an adaptive concurrency
+    limiter admits no more requests than the limiter's current limit (see
+    `set_limit_source`).
+    """
+
+    def __init__(
+        self,
+        lane_weights: Optional[Dict[str, float]] = None,
+        max_concurrency: int = 16,
+        default_lane: Optional[str] = None,
+    ):
+        """
+        Initialize the RequestScheduler.
+
+        Args:
+            lane_weights (Optional[Dict[str, float]]): The weight of every lane. Defaults to {"interactive": 10, "batch": 1}.
+            max_concurrency (int): The number of requests admitted at the same time. Defaults to 16.
+            default_lane (Optional[str]): The lane used when none is given. Defaults to the first lane.
+
+        Raises:
+            ValueError: If a weight is not positive, `max_concurrency` is not positive or `default_lane` is unknown.
+        """
+        if lane_weights is None:
+            lane_weights = {"interactive": 10.0, "batch": 1.0}
+        if not lane_weights:
+            raise ValueError("At least one lane is required")
+        for name, weight in lane_weights.items():
+            if weight <= 0:
+                raise ValueError(f"Weight of lane {name} must be positive")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if default_lane is None:
+            default_lane = next(iter(lane_weights))
+        if default_lane not in lane_weights:
+            raise ValueError(f"Unknown default lane: {default_lane}")
+        self._lanes = {name: _Lane(weight) for name, weight in lane_weights.items()}
+        self._max_concurrency = max_concurrency
+        self._default_lane = default_lane
+        self._limit_source: Optional[Callable[[], int]] = None
+        self._in_flight = 0
+        self._queued = 0
+        self._virtual_time = 0.0
+        self.dropped = 0
+
+    def set_limit_source(self, limit_source: Optional[Callable[[], int]]) -> None:
+        """
+        Bound the number of admitted requests by a changing limit as well.
+
+        The limit is read whenever a request is admitted or released, so a limit that
+        changes while requests run takes effect with the next release.
+
+        Args:
+            limit_source (Optional[Callable[[], int]]): A function returning the current limit, e.g. of an `AdaptiveConcurrencyLimiter`, or None to only use `max_concurrency`.
+        """
+        self._limit_source = limit_source
+
+    def _capacity(self) -> int:
+        if self._limit_source is None:
+            return self._max_concurrency
+        return min(self._max_concurrency, self._limit_source())
+
+    @property
+    def in_flight(self) -> int:
+        """The number of admitted requests that have not been released yet."""
+        return self._in_flight
+
+    def queued(self, lane: Optional[str] = None) -> int:
+        """
+        Return the number of queued requests.
+
+        Args:
+            lane (Optional[str]): Only count the requests of this lane. Defaults to all lanes.
+
+        Returns:
+            int: The number of queued requests.
+        """
+        if lane is None:
+            return self._queued
+        return self._lanes[lane].queued
+
+    async def acquire(
+        self,
+        lane: Optional[str] = None,
+        tenant: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> None:
+        """
+        Wait until the request is admitted.
+
+        Args:
+            lane (Optional[str]): The lane of the request. Defaults to the default lane.
+            tenant (Optional[str]): The tenant the request belongs to. Defaults to a shared tenant.
+            deadline (Optional[float]): The `time.monotonic()` time after which the request is dropped (optional).
+
+        Raises:
+            ValueError: If `lane` is unknown.
+            DeadlineExceeded: If the deadline passes before the request is admitted.
+        """
+        if lane is None:
+            lane = self._default_lane
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown lane: {lane}")
+        if deadline is not None and deadline <= time.monotonic():
+            self.dropped += 1
+            raise DeadlineExceeded("Deadline exceeded before the request was scheduled")
+        if self._in_flight < self._capacity() and self._queued == 0:
+            self._in_flight += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop.create_future(), deadline)
+        queue = self._lanes[lane]
+        if queue.queued == 0:
+            # an idle lane does not bank credit while it has nothing to send
+            queue.pass_value = max(queue.pass_value, self._virtual_time)
+        queue.tenants.setdefault(tenant or "", deque()).append(waiter)
+        queue.queued += 1
+        self._queued += 1
+        if deadline is not None:
+            waiter.timer = loop.call_at(
+                loop.time() + deadline - time.monotonic(), self._expire, waiter
+            )
+        # slots may be free if everything queued ahead was cancelled or expired
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # the slot was handed over just before the cancellation
+                self.release()
+            raise
+        finally:
+            if waiter.timer is not None:
+                waiter.timer.cancel()
+
+    def release(self) -> None:
+        """Give a slot back and admit the next queued requests."""
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _expire(self, waiter: _Waiter) -> None:
+        if not waiter.future.done():
+            self.dropped += 1
+            waiter.future.set_exception(
+                DeadlineExceeded("Deadline exceeded while the request was queued")
+            )
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        lane = None
+        for candidate in self._lanes.values():
+            if candidate.queued and (
+                lane is None or candidate.pass_value < lane.pass_value
+            ):
+                lane = candidate
+        if lane is None:
+            return None
+        tenant, queue = next(iter(lane.tenants.items()))
+        waiter = queue.popleft()
+        if queue:
+            lane.tenants.move_to_end(tenant)
+        else:
+            del lane.tenants[tenant]
+        lane.queued -= 1
+        self._queued -= 1
+        if not waiter.future.done():
+            self._virtual_time = lane.pass_value
+            lane.pass_value += 1.0 / lane.weight
+        return waiter
+
+    def _dispatch(self) -> None:
+        while self._in_flight < self._capacity():
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if waiter.future.done():
+                # cancelled or expired while queued
+                continue
+            if waiter.deadline is not None and waiter.deadline <= time.monotonic():
+                self._expire(waiter)
+                continue
+            self._in_flight += 1
+            waiter.future.set_result(None)
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        lane: Optional[str] = None,
+        tenant: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> T:
+        """
+        Run `call` once it is admitted by the scheduler.
+
+        Args:
+            call (Callable[[], Awaitable[T]]): A function starting the request.
+            lane (Optional[str]): The lane of the request. Defaults to the default lane.
+            tenant (Optional[str]): The tenant the request belongs to. Defaults to a shared tenant.
+            deadline (Optional[float]): The `time.monotonic()` time after which a queued request is dropped (optional).
+
+        Returns:
+            T: The result of the request.
+        """
+        await self.acquire(lane, tenant, deadline)
+        try:
+            return await call()
+        finally:
+            self.release()
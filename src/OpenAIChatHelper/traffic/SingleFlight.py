@@ -0,0 +1,81 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+import asyncio
+import hashlib
+import json
+
+T = TypeVar("T")
+
+
+def canonical_key(payload: Any) -> str:
+    """
+    Compute a stable key for a JSON-like payload.
+
+    The payload is encoded with sorted keys and without insignificant whitespace, so
+    two payloads that are equal as JSON always map to the same key.
+
+    Args:
+        payload (Any): The payload, e.g. the body of a chat completion request.
+
+    Returns:
+        str: The hex digest of the canonical encoding.
+    """
+    encoded = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.joined = 0
+        self.waiting = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single in-flight call.
+
+    The first caller for a key starts the call; callers arriving while it is still
+    running await the same result instead of starting their own. The call is
+    cancelled only when every caller waiting on it has been cancelled.
+    """
+
+    def __init__(self):
+        """Initialize an empty SingleFlight group."""
+        self._flights: Dict[str, _Flight] = {}
+
+    def __len__(self) -> int:
+        """Return the number of calls currently in flight."""
+        return len(self._flights)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Run `fn` unless a call with the same key is already in flight, and return its result.
+
+        Args:
+            key (str): The key identifying identical calls, see `canonical_key`.
+            fn (Callable[[], Awaitable[T]]): A function starting the call.
+
+        Returns:
+            Tuple[T, bool]: The result and whether it was shared with other callers. Shared
+            results are the same object for every caller, so mutable results should be copied.
+        """
+        flight = self._flights.get(key)
+        if flight is None or flight.task.done():
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        flight.joined += 1
+        flight.waiting += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiting -= 1
+            if flight.waiting == 0 and not flight.task.done():
+                flight.task.cancel()
+        return result, flight.joined > 1
@@ -0,0 +1,7 @@
+from .LatencyTracker import *
+from .Hedging import *
+from .SingleFlight import *
+from .AdaptiveConcurrency import *
+from .Scheduler import *
+from .MicroBatcher import *
+from .ModelRouter import *
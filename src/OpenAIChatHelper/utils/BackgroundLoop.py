@@ -0,0 +1,121 @@
+from typing import Any, Coroutine, Optional
+import asyncio
+import concurrent.futures
+import threading
+
+from .Logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running forever on a dedicated daemon thread.
+
+    Synchronous code submits coroutines to it from any thread. Because the loop and its
+    default executor outlive each call, connection pools, executor threads and
+    loop-bound primitives such as locks and semaphores stay warm between calls.
+    """
+
+    _shared: Optional["BackgroundLoop"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers: Optional[int] = None, name: str = "openai-loop"):
+        """
+        Start the loop thread.
+
+        Args:
+            max_workers (Optional[int]): The number of threads of the loop's default executor, used by `asyncio.to_thread`. Defaults to the asyncio default.
+            name (str): The name of the loop thread. Defaults to "openai-loop".
+        """
+        self._loop = asyncio.new_event_loop()
+        if max_workers is not None:
+            self._loop.set_default_executor(
+                concurrent.futures.ThreadPoolExecutor(max_workers, name + "-worker")
+            )
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls) -> "BackgroundLoop":
+        """Return the process-wide background loop, starting it on first use."""
+        with cls._shared_lock:
+            if cls._shared is None or cls._shared.closed:
+                cls._shared = cls()
+            return cls._shared
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    @property
+    def closed(self) -> bool:
+        return self._loop.is_closed()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """
+        Schedule a coroutine on the loop from any thread.
+
+        Args:
+            coro (Coroutine): The coroutine to run.
+
+        Returns:
+            concurrent.futures.Future: A future resolving to the result of the coroutine.
+
+        Raises:
+            RuntimeError: If the loop is closed.
+        """
+        if self.closed:
+            raise RuntimeError("The background loop is closed")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and block until it finishes.
+
+        The coroutine is cancelled if the timeout expires or the waiting thread is
+        interrupted.
+
+        Args:
+            coro (Coroutine): The coroutine to run.
+            timeout (Optional[float]): The maximum number of seconds to wait. Defaults to no limit.
+
+        Returns:
+            Any: The result of the coroutine.
+
+        Raises:
+            RuntimeError: If called from the loop thread itself, which would deadlock.
+            TimeoutError: If the timeout expires.
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError(
+                "Cannot block on the background loop from its own thread"
+            )
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            if future.done():
+                # raised by the coroutine itself
+                raise
+            future.cancel()
+            raise TimeoutError(f"Timed out after {timeout} seconds")
+        except BaseException:
+            future.cancel()
+            raise
+
+    def close(self) -> None:
+        """Stop the loop, wait for the thread and shut down the default executor."""
+        if self.closed:
+            return
+        if hasattr(self._loop, "shutdown_default_executor"):
+            self.submit(self._loop.shutdown_default_executor()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        logger.debug("Background loop closed")
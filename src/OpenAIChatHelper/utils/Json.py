@@ -0,0 +1,40 @@
+from typing import Any, Union
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """
+    Decode JSON, using orjson when it is installed.
+
+    Args:
+        data (Union[bytes, str]): The JSON document.
+
+    Returns:
+        Any: The decoded value.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(value: Any) -> bytes:
+    """
+    Encode a value as compact UTF-8 JSON, using orjson when it is installed.
+
+    Non-string dictionary keys, e.g. the token ids of `logit_bias`, are converted to
+    strings by both encoders.
+
+    Args:
+        value (Any): The value to encode.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
@@ -0,0 +1,126 @@
+from typing import Any, Dict, List, Optional
+import threading
+
+
+class _TemplateStats:
+    __slots__ = (
+        "requests",
+        "hits",
+        "prompt_tokens",
+        "cached_tokens",
+        "hit_latency",
+        "miss_latency",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.hits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.hit_latency = 0.0
+        self.miss_latency = 0.0
+
+
+def _field(obj: Any, name: str) -> Any:
+    """Read a field of a pydantic model, a response view or a dict."""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class PromptCacheTracker:
+    """
+    Collect the prompt cache usage reported by the API per prompt template.
+
+    A request counts as a hit when any of its prompt tokens were cached. The latency
+    saved by the cache is estimated from the difference between the mean latency of
+    misses and of hits of the same template.
+    """
+
+    def __init__(self):
+        """Initialize an empty PromptCacheTracker."""
+        self._templates: Dict[str, _TemplateStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, template: str, usage: Any, latency: float) -> None:
+        """
+        Record the usage of one response.
+
+        Args:
+            template (str): The key of the prompt template of the request.
+            usage (Any): The `usage` of the response, as a pydantic model or a dict.
+            latency (float): The latency of the request in seconds.
+        """
+        prompt_tokens = _field(usage, "prompt_tokens") or 0
+        cached_tokens = (
+            _field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0
+        )
+        with self._lock:
+            stats = self._templates.get(template)
+            if stats is None:
+                stats = self._templates[template] = _TemplateStats()
+            stats.requests += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.cached_tokens += cached_tokens
+            if cached_tokens:
+                stats.hits += 1
+                stats.hit_latency += latency
+            else:
+                stats.miss_latency += latency
+
+    def templates(self) -> List[str]:
+        """Return the keys of all recorded templates."""
+        with self._lock:
+            return list(self._templates)
+
+    def stats(self, template: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Return the prompt cache statistics of a template or of all templates together.
+
+        Args:
+            template (Optional[str]): The template key. Defaults to all templates.
+
+        Returns:
+            Dict[str, Any]: The request, hit and token counts, the hit rate, the fraction of
+            prompt tokens that were cached, the mean latency of hits and misses and the
+            estimated total latency saved in seconds.
+
+        Raises:
+            ValueError: If `template` was never recorded.
+        """
+        with self._lock:
+            if template is None:
+                selected = list(self._templates.values())
+            elif template in self._templates:
+                selected = [self._templates[template]]
+            else:
+                raise ValueError(f"Unknown template: {template}")
+            requests = sum(s.requests for s in selected)
+            hits = sum(s.hits for s in selected)
+            prompt_tokens = sum(s.prompt_tokens for s in selected)
+            cached_tokens = sum(s.cached_tokens for s in selected)
+            hit_latency = sum(s.hit_latency for s in selected)
+            miss_latency = sum(s.miss_latency for s in selected)
+            latency_saved = 0.0
+            for s in selected:
+                if s.hits and s.requests > s.hits:
+                    saved = (
+                        s.miss_latency / (s.requests - s.hits) - s.hit_latency / s.hits
+                    )
+                    latency_saved += saved * s.hits
+        misses = requests - hits
+        return {
+            "requests": requests,
+            "hits": hits,
+            "hit_rate": hits / requests if requests else 0.0,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cached_token_rate": (
+                cached_tokens / prompt_tokens if prompt_tokens else 0.0
+            ),
+            "mean_hit_latency": hit_latency / hits if hits else None,
+            "mean_miss_latency": miss_latency / misses if misses else None,
+            "latency_saved": latency_saved,
+        }
@@ -0,0 +1,225 @@
+from typing import Any, List, Tuple, Union
+import json
+import re
+
+_NUMBER_RE = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_NUMBER_CHARS_RE = re.compile(r"[-+0-9.eE]+")
+_LITERALS = (("true", True), ("false", False), ("null", None))
+_WHITESPACE = " \t\r\n"
+
+JsonPath = Tuple[Union[str, int], ...]
+
+
+class IncrementalJsonParser:
+    """
+    A JSON parser fed with text chunks that reports every value as soon as it is closed.
+
+    Each chunk is scanned once: the parser keeps the partial value, the stack of open
+    objects and arrays and the scan position inside an unfinished string, so parsing a
+    document delivered in many chunks takes linear time.
+
+    Example:
+        >>> parser = IncrementalJsonParser(max_depth=2)
+        >>> parser.feed('{"items": [{"a": 1}, ')
+        [(('items', 0), {'a': 1})]
+    """
+
+    def __init__(self, max_depth: int = 2):
+        """
+        Initialize the IncrementalJsonParser.
+
+        Args:
+            max_depth (int): The maximum length of the path of reported values. 0 only reports the whole document, 1 also its fields or elements, and so on. Defaults to 2.
+
+        Raises:
+            ValueError: If `max_depth` is negative.
+        """
+        if max_depth < 0:
+            raise ValueError("max_depth must not be negative")
+        self._max_depth = max_depth
+        self._buffer = ""
+        # chunks received while waiting for the end of a long string
+        self._pending: List[str] = []
+        self._position = 0
+        self._string_scan = 0
+        # open containers as [container, key, expected token]
+        self._stack: List[list] = []
+        self._done = False
+        self._value: Any = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the whole document has been parsed."""
+        return self._done
+
+    @property
+    def value(self) -> Any:
+        """The parsed document, once `done`."""
+        return self._value
+
+    def _path(self) -> JsonPath:
+        return tuple(
+            len(container) if isinstance(container, list) else key
+            for container, key, _ in self._stack
+        )
+
+    def _complete(self, value: Any, events: List[Tuple[JsonPath, Any]]) -> None:
+        if len(self._stack) <= self._max_depth:
+            events.append((self._path(), value))
+        if not self._stack:
+            self._done = True
+            self._value = value
+            return
+        frame = self._stack[-1]
+        if isinstance(frame[0], list):
+            frame[0].append(value)
+        else:
+            frame[0][frame[1]] = value
+        frame[2] = "comma_or_end"
+
+    def _scan_string(self, final: bool) -> Union[str, None]:
+        """Return the string starting at the position, or None if it is not closed yet."""
+        buffer = self._buffer
+        start = self._position
+        index = max(self._string_scan, start + 1)
+        while True:
+            end = buffer.find('"', index)
+            if end < 0:
+                if final:
+                    raise ValueError("Unterminated string")
+                self._string_scan = len(buffer)
+                return None
+            backslashes = 0
+            while buffer[end - 1 - backslashes] == "\\":
+                backslashes += 1
+            if backslashes % 2 == 0:
+                break
+            index = end + 1
+        self._string_scan = 0
+        self._position = end + 1
+        return json.loads(buffer[start : end + 1])
+
+    def _parse(self, final: bool) -> List[Tuple[JsonPath, Any]]:
+        events: List[Tuple[JsonPath, Any]] = []
+        buffer = self._buffer
+        length = len(buffer)
+        while self._position < length:
+            char = buffer[self._position]
+            if char in _WHITESPACE:
+                self._position += 1
+                continue
+            if self._done:
+                raise ValueError(f"Extra data at position {self._position}")
+            expected = self._stack[-1][2] if self._stack else "value"
+
+            if expected in {"key", "key_or_end"} and char == '"':
+                key = self._scan_string(final)
+                if key is None:
+                    break
+                self._stack[-1][1] = key
+                self._stack[-1][2] = "colon"
+            elif expected in {"key_or_end", "comma_or_end"} and char == "}":
+                if not isinstance(self._stack[-1][0], dict):
+                    raise ValueError(f"Unexpected '}}' at position {self._position}")
+                self._position += 1
+                self._complete(self._stack.pop()[0], events)
+            elif expected in {"value_or_end", "comma_or_end"} and char == "]":
+                if not isinstance(self._stack[-1][0], list):
+                    raise ValueError(f"Unexpected ']' at position {self._position}")
+                self._position += 1
+                self._complete(self._stack.pop()[0], events)
+            elif expected == "colon" and char == ":":
+                self._position += 1
+                self._stack[-1][2] = "value"
+            elif expected == "comma_or_end" and char == ",":
+                self._position += 1
+                self._stack[-1][2] = (
+                    "value" if isinstance(self._stack[-1][0], list) else "key"
+                )
+            elif expected in {"value", "value_or_end"}:
+                if char == "{":
+                    self._position += 1
+                    self._stack.append([{}, None, "key_or_end"])
+                elif char == "[":
+                    self._position += 1
+                    self._stack.append([[], None, "value_or_end"])
+                elif char == '"':
+                    value = self._scan_string(final)
+                    if value is None:
+                        break
+                    self._complete(value, events)
+                elif char == "-" or char.isdigit():
+                    end = _NUMBER_CHARS_RE.match(buffer, self._position).end()
+                    if end == length and not final:
+                        # the number may continue in the next chunk
+                        break
+                    token = buffer[self._position : end]
+                    if not _NUMBER_RE.fullmatch(token):
+                        raise ValueError(
+                            f"Invalid number {token!r} at position {self._position}"
+                        )
+                    self._position = end
+                    self._complete(json.loads(token), events)
+                else:
+                    for literal, value in _LITERALS:
+                        if buffer.startswith(literal, self._position):
+                            self._position += len(literal)
+                            self._complete(value, events)
+                            break
+                        if not final and literal.startswith(buffer[self._position :]):
+                            return events
+                    else:
+                        raise ValueError(
+                            f"Unexpected {char!r} at position {self._position}"
+                        )
+            else:
+                raise ValueError(f"Unexpected {char!r} at position {self._position}")
+        return events
+
+    def feed(self, chunk: str) -> List[Tuple[JsonPath, Any]]:
+        """
+        Parse the next chunk of the document.
+
+        Args:
+            chunk (str): The next piece of the document text.
+
+        Returns:
+            List[Tuple[JsonPath, Any]]: The path and value of every value closed by this chunk whose path is at most `max_depth` long, innermost first. A path holds the object keys and array indices leading to the value.
+
+        Raises:
+            ValueError: If the text is not valid JSON.
+        """
+        if self._string_scan and '"' not in chunk:
+            self._pending.append(chunk)
+            return []
+        if self._pending:
+            self._pending.append(chunk)
+            chunk = "".join(self._pending)
+            self._pending = []
+        self._buffer += chunk
+        events = self._parse(final=False)
+        if self._position:
+            # drop the consumed text so the buffer only holds the unfinished token
+            if self._string_scan:
+                self._string_scan -= self._position
+            self._buffer = self._buffer[self._position :]
+            self._position = 0
+        return events
+
+    def close(self) -> List[Tuple[JsonPath, Any]]:
+        """
+        Finish parsing at the end of the document.
+
+        Returns:
+            List[Tuple[JsonPath, Any]]: The values closed by the end of the text, such as a top-level number.
+
+        Raises:
+            ValueError: If the document is incomplete or invalid.
+        """
+        if self._pending:
+            self._buffer += "".join(self._pending)
+            self._pending = []
+        events = self._parse(final=True)
+        if not self._done:
+            raise ValueError("Incomplete JSON document")
+        return events
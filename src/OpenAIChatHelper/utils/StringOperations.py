@@ -1,4 +1,5 @@
-from typing import List, Iterable
+from typing import List, Iterable, Optional, Tuple
+import re
 from markdown_it import MarkdownIt
 from mdformat.renderer import MDRenderer
 
@@ -127,3 +128,274 @@ def split_ordered_list(
     except Exception as e:
         logger.error(f"Error splitting ordered list: {e}")
         return [text]
+
+
+_ORDERED_MARKER_RE = re.compile(r"( {0,3})(\d{1,9})([.)])([ \t]+|$)")
+_BULLET_MARKER_RE = re.compile(r"( {0,3})([-*+])([ \t]+|$)")
+_FENCE_RE = re.compile(r" {0,3}(`{3,}|~{3,})")
+_HEADING_RE = re.compile(r" {0,3}#{1,6}(?:[ \t]|$)")
+_SETEXT_UNDERLINE_RE = re.compile(r" {0,3}=+[ \t]*$")
+_THEMATIC_BREAK_RE = re.compile(
+    r" {0,3}(?:(?:\*[ \t]*){3,}|(?:-[ \t]*){3,}|(?:_[ \t]*){3,})$"
+)
+# blocks that end a list item paragraph without a blank line before them
+_INTERRUPTING_BLOCK_RE = re.compile(
+    r" {0,3}(?:[-*+](?:[ \t]|$)|#{1,6}(?:[ \t]|$)|>|```|~~~|(?:[-*_][ \t]*){3,}$)"
+)
+
+
+def _content_indent(match: "re.Match") -> int:
+    """Return the indentation of the content of a list item from its marker match."""
+    spacing = len(match.group(4 if match.re is _ORDERED_MARKER_RE else 3))
+    return match.end(match.re.groups - 1) + (spacing if 1 <= spacing <= 4 else 1)
+
+
+class OrderedListExtractor:
+    """
+    Extract the items of the first ordered list from streamed markdown.
+
+    Text is consumed line by line and each item of the list is yielded as soon as the
+    next item marker or the end of the list is seen. Every item is parsed once, with
+    `split_ordered_list`, so the total work is linear in the input. Before the list,
+    fenced and indented code blocks, paragraphs, headings and bullet lists are tracked
+    with the CommonMark rules `split_ordered_list` parses with, so the same list is
+    found, including one nested in a bullet list or starting at a number other than 1.
+    Lists inside block quotes are not looked for.
+
+    Example:
+        >>> extractor = OrderedListExtractor()
+        >>> extractor.feed("1. **first**\n2. sec")
+        ['first\n']
+        >>> extractor.close()
+        ['sec\n']
+    """
+
+    def __init__(
+        self,
+        remove_markdown_types: Iterable[str] = [
+            "heading",
+            "emphasis",
+            "strong",
+            "horizontal_rule",
+            "block_quote",
+        ],
+        **kwargs,
+    ):
+        """
+        Initialize the OrderedListExtractor.
+
+        Args:
+            remove_markdown_types (Iterable[str], optional): The type of format to be removed from each item. Defaults to [ "heading", "emphasis", "strong", "horizontal_rule", "block_quote", ].
+            **kwargs: Additional arguments to pass to the `split_ordered_list` function.
+        """
+        self._remove_markdown_types = list(remove_markdown_types)
+        self._kwargs = kwargs
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._item_lines: List[str] = []
+        self._delimiter: Optional[str] = None
+        self._content_indent = 0
+        self._previous_blank = True
+        # the blocks open before the list starts
+        self._fence: Optional[str] = None
+        self._paragraph = False
+        self._bullet_indents: List[int] = []
+        # the content indentation of the bullet item holding the list
+        self._base_indent = 0
+        # whether the current item was already yielded when the marker of the next one arrived
+        self._item_yielded = False
+        self._done = False
+
+    @property
+    def done(self) -> bool:
+        """Whether the list has ended, after which further text is ignored."""
+        return self._done
+
+    def _dedent(self, line: str) -> Tuple[int, str]:
+        """Return the indentation of a line and the line relative to the list's container."""
+        indent = len(line) - len(line.lstrip(" "))
+        return indent, line[min(indent, self._base_indent) :]
+
+    def _render_item(self) -> List[str]:
+        text = "".join(self._item_lines)
+        self._item_lines = []
+        return split_ordered_list(text, self._remove_markdown_types, **self._kwargs)
+
+    def _start_item(self, line: str, match: "re.Match") -> None:
+        self._delimiter = match.group(3)
+        self._content_indent = self._base_indent + _content_indent(match)
+        self._item_lines = [line]
+
+    def _is_next_marker(self, indent: int, match: Optional["re.Match"]) -> bool:
+        """Whether a line starts the next item of the current list."""
+        return (
+            match is not None
+            and match.group(3) == self._delimiter
+            and self._base_indent <= indent < self._content_indent
+        )
+
+    def _interrupts_paragraph(self, line: str, outdented: bool = False) -> bool:
+        """Whether a line starts a block that ends an open paragraph, `outdented` if it is left of the paragraph's bullet item."""
+        if _FENCE_RE.match(line) or _HEADING_RE.match(line):
+            return True
+        if _THEMATIC_BREAK_RE.match(line) or line.lstrip(" ").startswith(">"):
+            return True
+        match = _ORDERED_MARKER_RE.match(line) or _BULLET_MARKER_RE.match(line)
+        if match is None:
+            return False
+        # as in markdown-it, only a list item within the paragraph's container has to be
+        # non-empty and, if ordered, start at 1 to interrupt it
+        return outdented or (
+            bool(line[match.end() :].strip())
+            and (match.re is _BULLET_MARKER_RE or match.group(2) == "1")
+        )
+
+    def _scan_line(self, line: str) -> Optional[Tuple[str, "re.Match"]]:
+        """
+        Track the blocks before the list.
+
+        Returns:
+            Optional[Tuple[str, re.Match]]: The line relative to its bullet item and its marker match if it starts the list.
+        """
+        if self._fence is not None:
+            stripped = line.strip()
+            if (
+                len(line) - len(line.lstrip(" ")) - self._base_indent <= 3
+                and stripped.startswith(self._fence)
+                and not stripped.strip(self._fence[0])
+            ):
+                self._fence = None
+            return None
+        if not line.strip():
+            self._paragraph = False
+            return None
+        indent = len(line) - len(line.lstrip(" "))
+        if self._bullet_indents and indent < self._bullet_indents[-1]:
+            if self._paragraph and not self._interrupts_paragraph(line, True):
+                # a lazy continuation of the paragraph of a bullet item
+                return None
+            while self._bullet_indents and indent < self._bullet_indents[-1]:
+                self._bullet_indents.pop()
+            self._paragraph = False
+        self._base_indent = self._bullet_indents[-1] if self._bullet_indents else 0
+        relative = line[self._base_indent :]
+        if indent - self._base_indent >= 4:
+            # an indented code block, or the continuation of a paragraph
+            return None
+        if self._paragraph and not self._interrupts_paragraph(relative):
+            if _SETEXT_UNDERLINE_RE.match(relative):
+                self._paragraph = False
+            return None
+        fence = _FENCE_RE.match(relative)
+        if fence is not None:
+            self._fence = fence.group(1)
+            self._paragraph = False
+            return None
+        match = _ORDERED_MARKER_RE.match(relative)
+        if match is not None:
+            return relative, match
+        if _THEMATIC_BREAK_RE.match(relative) or _HEADING_RE.match(relative):
+            self._paragraph = False
+            return None
+        match = _BULLET_MARKER_RE.match(relative)
+        if match is not None:
+            content_indent = self._base_indent + _content_indent(match)
+            self._bullet_indents.append(content_indent)
+            self._paragraph = False
+            # the item may start with an ordered list
+            return self._scan_line(" " * content_indent + relative[match.end() :])
+        self._paragraph = True
+        return None
+
+    def _process_line(self, line: str) -> List[str]:
+        blank = not line.strip()
+        previous_blank, self._previous_blank = self._previous_blank, blank
+        if self._delimiter is None:
+            start = self._scan_line(line)
+            if start is not None:
+                self._start_item(*start)
+            return []
+        if blank:
+            self._item_lines.append(line)
+            return []
+        indent, relative = self._dedent(line)
+        if indent >= self._content_indent:
+            self._item_lines.append(relative)
+            return []
+        match = _ORDERED_MARKER_RE.match(relative)
+        if self._is_next_marker(indent, match):
+            items = [] if self._item_yielded else self._render_item()
+            self._item_yielded = False
+            self._start_item(relative, match)
+            return items
+        if (
+            previous_blank
+            or match is not None
+            or _INTERRUPTING_BLOCK_RE.match(relative) is not None
+        ):
+            self._done = True
+            return self._render_item()
+        # a lazy continuation of the item's paragraph
+        self._item_lines.append(relative)
+        return []
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Consume the next chunk of text.
+
+        Args:
+            chunk (str): The next piece of the text.
+
+        Returns:
+            List[str]: The items completed by this chunk, with markdown removed.
+        """
+        if self._done:
+            return []
+        self._pending.append(chunk)
+        items = []
+        if "\n" in chunk:
+            lines = "".join(self._pending).split("\n")
+            self._pending = [lines.pop()]
+            for line in lines:
+                items.extend(self._process_line(line + "\n"))
+                if self._done:
+                    return items
+            self._pending_size = len(self._pending[0])
+            # a marker is at most 16 characters long, only look at the start of a line
+            check = True
+        else:
+            check = self._pending_size <= 16
+            self._pending_size += len(chunk)
+        if check and self._delimiter is not None and not self._item_yielded:
+            partial = self._pending[0] = "".join(self._pending)
+            del self._pending[1:]
+            indent, relative = self._dedent(partial)
+            match = _ORDERED_MARKER_RE.match(relative)
+            if (
+                match is not None
+                and match.group(4)
+                and self._is_next_marker(indent, match)
+            ):
+                # the marker of the next item ends the current one, yield it now
+                items.extend(self._render_item())
+                self._item_yielded = True
+        return items
+
+    def close(self) -> List[str]:
+        """
+        Finish the text and return the last item.
+
+        Returns:
+            List[str]: The items completed by the end of the text, with markdown removed.
+        """
+        items = []
+        if not self._done:
+            last_line = "".join(self._pending)
+            if last_line:
+                items.extend(self._process_line(last_line))
+            if not self._done and self._delimiter is not None:
+                items.extend(self._render_item())
+        self._pending = []
+        self._pending_size = 0
+        self._done = True
+        return items
@@ -5,3 +5,7 @@ from .Logging import (
     set_all_loggers_levels,
     set_default_logging_level,
 )
+from .Json import json_loads, json_dumps
+from .PromptCacheTracker import PromptCacheTracker
+from .BackgroundLoop import BackgroundLoop
+from .StreamingJson import IncrementalJsonParser
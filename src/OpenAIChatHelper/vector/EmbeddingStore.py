@@ -0,0 +1,210 @@
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from ..utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingStore:
+    """
+    A persistent, append-only store of embeddings keyed by the hash of their text.
+
+    Vectors are appended to a raw float32 file (`vectors.f32`) that is memory-mapped
+    for reading, and an SQLite index (`index.sqlite`) maps the hash of each text to
+    its row. A vector is written before its index entry is committed, so a crash can
+    at worst leave unreferenced rows at the end of the file. Other processes can open
+    the same directory with `readonly=True` and read the vectors without copying them.
+    A store only holds embeddings of one model and dimension, and it supports a
+    single writer at a time.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model: str,
+        dimensions: int,
+        readonly: bool = False,
+    ):
+        """
+        Open or create an EmbeddingStore.
+
+        Args:
+            path (str): The directory holding the store.
+            model (str): The embedding model of the stored vectors.
+            dimensions (int): The number of dimensions of the stored vectors.
+            readonly (bool): Whether the store is opened for reading only. Defaults to False.
+
+        Raises:
+            ValueError: If `dimensions` is not positive, or the store was created for another model or dimension.
+        """
+        if dimensions < 1:
+            raise ValueError("dimensions must be positive")
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._model = model
+        self._dimensions = dimensions
+        self._readonly = readonly
+        self._row_bytes = 4 * dimensions
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._lock = threading.Lock()
+        self._mmap: Optional[np.memmap] = None
+
+        index_path = os.path.join(path, "index.sqlite")
+        if readonly:
+            self._db = sqlite3.connect(
+                f"file:{index_path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self._db = sqlite3.connect(index_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rows (hash BLOB PRIMARY KEY, row INTEGER) WITHOUT ROWID"
+            )
+            self._db.execute(
+                "INSERT OR IGNORE INTO meta VALUES ('model', ?), ('dimensions', ?)",
+                (model, str(dimensions)),
+            )
+            self._db.commit()
+            open(self._vectors_path, "ab").close()
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if meta.get("model") != model or meta.get("dimensions") != str(dimensions):
+            raise ValueError(
+                f"Store at {path} holds {meta.get('model')} embeddings with "
+                f"{meta.get('dimensions')} dimensions, not {model} with {dimensions}"
+            )
+
+        if not readonly:
+            # drop a partially written row left behind by a crash
+            size = os.path.getsize(self._vectors_path)
+            if size % self._row_bytes:
+                logger.warning(f"Truncating partially written row in {path}")
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(size - size % self._row_bytes)
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    @property
+    def dimensions(self) -> int:
+        return self._dimensions
+
+    def __len__(self) -> int:
+        """Return the number of rows in the vector file."""
+        return os.path.getsize(self._vectors_path) // self._row_bytes
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """A read-only memory map of all stored vectors, one per row."""
+        rows = len(self)
+        if self._mmap is None or self._mmap.shape[0] != rows:
+            if rows == 0:
+                return np.empty((0, self._dimensions), dtype=np.float32)
+            self._mmap = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self._dimensions),
+            )
+        return self._mmap
+
+    def lookup(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Find the rows of the texts.
+
+        Args:
+            texts (Sequence[str]): The texts to look up.
+
+        Returns:
+            np.ndarray: The row of every text, or -1 for texts that are not stored.
+        """
+        keys = [_text_key(text) for text in texts]
+        found: Dict[bytes, int] = {}
+        with self._lock:
+            # stay below SQLite's limit on the number of bound parameters
+            for start in range(0, len(keys), 900):
+                chunk = keys[start : start + 900]
+                found.update(
+                    self._db.execute(
+                        f"SELECT hash, row FROM rows WHERE hash IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        return np.fromiter(
+            (found.get(key, -1) for key in keys), dtype=np.int64, count=len(keys)
+        )
+
+    def add(self, texts: Sequence[str], vectors: np.ndarray) -> int:
+        """
+        Append the vectors of texts that are not stored yet.
+
+        Args:
+            texts (Sequence[str]): The texts.
+            vectors (np.ndarray): Their embeddings, one row per text.
+
+        Returns:
+            int: The number of rows appended.
+
+        Raises:
+            ValueError: If the store is read-only or the shape of `vectors` does not match.
+        """
+        if self._readonly:
+            raise ValueError("Cannot add to a read-only store")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(texts), self._dimensions):
+            raise ValueError(
+                f"Expected vectors of shape {(len(texts), self._dimensions)}, got {vectors.shape}"
+            )
+        rows = self.lookup(texts)
+        with self._lock:
+            new: Dict[bytes, int] = {}
+            for i, text in enumerate(texts):
+                if rows[i] < 0:
+                    new.setdefault(_text_key(text), i)
+            if not new:
+                return 0
+            selected = list(new.values())
+            with open(self._vectors_path, "ab") as f:
+                start = f.tell() // self._row_bytes
+                f.write(np.ascontiguousarray(vectors[selected]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._db.executemany(
+                "INSERT OR IGNORE INTO rows VALUES (?, ?)",
+                ((key, start + j) for j, key in enumerate(new)),
+            )
+            self._db.commit()
+        return len(selected)
+
+    def get(self, texts: Sequence[str]) -> Optional[np.ndarray]:
+        """
+        Return the stored vectors of the texts.
+
+        Args:
+            texts (Sequence[str]): The texts.
+
+        Returns:
+            Optional[np.ndarray]: A float32 matrix with one row per text, or None if any text is not stored.
+        """
+        rows = self.lookup(texts)
+        if (rows < 0).any():
+            return None
+        return self.vectors[rows]
+
+    def close(self) -> None:
+        """Close the index and release the memory map."""
+        self._mmap = None
+        self._db.close()
@@ -0,0 +1,238 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import copy
+import time
+
+import numpy as np
+
+from ..EmbeddingEndPoint import EmbeddingEndPoint
+from ..message.Message import Message, last_user_message_view
+from ..traffic.SingleFlight import canonical_key
+from ..utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Partition:
+    """The vectors of all entries sharing a model, system prompt and request options."""
+
+    def __init__(self, dimensions: int):
+        self.vectors = np.empty((16, dimensions), dtype=np.float32)
+        self.entry_ids: List[int] = []
+
+    def add(self, vector: np.ndarray, entry_id: int) -> int:
+        row = len(self.entry_ids)
+        if row == self.vectors.shape[0]:
+            grown = np.empty((2 * row, self.vectors.shape[1]), dtype=np.float32)
+            grown[:row] = self.vectors
+            self.vectors = grown
+        self.vectors[row] = vector
+        self.entry_ids.append(entry_id)
+        return row
+
+    def remove(self, row: int) -> Optional[int]:
+        """Remove a row by moving the last row into it, and return the id of the moved entry."""
+        last = len(self.entry_ids) - 1
+        moved = None
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            moved = self.entry_ids[row] = self.entry_ids[last]
+        self.entry_ids.pop()
+        return moved
+
+
+class _Entry:
+    __slots__ = ("partition", "row", "responses", "response", "created")
+
+    def __init__(self, partition: str, row: int, responses, response, created: float):
+        self.partition = partition
+        self.row = row
+        self.responses = responses
+        self.response = response
+        self.created = created
+
+
+class SemanticCache:
+    """
+    A response cache that matches requests by the embedding similarity of their prompt.
+
+    The view of a request (by default the text of its last user message) is embedded
+    and compared with the cached requests that share its model, system and developer
+    messages, all other request options and, unless `match_history` is False, all
+    messages before its last user message. The most similar one is returned if its
+    cosine similarity reaches `threshold`. Entries are evicted least recently used
+    first once `max_entries` is reached, and expire after `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        embedding_endpoint: EmbeddingEndPoint,
+        threshold: float = 0.95,
+        max_entries: int = 10000,
+        ttl: Optional[float] = None,
+        view: Callable[[List[Dict]], str] = last_user_message_view,
+        embedding_model: Optional[str] = None,
+        match_history: bool = True,
+    ):
+        """
+        Initialize the SemanticCache.
+
+        Args:
+            embedding_endpoint (EmbeddingEndPoint): The endpoint used to embed the views of requests.
+            threshold (float): The minimum cosine similarity of a hit. Defaults to 0.95.
+            max_entries (int): The maximum number of cached responses. Defaults to 10000.
+            ttl (Optional[float]): The number of seconds after which an entry expires. Defaults to never.
+            view (Callable[[List[Dict]], str]): A function returning the text to embed from the substituted messages of a request. Defaults to the last user message.
+            embedding_model (Optional[str]): The embedding model. Defaults to the endpoint's default model.
+            match_history (bool): Whether a hit must share the messages before the last user message. If False, only the system and developer messages must match, so two conversations ending in the same reply, e.g. "yes", share answers. Defaults to True.
+
+        Raises:
+            ValueError: If `threshold` is not in (0, 1], `max_entries` is not positive or `ttl` is not positive.
+        """
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self._embedding_endpoint = embedding_endpoint
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._view = view
+        self._embedding_model = embedding_model
+        self._match_history = match_history
+        self._partitions: Dict[str, _Partition] = {}
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_entry_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit, miss, eviction and expiration counts, the hit rate and the size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hit_rate,
+            "size": len(self),
+        }
+
+    def _partition_key(self, request: Dict) -> str:
+        options = {key: value for key, value in request.items() if key != "messages"}
+        messages = request["messages"]
+        if self._match_history:
+            last_user = max(
+                (
+                    index
+                    for index, message in enumerate(messages)
+                    if message["role"] == "user"
+                ),
+                default=len(messages),
+            )
+            context = messages[:last_user]
+        else:
+            context = [
+                message
+                for message in messages
+                if message["role"] in {"system", "developer"}
+            ]
+        return canonical_key([options, context])
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        partition = self._partitions[entry.partition]
+        moved = partition.remove(entry.row)
+        if moved is not None:
+            self._entries[moved].row = entry.row
+        if not partition.entry_ids:
+            del self._partitions[entry.partition]
+
+    async def lookup(
+        self, request: Dict
+    ) -> Tuple[Optional[Tuple[List[Message], Any]], Tuple[str, np.ndarray]]:
+        """
+        Look up a request.
+
+        Args:
+            request (Dict): The chat completion request, with substituted messages.
+
+        Returns:
+            Tuple[Optional[Tuple[List[Message], Any]], Tuple[str, np.ndarray]]: A copy of the cached
+            messages and the cached response on a hit, or None on a miss, and a key to pass to `add`.
+        """
+        partition_key = self._partition_key(request)
+        vector = (
+            await self._embedding_endpoint.embeddings(
+                [self._view(request["messages"])], self._embedding_model
+            )
+        )[0]
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        key = (partition_key, vector)
+
+        partition = self._partitions.get(partition_key)
+        if partition is not None:
+            scores = partition.vectors[: len(partition.entry_ids)] @ vector
+            row = int(np.argmax(scores))
+            if scores[row] >= self._threshold:
+                entry_id = partition.entry_ids[row]
+                entry = self._entries[entry_id]
+                if (
+                    self._ttl is not None
+                    and time.monotonic() - entry.created > self._ttl
+                ):
+                    self._remove(entry_id)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    logger.debug(
+                        f"Semantic cache hit with similarity {scores[row]:.3f}"
+                    )
+                    return (copy.deepcopy(entry.responses), entry.response), key
+        self.misses += 1
+        return None, key
+
+    def add(
+        self, key: Tuple[str, np.ndarray], responses: List[Message], response: Any
+    ) -> None:
+        """
+        Cache the responses of a request.
+
+        Args:
+            key (Tuple[str, np.ndarray]): The key returned by `lookup` for the request.
+            responses (List[Message]): The messages generated for the request.
+            response (Any): The raw response of the request.
+        """
+        partition_key, vector = key
+        partition = self._partitions.get(partition_key)
+        if partition is None:
+            partition = self._partitions[partition_key] = _Partition(len(vector))
+        entry_id = self._next_entry_id
+        self._next_entry_id += 1
+        row = partition.add(vector, entry_id)
+        self._entries[entry_id] = _Entry(
+            partition_key, row, copy.deepcopy(responses), response, time.monotonic()
+        )
+        while len(self._entries) > self._max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries, keeping the statistics."""
+        self._partitions.clear()
+        self._entries.clear()
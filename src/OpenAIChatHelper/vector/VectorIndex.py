@@ -0,0 +1,354 @@
+from typing import Literal, Optional, Tuple
+import json
+import os
+
+import numpy as np
+
+from .EmbeddingStore import EmbeddingStore
+from ..utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the column indices of the `k` largest scores of every row, unordered."""
+    if k >= scores.shape[1]:
+        return np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+class VectorIndex:
+    """
+    An in-process index for top-k similarity search over embeddings.
+
+    Exact search scores the queries against the stored vectors block by block with
+    matrix products and keeps a running top-k, so memory stays bounded by the block
+    size. After `train` is called, searches can instead probe only the closest
+    `n_probe` of `n_lists` k-means clusters (IVF), trading some recall for speed.
+    Vectors can be added at any time; vectors added after training are assigned to
+    their closest cluster.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        metric: Literal["cosine", "inner_product"] = "cosine",
+        block_size: int = 65536,
+    ):
+        """
+        Initialize an empty VectorIndex.
+
+        Args:
+            dimensions (int): The number of dimensions of the vectors.
+            metric (Literal["cosine", "inner_product"]): The similarity metric. Defaults to "cosine".
+            block_size (int): The number of vectors scored per matrix product. Defaults to 65536.
+
+        Raises:
+            ValueError: If `dimensions` or `block_size` is not positive or `metric` is invalid.
+        """
+        if dimensions < 1 or block_size < 1:
+            raise ValueError("dimensions and block_size must be positive")
+        if metric not in {"cosine", "inner_product"}:
+            raise ValueError("Invalid metric; must be 'cosine' or 'inner_product'")
+        self._dimensions = dimensions
+        self._metric = metric
+        self._block_size = block_size
+        self._size = 0
+        self._vectors = np.empty((0, dimensions), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._next_id = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._list_order: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+
+    @property
+    def dimensions(self) -> int:
+        return self._dimensions
+
+    @property
+    def metric(self) -> str:
+        return self._metric
+
+    @property
+    def is_trained(self) -> bool:
+        """Whether the index has IVF clusters for approximate search."""
+        return self._centroids is not None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+        if vectors.shape[1] != self._dimensions:
+            raise ValueError(
+                f"Expected vectors with {self._dimensions} dimensions, got {vectors.shape[1]}"
+            )
+        if self._metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= self._vectors.shape[0]:
+            return
+        capacity = max(capacity, 2 * self._vectors.shape[0], 1024)
+        vectors = np.empty((capacity, self._dimensions), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[: self._size] = self._ids[: self._size]
+        assignments = np.empty(capacity, dtype=np.int32)
+        assignments[: self._size] = self._assignments[: self._size]
+        self._vectors, self._ids, self._assignments = vectors, ids, assignments
+
+    def add(self, vectors: np.ndarray, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Add vectors to the index.
+
+        Args:
+            vectors (np.ndarray): The vectors, one per row.
+            ids (Optional[np.ndarray]): Integer ids of the vectors. Defaults to consecutive ids.
+
+        Returns:
+            np.ndarray: The ids of the added vectors.
+
+        Raises:
+            ValueError: If the vectors have the wrong dimension or the number of ids does not match.
+        """
+        vectors = self._prepare(vectors)
+        n = vectors.shape[0]
+        if ids is None:
+            ids = np.arange(self._next_id, self._next_id + n, dtype=np.int64)
+        else:
+            ids = np.asarray(ids, dtype=np.int64)
+            if ids.shape != (n,):
+                raise ValueError("The number of ids must match the number of vectors")
+        if n == 0:
+            return ids
+        self._reserve(self._size + n)
+        self._vectors[self._size : self._size + n] = vectors
+        self._ids[self._size : self._size + n] = ids
+        if self._centroids is not None:
+            self._assignments[self._size : self._size + n] = self._assign(vectors)
+            self._list_order = None
+        self._size += n
+        self._next_id = max(self._next_id, int(ids.max()) + 1)
+        return ids
+
+    @classmethod
+    def from_store(
+        cls,
+        store: EmbeddingStore,
+        metric: Literal["cosine", "inner_product"] = "cosine",
+        block_size: int = 65536,
+    ) -> "VectorIndex":
+        """
+        Build an index over all vectors of an EmbeddingStore, using their rows as ids.
+
+        Args:
+            store (EmbeddingStore): The store to index.
+            metric (Literal["cosine", "inner_product"]): The similarity metric. Defaults to "cosine".
+            block_size (int): The number of vectors scored per matrix product. Defaults to 65536.
+
+        Returns:
+            VectorIndex: The index.
+        """
+        index = cls(store.dimensions, metric, block_size)
+        vectors = store.vectors
+        for start in range(0, vectors.shape[0], block_size):
+            index.add(vectors[start : start + block_size])
+        return index
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the closest centroid of every vector."""
+        assignments = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], self._block_size):
+            block = vectors[start : start + self._block_size]
+            assignments[start : start + len(block)] = np.argmax(
+                block @ self._centroids.T, axis=1
+            )
+        return assignments
+
+    def train(
+        self,
+        n_lists: Optional[int] = None,
+        n_iter: int = 20,
+        sample_size: Optional[int] = None,
+        seed: int = 0,
+    ) -> None:
+        """
+        Cluster the vectors with k-means so that searches can probe a few clusters only.
+
+        Args:
+            n_lists (Optional[int]): The number of clusters. Defaults to about the square root of the index size.
+            n_iter (int): The number of k-means iterations. Defaults to 20.
+            sample_size (Optional[int]): The number of vectors the clusters are fitted on. Defaults to 256 per cluster.
+            seed (int): The random seed. Defaults to 0.
+
+        Raises:
+            ValueError: If there are fewer vectors than clusters.
+        """
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(self._size)))
+        if self._size < n_lists:
+            raise ValueError(
+                f"Need at least {n_lists} vectors to train {n_lists} lists"
+            )
+        if sample_size is None:
+            sample_size = 256 * n_lists
+        rng = np.random.default_rng(seed)
+        vectors = self._vectors[: self._size]
+        sample = vectors[
+            rng.choice(self._size, min(sample_size, self._size), replace=False)
+        ]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            self._centroids = centroids
+            assignments = self._assign(sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=n_lists)
+            empty = counts == 0
+            # restart empty clusters from random samples
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            counts[empty] = 1
+            centroids = sums / counts[:, None]
+            # spherical k-means: keep centroids on the unit sphere like the vectors
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            np.divide(centroids, norms, out=centroids, where=norms > 0)
+        self._centroids = centroids.astype(np.float32)
+        self._assignments[: self._size] = self._assign(vectors)
+        self._list_order = None
+        logger.debug(f"Trained {n_lists} lists over {self._size} vectors")
+
+    def _lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the rows sorted by cluster and the offset of every cluster in that order."""
+        if self._list_order is None:
+            assignments = self._assignments[: self._size]
+            self._list_order = np.argsort(assignments, kind="stable")
+            self._list_offsets = np.searchsorted(
+                assignments[self._list_order],
+                np.arange(len(self._centroids) + 1),
+            )
+        return self._list_order, self._list_offsets
+
+    def search(
+        self, queries: np.ndarray, k: int = 10, n_probe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the `k` most similar vectors of every query.
+
+        Args:
+            queries (np.ndarray): The query vectors, one per row, or a single vector.
+            k (int): The number of results per query. Defaults to 10.
+            n_probe (Optional[int]): The number of clusters to probe for approximate search. Defaults to exact search.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The scores and ids of the results, of shape (queries, k), best first.
+            Queries with fewer than `k` candidates are padded with -inf scores and -1 ids.
+        """
+        queries = self._prepare(queries)
+        if n_probe is not None and self._centroids is None:
+            raise ValueError("The index must be trained for approximate search")
+        if n_probe is None:
+            scores, rows = self._search_exact(queries, k)
+        else:
+            scores, rows = self._search_ivf(queries, k, n_probe)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        scores = np.take_along_axis(scores, order, axis=1)
+        rows = np.take_along_axis(rows, order, axis=1)
+        ids = np.full(rows.shape, -1, dtype=np.int64)
+        # only look up real rows, there may be no ids at all
+        found = rows >= 0
+        ids[found] = self._ids[rows[found]]
+        return scores, ids
+
+    def _search_exact(
+        self, queries: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for start in range(0, self._size, self._block_size):
+            block = self._vectors[start : min(start + self._block_size, self._size)]
+            scores = queries @ block.T
+            top = _top_k(scores, k)
+            scores = np.concatenate(
+                [best_scores, np.take_along_axis(scores, top, axis=1)], axis=1
+            )
+            rows = np.concatenate([best_rows, top + start], axis=1)
+            top = _top_k(scores, k)
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+        return best_scores, best_rows
+
+    def _search_ivf(
+        self, queries: np.ndarray, k: int, n_probe: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        order, offsets = self._lists()
+        probes = _top_k(queries @ self._centroids.T, min(n_probe, len(self._centroids)))
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for i, query in enumerate(queries):
+            rows = np.concatenate(
+                [order[offsets[p] : offsets[p + 1]] for p in probes[i]]
+            )
+            if len(rows) == 0:
+                continue
+            scores = self._vectors[rows] @ query
+            top = _top_k(scores[None, :], k)[0]
+            best_scores[i, : len(top)] = scores[top]
+            best_rows[i, : len(top)] = rows[top]
+        return best_scores, best_rows
+
+    def save(self, path: str) -> None:
+        """
+        Save the index to a directory.
+
+        Args:
+            path (str): The directory to save the index to.
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self._vectors[: self._size])
+        np.save(os.path.join(path, "ids.npy"), self._ids[: self._size])
+        if self._centroids is not None:
+            np.save(os.path.join(path, "centroids.npy"), self._centroids)
+            np.save(
+                os.path.join(path, "assignments.npy"),
+                self._assignments[: self._size],
+            )
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(
+                {
+                    "dimensions": self._dimensions,
+                    "metric": self._metric,
+                    "block_size": self._block_size,
+                    "next_id": self._next_id,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False) -> "VectorIndex":
+        """
+        Load an index saved with `save`.
+
+        Args:
+            path (str): The directory the index was saved to.
+            mmap (bool): Whether to memory-map the vectors instead of reading them. They are copied on the first `add`. Defaults to False.
+
+        Returns:
+            VectorIndex: The loaded index.
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        index = cls(meta["dimensions"], meta["metric"], meta["block_size"])
+        mmap_mode = "r" if mmap else None
+        index._vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode)
+        index._ids = np.load(os.path.join(path, "ids.npy"))
+        index._size = len(index._ids)
+        index._next_id = meta["next_id"]
+        index._assignments = np.empty(index._size, dtype=np.int32)
+        if os.path.exists(os.path.join(path, "centroids.npy")):
+            index._centroids = np.load(os.path.join(path, "centroids.npy"))
+            index._assignments = np.load(os.path.join(path, "assignments.npy"))
+        return index
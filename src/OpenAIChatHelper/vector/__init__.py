@@ -0,0 +1,3 @@
+from .EmbeddingStore import *
+from .VectorIndex import *
+from .SemanticCache import *
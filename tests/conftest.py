@@ -0,0 +1,108 @@
+import asyncio
+import json
+import types
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from OpenAIChatHelper import DevSysUserMessage, MessageList, TextContent
+
+
+def _completion(*contents, model="gpt-4o", usage=None, finish_reason="stop"):
+    completion = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [
+            {
+                "index": index,
+                "finish_reason": finish_reason,
+                "message": {"role": "assistant", "content": content},
+            }
+            for index, content in enumerate(contents or ("Hi",))
+        ],
+    }
+    if usage is not None:
+        completion["usage"] = usage
+    return completion
+
+
+class FakeCompletions:
+    """
+    A fake `client.chat.completions` recording the keyword arguments of every call.
+
+    `respond` maps the keyword arguments of a call to the content of the response, or
+    to a full response dictionary, and may raise to fail the call. The first `failures`
+    calls raise a RuntimeError, and every call sleeps `delay` seconds first.
+    """
+
+    def __init__(self, respond=None, failures=0, delay=0.0):
+        self.respond = respond if respond is not None else lambda kwargs: "Hi"
+        self.failures = failures
+        self.delay = delay
+        self.calls = []
+        self.cancelled = 0
+        self.with_raw_response = _RawCompletions(self)
+
+    async def _complete(self, kwargs):
+        self.calls.append(kwargs)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("server error")
+        if self.delay:
+            try:
+                await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        response = self.respond(kwargs)
+        if isinstance(response, str):
+            response = _completion(response, model=kwargs["model"])
+        return response
+
+    async def create(self, **kwargs):
+        return ChatCompletion.model_validate(await self._complete(kwargs))
+
+
+class _RawCompletions:
+    def __init__(self, completions):
+        self._completions = completions
+
+    async def create(self, **kwargs):
+        response = await self._completions._complete(kwargs)
+        return types.SimpleNamespace(content=json.dumps(response).encode())
+
+
+@pytest.fixture
+def completion():
+    """Build a chat completion dictionary with one choice per content, "Hi" by default."""
+    return _completion
+
+
+@pytest.fixture
+def make_message_list():
+    """Build a message list of a single user message."""
+
+    def make(text="Hi"):
+        message_list = MessageList()
+        message_list.add_message(DevSysUserMessage("user", TextContent(text)))
+        return message_list
+
+    return make
+
+
+@pytest.fixture
+def fake_completions(monkeypatch):
+    """Install a fake async client on an endpoint and return its `FakeCompletions`."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    def install(endpoint, *args, **kwargs):
+        completions = FakeCompletions(*args, **kwargs)
+        client = types.SimpleNamespace(
+            chat=types.SimpleNamespace(completions=completions)
+        )
+        endpoint.get_async_client = lambda: client
+        return completions
+
+    return install
@@ -0,0 +1,61 @@
+import asyncio
+
+import openai
+import pytest
+
+from OpenAIChatHelper.traffic import AdaptiveConcurrencyLimiter, is_overload_error
+
+
+def _status_error(status_code):
+    error = openai.APIStatusError.__new__(openai.APIStatusError)
+    error.status_code = status_code
+    return error
+
+
+def test_is_overload_error():
+    assert is_overload_error(_status_error(429))
+    assert is_overload_error(_status_error(503))
+    assert not is_overload_error(_status_error(400))
+    assert not is_overload_error(ValueError())
+
+
+def test_limiter_bounds_concurrency():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        peak = max(peak, limiter.in_flight)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*[limiter.run(call) for _ in range(10)])
+
+    asyncio.run(main())
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+def test_limiter_aimd():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=100)
+
+    async def fail():
+        raise _status_error(429)
+
+    async def main():
+        # saturate the limit so that successes grow it
+        for _ in range(4):
+            await limiter.acquire()
+        for _ in range(40):
+            limiter.on_success(0.1)
+        for _ in range(4):
+            limiter.release()
+        grown = limiter.limit
+        with pytest.raises(openai.APIStatusError):
+            await limiter.run(fail)
+        return grown
+
+    grown = asyncio.run(main())
+    assert grown > 4
+    assert limiter.limit == grown // 2
+    assert limiter.history[-1][2] == "429"
@@ -3,7 +3,7 @@ import OpenAIChatHelper as openai
 
 
 def test_general_chat_completion():
-    chatbot = openai.ChatCompletionEndPoint("gpt-3.5-turbo")
+    chatbot = openai.SyncChatCompletionEndPoint("gpt-3.5-turbo")
     message_list = openai.MessageList()
     message_list.add_message(
         openai.DevSysUserMessage(
@@ -21,5 +21,5 @@ def test_general_chat_completion():
             ),
         )
     )
-    messages, meta_data = chatbot.completions(message_list)
+    messages, meta_data = chatbot.completions_sync(message_list)
     print(messages)
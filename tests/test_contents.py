@@ -1,5 +1,10 @@
 import pytest
-from OpenAIChatHelper.message import Content, TextContent
+from OpenAIChatHelper.message import (
+    Content,
+    DevSysUserMessage,
+    MessageList,
+    TextContent,
+)
 
 
 def test_general_content():
@@ -34,3 +39,83 @@ def test_text_content():
 
     # assert __repr__ is implemented
     repr(content)
+
+
+def test_trusted_content():
+    content = TextContent.from_trusted("Hello")
+    assert content.content_type == "text"
+    assert content.to_dict() == {"type": "text", "text": "Hello"}
+    content.validate()
+
+    # trusted content is only checked on demand
+    content = TextContent.from_trusted(123)
+    with pytest.raises(ValueError):
+        content.validate()
+
+
+def test_content_interner():
+    import gc
+
+    from OpenAIChatHelper.message import ContentInterner, ImageContent
+
+    interner = ContentInterner()
+    document = "".join(["long document "] * 1000)
+    first = interner.text(document)
+    # an equal but distinct string is deduplicated
+    second = interner.intern(TextContent("".join(["long document "] * 1000)))
+    assert second is first
+    assert interner.intern(first) is first
+    assert interner.image("data:image/png;base64,AAAA") is interner.image(
+        "data:image/png;base64,AAAA"
+    )
+    assert interner.image("data:image/png;base64,AAAA", "low") is not interner.image(
+        "data:image/png;base64,AAAA"
+    )
+    assert interner.stats()["hits"] == 3
+    # the caller still holds the duplicates
+    assert interner.bytes_saved == 0
+
+    # unused contents are reclaimed
+    del first, second
+    gc.collect()
+    assert len(interner) == 0
+    assert isinstance(interner.intern(ImageContent("x")), ImageContent)
+
+
+def test_intern_message_list():
+    from OpenAIChatHelper.message import ContentInterner
+
+    interner = ContentInterner()
+    lists = []
+    for _ in range(3):
+        message_list = MessageList()
+        message_list.add_message(
+            DevSysUserMessage("user", TextContent("".join(["shared"] * 100)))
+        )
+        lists.append(interner.intern_message_list(message_list))
+    first, second, third = (message_list[0].content[0] for message_list in lists)
+    assert first is second is third
+    assert interner.stats()["contents"] == 1
+    assert interner.bytes_saved >= 2 * len(first.text)
+
+
+def test_intern_spilling_message_list():
+    from OpenAIChatHelper.message import ContentInterner, SpillingMessageList
+
+    interner = ContentInterner()
+    shared = interner.text("".join(["shared"] * 100))
+    with SpillingMessageList(hot_window=2) as message_list:
+        for _ in range(6):
+            message_list.add_message(
+                DevSysUserMessage("user", TextContent("".join(["shared"] * 100)))
+            )
+        spilled = message_list.spilled
+        assert 0 < spilled < 6
+        interner.intern_message_list(message_list)
+        # only the messages kept in memory share the content
+        assert all(
+            message_list[index].content[0] is shared
+            for index in range(spilled, len(message_list))
+        )
+        assert message_list[0].content[0] is not shared
+        assert interner.stats()["hits"] == 6 - spilled
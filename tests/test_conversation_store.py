@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from OpenAIChatHelper.message import (
+    AssistantMessage,
+    ConversationStore,
+    DevSysUserMessage,
+    MessageList,
+    TextContent,
+)
+from OpenAIChatHelper.utils import json_loads
+
+
+def _turn(index):
+    if index % 2:
+        return AssistantMessage(TextContent(f"answer {index}"))
+    return DevSysUserMessage("user", TextContent(f"question {{x}} {index}"))
+
+
+def test_append_load_and_search(tmp_path):
+    path = str(tmp_path / "conversations.sqlite")
+    with ConversationStore(path, batch_size=4) as store:
+        store.append("a", [_turn(i) for i in range(3)], timestamp=100.0)
+        store.append("a", [_turn(i) for i in range(3, 6)], timestamp=200.0)
+        store.append("b", _turn(0))
+        store.set_metadata("a", user="alice", score=3)
+        store.set_metadata("b", user="bob")
+        assert store.count_turns("a") == 6
+
+    with ConversationStore(path) as store:
+        assert len(store) == 2
+        last = store.load("a", last_n=2)
+        assert [message.content[0].text for message in last] == [
+            "question {x} 4",
+            "answer 5",
+        ]
+        assert len(store.load("a", role="assistant")) == 3
+        assert len(store.load("a", since=150.0)) == 3
+        assert len(store.load("missing")) == 0
+        assert store.find(user="alice") == ["a"]
+        assert store.find(user="alice", score=4) == []
+        assert store.get_metadata("a") == {"user": "alice", "score": 3}
+
+        # appending continues after the stored turns
+        message_list = store.load("a")
+        message_list.add_message(_turn(6))
+        assert store.save("a", message_list) == 1
+        assert store.load("a", last_n=1)[0].role == "user"
+        # a partial list cannot tell its new messages apart
+        partial = store.load("a", last_n=2)
+        partial.add_message(_turn(7))
+        with pytest.raises(ValueError):
+            store.save("a", partial)
+
+        export_path = str(tmp_path / "export.jsonl")
+        assert store.export(export_path) == 2
+        with open(export_path, "rb") as f:
+            lines = [json_loads(line) for line in f]
+        assert lines[0]["id"] == "a" and len(lines[0]["messages"]) == 7
+        assert lines[0]["messages"][0]["content"][0]["text"] == "question {x} 0"
+        assert lines[1]["metadata"] == {"user": "bob"}
+
+    with pytest.raises(ValueError):
+        ConversationStore(path, batch_size=0)
+
+
+def test_writes_are_flushed_from_the_event_loop(tmp_path):
+    store = ConversationStore(str(tmp_path / "c.sqlite"), flush_interval=0.01)
+
+    def _stored():
+        return store._db.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+
+    async def _main():
+        store.append("a", _turn(0))
+        assert _stored() == 0
+        await asyncio.sleep(0.1)
+        assert _stored() == 1
+        store.append("a", _turn(1))
+        await store.aflush()
+        assert _stored() == 2
+
+    asyncio.run(_main())
+    store.close()
+    with pytest.raises(RuntimeError):
+        store.append("a", _turn(2))
+
+
+def test_writes_are_flushed_from_later_event_loops(tmp_path):
+    store = ConversationStore(str(tmp_path / "c.sqlite"), flush_interval=0.01)
+
+    def _stored():
+        return store._db.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+
+    async def _append(index):
+        store.append("a", _turn(index))
+
+    # the loop ends before its flush timer fires
+    asyncio.run(_append(0))
+
+    async def _main():
+        store.append("a", _turn(1))
+        await asyncio.sleep(0.1)
+        assert _stored() == 2
+        messages = await store.aload("a")
+        assert len(messages) == 2
+        assert await store.afind() == ["a"]
+
+    asyncio.run(_main())
+    store.close()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from OpenAIChatHelper import (
+    ChatCompletionEndPoint,
+    DatasetRunner,
+    count_rows,
+    load_template,
+    read_dataset,
+)
+
+
+def _prompt(kwargs):
+    return kwargs["messages"][-1]["content"][0]["text"]
+
+
+def _shout(kwargs):
+    prompt = _prompt(kwargs)
+    if "broken" in prompt:
+        raise RuntimeError("upstream error")
+    return prompt.upper()
+
+
+def test_read_dataset(tmp_path):
+    jsonl = tmp_path / "data.jsonl"
+    jsonl.write_text('{"id": 1, "text": "a"}\n\n{"id": 2, "text": "b"}\n')
+    assert [row["text"] for row in read_dataset(str(jsonl))] == ["a", "b"]
+    assert count_rows(str(jsonl)) == 2
+
+    data = tmp_path / "data.csv"
+    data.write_text('id,text\n1,"multi\nline"\n2,b\n')
+    assert list(read_dataset(str(data))) == [
+        {"id": "1", "text": "multi\nline"},
+        {"id": "2", "text": "b"},
+    ]
+    assert count_rows(str(data)) == 2
+    data.write_text("")
+    assert count_rows(str(data)) == 0
+
+
+def test_runner_resumes(tmp_path, fake_completions):
+    template_path = tmp_path / "template.json"
+    template_path.write_text(
+        json.dumps(
+            [
+                {"role": "system", "content": "Shout."},
+                {"role": "user", "content": "Say {text} ({n})"},
+            ]
+        )
+    )
+    rows = [
+        {"id": i, "text": "broken" if i == 3 else f"row {i}", "n": i} for i in range(6)
+    ]
+    endpoint = ChatCompletionEndPoint("gpt-4o")
+    completions = fake_completions(endpoint, _shout)
+    output = tmp_path / "out.jsonl"
+    runner = DatasetRunner(
+        endpoint, load_template(str(template_path)), str(output), concurrency=2, retry=1
+    )
+
+    stats = asyncio.run(runner.run(iter(rows), total=len(rows)))
+    assert (stats["completed"], stats["failed"], stats["skipped"]) == (5, 1, 0)
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert {r["id"]: r.get("responses") for r in results}["1"] == ["SAY ROW 1 (1)"]
+    assert "error" in {r["id"]: r for r in results}["3"]
+
+    completions.respond = lambda kwargs: _prompt(kwargs).upper()
+    completions.calls.clear()
+    stats = asyncio.run(runner.run(iter(rows), total=len(rows)))
+    # only the failed row is sent again
+    assert (stats["completed"], stats["failed"], stats["skipped"]) == (1, 0, 5)
+    assert [_prompt(call) for call in completions.calls] == ["Say broken (3)"]
+    # the error record of the retried row is replaced by its result
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(r["id"] for r in results) == [str(i) for i in range(6)]
+    assert not any("error" in r for r in results)
+
+
+def test_positional_ids_do_not_clash(tmp_path, fake_completions):
+    endpoint = ChatCompletionEndPoint("gpt-4o")
+    completions = fake_completions(endpoint)
+    template_path = tmp_path / "template.json"
+    template_path.write_text(json.dumps([{"role": "user", "content": "{text}"}]))
+    output = tmp_path / "out.jsonl"
+    runner = DatasetRunner(endpoint, load_template(str(template_path)), str(output))
+    # the row with id "1" and the row at position 1 without an id
+    rows = [{"id": "1", "text": "a"}, {"text": "b"}]
+
+    asyncio.run(runner.run(iter(rows)))
+    completions.calls.clear()
+    stats = asyncio.run(runner.run(iter(rows)))
+    assert stats["skipped"] == 2 and completions.calls == []
+    ids = [json.loads(line)["id"] for line in output.read_text().splitlines()]
+    assert sorted(ids) == ["#1", "1"]
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import pytest
+
+from OpenAIChatHelper import ChatCompletionEndPoint
+
+
+@pytest.fixture
+def slow_endpoint(fake_completions):
+    def install(backoff=None, **kwargs):
+        endpoint = ChatCompletionEndPoint("gpt-4o", backoff=backoff)
+        return endpoint, fake_completions(endpoint, **kwargs)
+
+    return install
+
+
+def _timeouts(completions):
+    return [call.get("timeout") for call in completions.calls]
+
+
+def test_timeout_cancels_the_request(slow_endpoint, make_message_list):
+    endpoint, completions = slow_endpoint(delay=10)
+
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        asyncio.run(endpoint.completions(make_message_list(), timeout=0.1))
+    assert time.perf_counter() - start < 1
+    assert completions.cancelled == 1
+    # the HTTP timeout is the time left
+    assert 0 < _timeouts(completions)[0] <= 0.1
+
+
+def test_backoff_does_not_outlive_the_deadline(slow_endpoint, make_message_list):
+    endpoint, completions = slow_endpoint(
+        delay=0, failures=1, backoff=lambda attempt: 5
+    )
+
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        asyncio.run(endpoint.completions(make_message_list(), timeout=1, retry=3))
+    assert time.perf_counter() - start < 0.5
+    assert len(completions.calls) == 1
+
+
+def test_caller_cancellation_aborts_the_request(slow_endpoint, make_message_list):
+    endpoint, completions = slow_endpoint(delay=10)
+
+    async def _main():
+        task = asyncio.ensure_future(endpoint.completions(make_message_list()))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_main())
+    assert completions.cancelled == 1
+    assert _timeouts(completions) == [None]
+
+
+def test_no_deadline(slow_endpoint, make_message_list):
+    endpoint, completions = slow_endpoint(delay=0)
+    responses, _ = asyncio.run(
+        endpoint.completions(make_message_list(), deadline=time.monotonic() + 5)
+    )
+    assert responses[0][0].text == "Hi"
+
+
+def test_attempt_timeouts_are_retried(slow_endpoint, make_message_list):
+    from OpenAIChatHelper.traffic import DeadlineExceeded
+
+    failures = [asyncio.TimeoutError(), TimeoutError()]
+
+    def respond(kwargs):
+        if failures:
+            raise failures.pop()
+        return "Hi"
+
+    endpoint, completions = slow_endpoint(respond=respond, backoff=lambda attempt: 0)
+    responses, _ = asyncio.run(endpoint.completions(make_message_list(), retry=3))
+    assert responses[0][0].text == "Hi"
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(
+            endpoint.completions(make_message_list(), deadline=time.monotonic() - 1)
+        )
@@ -0,0 +1,116 @@
+import asyncio
+import base64
+import json
+
+import numpy as np
+import pytest
+
+from OpenAIChatHelper import EmbeddingEndPoint, EmbeddingStore
+
+
+class _RawResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class _FakeEmbeddings:
+    def __init__(self):
+        self.requests = []
+        self.with_raw_response = self
+
+    async def create(self, input, model, encoding_format, **kwargs):
+        assert encoding_format == "base64"
+        self.requests.append(list(input))
+        data = [
+            {
+                "index": i,
+                "embedding": base64.b64encode(
+                    np.array([len(text), i], dtype="<f4").tobytes()
+                ).decode(),
+            }
+            for i, text in enumerate(input)
+        ]
+        return _RawResponse(json.dumps({"data": data}).encode())
+
+
+class _FakeClient:
+    def __init__(self):
+        self.embeddings = _FakeEmbeddings()
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    endpoint = EmbeddingEndPoint(
+        max_batch_size=2, max_batch_tokens=10, token_counter=len
+    )
+    client = _FakeClient()
+    endpoint.get_async_client = lambda: client
+    return endpoint
+
+
+def test_embeddings_batches_and_dedupes(endpoint):
+
+    texts = ["a", "bb", "a", "ccccccccc", "dd"]
+    matrix = asyncio.run(endpoint.embeddings(texts))
+    assert matrix.dtype == np.float32
+    assert matrix.flags["C_CONTIGUOUS"]
+    assert matrix.shape == (5, 2)
+    assert matrix[:, 0].tolist() == [1, 2, 1, 9, 2]
+    assert np.array_equal(matrix[0], matrix[2])
+    # "a" is only sent once, batches respect both the item and the token limit
+    assert endpoint.get_async_client().embeddings.requests == [
+        ["a", "bb"],
+        ["ccccccccc"],
+        ["dd"],
+    ]
+
+
+def test_embeddings_empty(endpoint):
+
+    assert asyncio.run(endpoint.embeddings([])).shape == (0, 0)
+
+
+def test_embeddings_with_store(endpoint, tmp_path):
+    store = EmbeddingStore(str(tmp_path), "text-embedding-3-small", 2)
+    first = asyncio.run(endpoint.embeddings(["a", "bb", "a"], cache=store))
+    assert len(store) == 2
+    second = asyncio.run(endpoint.embeddings(["bb", "ccc"], cache=store))
+    assert len(store) == 3
+    assert np.array_equal(first[1], second[0])
+    # "bb" was served from the store
+    assert endpoint.get_async_client().embeddings.requests[-1] == ["ccc"]
+
+    reader = EmbeddingStore(str(tmp_path), "text-embedding-3-small", 2, readonly=True)
+    assert reader.lookup(["a", "zzz"]).tolist() == [0, -1]
+    assert np.array_equal(reader.get(["ccc"])[0], second[1])
+    assert reader.get(["zzz"]) is None
+
+    with pytest.raises(ValueError):
+        EmbeddingStore(str(tmp_path), "text-embedding-3-small", 3)
+
+
+def test_embeddings_cancellation_aborts_the_request(endpoint):
+    embeddings = endpoint.get_async_client().embeddings
+    cancelled = []
+    create = embeddings.create
+
+    async def slow_create(**kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(kwargs["input"])
+            raise
+        return await create(**kwargs)
+
+    embeddings.create = slow_create
+
+    async def run():
+        task = asyncio.ensure_future(endpoint.embeddings(["a"]))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert cancelled == [["a"]]
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+
+from OpenAIChatHelper.traffic import LatencyTracker, HedgingPolicy
+
+
+def test_latency_tracker_quantile():
+    tracker = LatencyTracker(window=100)
+    assert tracker.quantile("model", 0.5) is None
+    for i in range(200):
+        tracker.record("model", float(i))
+    # only the last 100 samples are kept
+    assert tracker.count("model") == 100
+    assert tracker.quantile("model", 0.0) == 100.0
+    assert tracker.quantile("model", 0.5) == 150.0
+    assert tracker.quantile("model", 1.0) == 199.0
+
+    with pytest.raises(ValueError):
+        LatencyTracker(window=0)
+
+
+def test_hedging_policy_hedges_slow_request():
+    policy = HedgingPolicy(quantile=0.9, budget=1.0, min_samples=5)
+    for _ in range(10):
+        policy.record_latency("model", 0.01)
+    delays = iter([1.0, 0.0])
+
+    async def call():
+        await asyncio.sleep(next(delays))
+        return "done"
+
+    assert asyncio.run(policy.run("model", call)) == "done"
+    assert policy.hedges == 1
+    assert policy.hedge_wins == 1
+
+
+def test_hedging_policy_respects_budget():
+    policy = HedgingPolicy(quantile=0.5, budget=0.0, min_samples=1)
+    policy.record_latency("model", 0.0)
+    calls = []
+
+    async def call():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    assert asyncio.run(policy.run("model", call)) == "done"
+    assert len(calls) == 1
+    assert policy.hedges == 0
+
+
+def test_completions_hedge(fake_completions, make_message_list):
+    from OpenAIChatHelper import ChatCompletionEndPoint
+
+    policy = HedgingPolicy(quantile=0.5, budget=1.0, min_samples=5)
+    for _ in range(5):
+        policy.record_latency("gpt-4o", 0.05)
+    endpoint = ChatCompletionEndPoint("gpt-4o", hedging_policy=policy)
+    completions = fake_completions(endpoint, delay=1.0)
+
+    async def main():
+        task = asyncio.ensure_future(
+            endpoint.completions(make_message_list(), hedge=True)
+        )
+        await asyncio.sleep(0.01)
+        # only the primary request is slow
+        completions.delay = 0.0
+        return await task
+
+    responses, _ = asyncio.run(main())
+    assert responses[0][0].text == "Hi"
+    assert policy.hedges == policy.hedge_wins == 1
+    assert len(completions.calls) == 2 and completions.cancelled == 1
+    # the winning hedge and, as a lower bound, the cancelled primary are recorded
+    tracker = policy.latency_tracker
+    assert tracker.count("gpt-4o") == 7
+    assert tracker.quantile("gpt-4o", 1.0) >= 0.05
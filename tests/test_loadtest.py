@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from OpenAIChatHelper import (
+    ChatCompletionEndPoint,
+)
+from OpenAIChatHelper.loadtest import (
+    MockOpenAIServer,
+    constant_latency,
+    parse_latency,
+    run_load,
+)
+
+
+def _endpoint(base_url):
+    return ChatCompletionEndPoint(
+        "mock",
+        base_url=base_url,
+        max_retries=0,
+        timeout=0.5,
+        backoff=lambda attempt: 0.0,
+    )
+
+
+def test_mock_server_completions_and_stream(monkeypatch, make_message_list):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def _main():
+        async with MockOpenAIServer(
+            completion_tokens=3, tokens_per_second=100
+        ) as server:
+            endpoint = _endpoint(server.base_url)
+            responses, res = await endpoint.completions(make_message_list(), n=2)
+            chunks = [
+                chunk.choices[0].delta.content
+                async for chunk in endpoint.stream(make_message_list())
+            ]
+            return responses, res, chunks
+
+    responses, res, chunks = asyncio.run(_main())
+    assert [r[0].text for r in responses] == ["token token token"] * 2
+    assert res.usage.completion_tokens == 6
+    assert "".join(c for c in chunks if c) == "token token token"
+
+
+def test_run_load_reports_retries(monkeypatch, make_message_list):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def _main():
+        async with MockOpenAIServer(
+            latency=constant_latency(0.01), fault_429=0.3, fault_timeout=0.05, seed=0
+        ) as server:
+            endpoint = _endpoint(server.base_url)
+            report = await run_load(
+                endpoint, make_message_list(), qps=100, duration=0.5, seed=0, retry=4
+            )
+            return report, dict(server.outcomes)
+
+    report, outcomes = asyncio.run(_main())
+    assert report["sent"] == report["succeeded"] + report["failed"]
+    assert report["succeeded"] == outcomes["200"]
+    assert report["retries"]["429"] > 0
+    assert report["latency"]["p50"] <= report["latency"]["p99"]
+
+
+def test_parse_latency():
+    assert parse_latency("constant:0.2")(None) == 0.2
+    for spec in ["gamma:1", "uniform:a", "constant:1,2,3"]:
+        with pytest.raises(ValueError):
+            parse_latency(spec)
@@ -0,0 +1,271 @@
+import json
+
+import pytest
+
+from OpenAIChatHelper.message import (
+    DevSysUserMessage,
+    MessageList,
+    SubstitutionDict,
+    TextContent,
+)
+
+
+def _message_list():
+    message_list = MessageList()
+    message_list.add_message(
+        DevSysUserMessage("system", TextContent("You are a {persona}."))
+    )
+    message_list.add_message(DevSysUserMessage("user", TextContent("Example")))
+    message_list.add_message(DevSysUserMessage("user", TextContent("Review: {review}")))
+    return message_list
+
+
+def test_frozen_prefix_to_json():
+    message_list = _message_list()
+    substitution_dict = SubstitutionDict()
+    substitution_dict["persona"] = "critic"
+    substitution_dict["review"] = "Great food"
+
+    message_list.freeze_prefix(2, substitution_dict)
+    assert message_list.frozen_length == 2
+    tail = SubstitutionDict()
+    tail["review"] = "Great food"
+    # the prefix was substituted when it was frozen, the tail is substituted per call
+    assert json.loads(message_list.to_json(tail)) == message_list.to_dict(
+        substitution_dict
+    )
+
+    with pytest.raises(ValueError):
+        message_list.freeze_prefix(4)
+
+
+def test_frozen_prefix_to_dict_matches_to_json():
+    message_list = _message_list()
+    pirate = SubstitutionDict()
+    pirate["persona"] = "pirate"
+    message_list.freeze_prefix(1, pirate)
+
+    lawyer = SubstitutionDict()
+    lawyer["persona"] = "lawyer"
+    lawyer["review"] = "Fine"
+    messages = message_list.to_dict(lawyer)
+    assert messages == json.loads(message_list.to_json(lawyer))
+    assert messages[0]["content"][0]["text"] == "You are a pirate."
+    assert messages[2]["content"][0]["text"] == "Review: Fine"
+
+
+def test_frozen_prefix_is_dropped_on_change():
+    message_list = _message_list()
+    substitution_dict = SubstitutionDict()
+    substitution_dict["persona"] = "critic"
+    message_list.freeze_prefix(2, substitution_dict)
+
+    message_list.pop_message()
+    assert message_list.frozen_length == 2
+    message_list.pop_message()
+    assert message_list.frozen_length == 0
+
+    message_list.freeze_prefix(1, substitution_dict)
+    message_list.modify_message(0, DevSysUserMessage("system", TextContent("Hi")))
+    assert message_list.frozen_length == 0
+
+
+def test_analyze_prompt_cache(caplog):
+    message_list = MessageList()
+    message_list.add_message(
+        DevSysUserMessage("system", TextContent("Rules. " * 1000 + "Tone: {tone}"))
+    )
+    message_list.add_message(DevSysUserMessage("user", TextContent("{review}")))
+    report = message_list.analyze_prompt_cache()
+    assert report.first_substitution == (0, "tone")
+    assert report.cacheable
+    assert report.static_prefix_bytes < report.total_bytes
+
+    message_list.modify_message(
+        0, DevSysUserMessage("system", TextContent("{tone} " + "Rules. " * 1000))
+    )
+    report = message_list.analyze_prompt_cache()
+    assert report.first_substitution == (0, "tone")
+    assert not report.cacheable
+    assert "'tone'" in caplog.text
+
+    static = MessageList()
+    static.add_message(DevSysUserMessage("user", TextContent("Hello")))
+    report = static.analyze_prompt_cache()
+    assert report.first_substitution is None
+    assert report.static_prefix_bytes == report.total_bytes
+
+
+def test_template_key():
+    first, second = _message_list(), _message_list()
+    second.modify_message(2, DevSysUserMessage("user", TextContent("Other {review}")))
+    # the static prefix ends at the first substitution, in the system message
+    assert first.template_key() == second.template_key()
+    second.modify_message(0, DevSysUserMessage("system", TextContent("Be a {persona}")))
+    assert first.template_key() != second.template_key()
+
+
+def test_template_key_is_cached(monkeypatch):
+    message_list = MessageList()
+    message_list.add_message(DevSysUserMessage("system", TextContent("Be brief.")))
+    key = message_list.template_key()
+    calls = []
+    encode = message_list._static_prefix
+    monkeypatch.setattr(
+        message_list, "_static_prefix", lambda: calls.append(None) or encode()
+    )
+    message_list.freeze_prefix()
+    assert message_list.template_key() == key and not calls
+    # a message after a static prefix extends it
+    message_list.add_message(DevSysUserMessage("user", TextContent("Hi")))
+    assert message_list.template_key() != key and len(calls) == 1
+    message_list.pop_message()
+    assert message_list.template_key() == key and len(calls) == 2
+
+
+def test_extend_trusted_round_trip():
+    from OpenAIChatHelper.message import get_message_from_dict
+
+    stored = [
+        {"role": "system", "content": [{"type": "text", "text": "Be brief."}]},
+        {"role": "user", "content": "Hi", "name": "ann"},
+        {
+            "role": "assistant",
+            "content": [{"type": "text", "text": "Calling."}],
+            "tool_calls": [
+                {
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {"name": "f", "arguments": "[1]"},
+                }
+            ],
+        },
+        {
+            "role": "tool",
+            "content": [{"type": "text", "text": "42"}],
+            "tool_call_id": "call_1",
+        },
+    ]
+    message_list = MessageList()
+    message_list.extend_trusted(stored)
+    message_list.validate()
+    assert len(message_list) == 4
+    stored[1]["content"] = [{"type": "text", "text": "Hi"}]
+    assert message_list.to_dict() == stored
+    assert [get_message_from_dict(m).to_dict() for m in stored] == stored
+
+
+def test_validate_reports_invalid_trusted_message():
+    message_list = MessageList()
+    message_list.extend_trusted(
+        [
+            DevSysUserMessage("user", TextContent("Hi")),
+            {"role": "system", "content": [{"type": "refusal", "refusal": "No"}]},
+        ]
+    )
+    with pytest.raises(ValueError, match="Message 1"):
+        message_list.validate()
+    with pytest.raises(ValueError):
+        DevSysUserMessage("system", [TextContent("a"), TextContent("b")])
+
+
+def test_spilling_message_list(tmp_path):
+    from OpenAIChatHelper.message import (
+        AssistantMessage,
+        SpillingMessageList,
+        ToolCall,
+    )
+
+    path = str(tmp_path / "session.sqlite")
+    expected = MessageList()
+    with SpillingMessageList(path, hot_window=4) as message_list:
+        for i in range(20):
+            for target in (message_list, expected):
+                target.add_message(
+                    DevSysUserMessage(
+                        "user", TextContent(f"Question {{q}} {i} {{{{x}}}}")
+                    )
+                )
+                target.add_message(
+                    AssistantMessage(
+                        TextContent(f"Answer {i}"),
+                        tool_calls=[
+                            ToolCall(
+                                f"call_{i}",
+                                "function",
+                                {"name": "f", "arguments": "[1]"},
+                            )
+                        ],
+                    )
+                )
+        assert 0 < len(message_list) - message_list.spilled <= 5
+        assert len(message_list) == 40
+        substitution_dict = SubstitutionDict()
+        substitution_dict["q"] = "?"
+        assert message_list.to_dict(substitution_dict) == expected.to_dict(
+            substitution_dict
+        )
+        assert message_list.to_json(substitution_dict) == expected.to_json(
+            substitution_dict
+        )
+        assert message_list[3].to_dict() == expected[3].to_dict()
+        assert message_list[-1].to_dict() == expected[-1].to_dict()
+
+        message_list.modify_message(0, DevSysUserMessage("user", TextContent("First")))
+        assert message_list[0][0].text == "First"
+        popped = message_list.pop_messages(38)
+        assert popped[-1][0].text == "Question {q} 1 {{x}}"
+        message_list.add_message(DevSysUserMessage("user", TextContent("Last")))
+        assert len(message_list) == 3
+
+    # the log continues the session
+    with SpillingMessageList(path, hot_window=4) as message_list:
+        assert len(message_list) == 3
+        assert [message[0].text for message in message_list] == [
+            "First",
+            "Answer 0",
+            "Last",
+        ]
+
+
+def test_spilling_message_list_other_thread():
+    import threading
+
+    from OpenAIChatHelper.message import DevSysUserMessage, SpillingMessageList
+
+    with SpillingMessageList(hot_window=2) as message_list:
+        for i in range(10):
+            message_list.add_message(DevSysUserMessage("user", TextContent(f"{i}")))
+        assert message_list.spilled
+        results = []
+        thread = threading.Thread(target=lambda: results.append(message_list.to_dict()))
+        thread.start()
+        thread.join()
+        assert [message["content"][0]["text"] for message in results[0]] == [
+            str(i) for i in range(10)
+        ]
+
+
+def test_spilling_message_list_cleans_up_when_dropped(tmp_path):
+    import gc
+    import os
+
+    from OpenAIChatHelper.message import DevSysUserMessage, SpillingMessageList
+
+    message_list = SpillingMessageList(hot_window=2)
+    for i in range(10):
+        message_list.add_message(DevSysUserMessage("user", TextContent(f"{i}")))
+    path = message_list.path
+    assert os.path.exists(path)
+    del message_list
+    gc.collect()
+    assert not any(os.path.exists(path + suffix) for suffix in ("", "-wal", "-shm"))
+
+    # a persistent log is flushed instead
+    path = str(tmp_path / "session.sqlite")
+    message_list = SpillingMessageList(path, hot_window=4)
+    message_list.add_message(DevSysUserMessage("user", TextContent("Hi")))
+    del message_list
+    gc.collect()
+    with SpillingMessageList(path) as message_list:
+        assert message_list.spilled == 1
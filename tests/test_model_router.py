@@ -0,0 +1,119 @@
+import asyncio
+
+import openai
+import pytest
+
+from OpenAIChatHelper import ChatCompletionEndPoint
+from OpenAIChatHelper.traffic import ModelRouter
+
+
+def _status_error(status_code):
+    error = openai.APIStatusError.__new__(openai.APIStatusError)
+    error.status_code = status_code
+    return error
+
+
+def test_router_degrades_slow_and_failing_models():
+    router = ModelRouter(latency_slo=1.0, min_samples=2, probe_rate=0.0)
+    assert router.route(["a", "b", "c"]) == ["a", "b", "c"]
+    for _ in range(3):
+        router.record_success("a", 2.0)
+        router.record_success("b", 0.5)
+        router.record_failure("c", _status_error(503))
+    assert router.route(["a", "b", "c"]) == ["b", "a", "c"]
+    # client errors say nothing about the health of the model
+    for _ in range(10):
+        router.record_failure("b", _status_error(400))
+    assert router.stats()["b"]["error_rate"] == 0.0
+    with pytest.raises(ValueError):
+        ModelRouter(error_threshold=0)
+
+
+def test_circuit_opens_and_probes(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    router = ModelRouter(failure_threshold=2, open_duration=10.0)
+    router.record_failure("a", _status_error(429))
+    assert router.state("a") == "closed"
+    router.record_failure("a", _status_error(429))
+    assert router.state("a") == "open"
+    assert router.route(["a", "b"]) == ["b", "a"]
+
+    now[0] = 11.0
+    assert router.state("a") == "half_open"
+    # a single probe is let through
+    assert router.route(["a", "b"]) == ["a", "b"]
+    assert router.route(["a", "b"]) == ["b", "a"]
+    router.record_failure("a", _status_error(500))
+    assert router.state("a") == "open"
+
+    now[0] = 22.0
+    assert router.route(["a", "b"])[0] == "a"
+    router.record_success("a", 0.1)
+    assert router.state("a") == "closed"
+
+
+def _failing(models):
+    def respond(kwargs):
+        if kwargs["model"] in models:
+            raise _status_error(429)
+        return "Hi"
+
+    return respond
+
+
+def _models(completions):
+    return [call["model"] for call in completions.calls]
+
+
+def test_completions_fall_back(fake_completions, make_message_list):
+    router = ModelRouter(failure_threshold=2, probe_rate=0.0)
+    endpoint = ChatCompletionEndPoint(
+        "primary",
+        fallback_models=["backup"],
+        model_router=router,
+        backoff=lambda attempt: 10,
+    )
+    completions = fake_completions(endpoint, _failing({"primary"}))
+    message_list = make_message_list()
+
+    async def _main():
+        results = []
+        for _ in range(3):
+            results.append(await endpoint.completions(message_list, retry=2))
+        return results
+
+    results = asyncio.run(_main())
+    assert [res.model for _, res in results] == ["backup"] * 3
+    # the primary is skipped once its circuit is open, and no backoff was slept
+    assert _models(completions) == ["primary", "backup", "primary", "backup", "backup"]
+    assert router.state("primary") == "open"
+    assert endpoint.retry_counts["429"] == 2
+
+
+def test_client_errors_do_not_fall_back(
+    monkeypatch, fake_completions, make_message_list
+):
+    def bad_request(kwargs):
+        raise _status_error(400)
+
+    endpoint = ChatCompletionEndPoint(
+        "primary", fallback_models=["backup"], backoff=lambda attempt: 0
+    )
+    completions = fake_completions(endpoint, bad_request)
+    sleeps = []
+
+    async def _sleep(delay):
+        sleeps.append(delay)
+
+    message_list = make_message_list()
+
+    async def _main():
+        monkeypatch.setattr("asyncio.sleep", _sleep)
+        await endpoint.completions(message_list, retry=3)
+
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(_main())
+    # the bad request is retried with backoff on the same model, never on the fallback
+    assert _models(completions) == ["primary"] * 3
+    assert len(sleeps) == 2
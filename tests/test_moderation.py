@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from openai.types import Moderation
+
+from OpenAIChatHelper import ModerationEndPoint
+from OpenAIChatHelper.traffic import MicroBatcher
+
+
+def test_micro_batcher_flushes_on_size_and_time():
+    batches = []
+
+    async def process(items):
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch_size=3, max_wait=0.01)
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+        return batcher, results
+
+    batcher, results = asyncio.run(main())
+    assert results == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2], [3, 4]]
+    assert batcher.mean_batch_size == 2.5
+
+
+def test_micro_batcher_propagates_errors():
+    async def process(items):
+        raise RuntimeError("upstream error")
+
+    async def main():
+        batcher = MicroBatcher(process, max_wait=0)
+        await batcher.submit("item")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+
+
+def test_micro_batcher_survives_a_finished_loop():
+    async def process(items):
+        return items
+
+    async def submit(item):
+        return await batcher.submit(item)
+
+    batcher = MicroBatcher(process, max_wait=0.01)
+    # the first loop ends before its flush timer fires
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(submit(1), 0.001))
+    assert asyncio.run(asyncio.wait_for(submit(2), 1)) == 2
+
+
+class _FakeModerations:
+    def __init__(self):
+        self.requests = []
+
+    def create(self, input, model):
+        self.requests.append(input)
+
+        class _Response:
+            results = [
+                Moderation.model_construct(flagged="bad" in text) for text in input
+            ]
+
+        return _Response()
+
+
+class _FakeClient:
+    def __init__(self):
+        self.moderations = _FakeModerations()
+
+
+def test_moderation_endpoint_batches_concurrent_calls(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    endpoint = ModerationEndPoint(max_wait=0.01)
+    endpoint._client = _FakeClient()
+
+    async def main():
+        return await asyncio.gather(
+            *[endpoint.moderate(text) for text in ["good", "bad", "fine"]]
+        )
+
+    results = asyncio.run(main())
+    assert [result.flagged for result in results] == [False, True, False]
+    assert endpoint._client.moderations.requests == [["good", "bad", "fine"]]
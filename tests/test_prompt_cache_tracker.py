@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from OpenAIChatHelper import (
+    ChatCompletionEndPoint,
+    PromptCacheTracker,
+)
+
+
+def _usage(prompt_tokens, cached_tokens):
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": 1,
+        "total_tokens": prompt_tokens + 1,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+
+
+def test_tracker_stats():
+    tracker = PromptCacheTracker()
+    tracker.record("a", _usage(2000, 0), 1.0)
+    tracker.record("a", _usage(2000, 1536), 0.4)
+    tracker.record("a", _usage(2000, 1536), 0.6)
+    tracker.record("b", {"prompt_tokens": 10}, 0.2)
+
+    stats = tracker.stats("a")
+    assert stats["requests"] == 3
+    assert stats["hits"] == 2
+    assert stats["cached_tokens"] == 3072
+    assert stats["mean_hit_latency"] == pytest.approx(0.5)
+    assert stats["latency_saved"] == pytest.approx(1.0)
+    assert tracker.stats()["requests"] == 4
+    assert sorted(tracker.templates()) == ["a", "b"]
+    with pytest.raises(ValueError):
+        tracker.stats("c")
+
+
+def test_completions_record_cached_tokens(
+    fake_completions, completion, make_message_list
+):
+    tracker = PromptCacheTracker()
+    endpoint = ChatCompletionEndPoint("gpt-4o", prompt_cache_tracker=tracker)
+    completions = fake_completions(
+        endpoint,
+        lambda kwargs: completion(
+            usage=_usage(1200, 1024 if len(completions.calls) > 1 else 0)
+        ),
+    )
+    message_list = make_message_list()
+
+    async def _main():
+        await endpoint.completions(message_list)
+        await endpoint.completions(message_list, prompt_cache_key="greeting")
+
+    asyncio.run(_main())
+    assert tracker.stats(message_list.template_key())["hits"] == 0
+    assert tracker.stats("greeting")["hits"] == 1
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from OpenAIChatHelper import (
+    ChatCompletionEndPoint,
+    ChatCompletionView,
+)
+
+
+def _response(completion, n, seed):
+    return completion(
+        *[f"{seed}-{i}" for i in range(n)],
+        usage={
+            "prompt_tokens": 10,
+            "completion_tokens": n,
+            "total_tokens": 10 + n,
+            "prompt_tokens_details": {"cached_tokens": 4},
+        },
+    )
+
+
+def _splittable(completion, fail_seeds=()):
+    fail_seeds = set(fail_seeds)
+
+    def respond(kwargs):
+        if kwargs["seed"] in fail_seeds:
+            fail_seeds.remove(kwargs["seed"])
+            raise RuntimeError("server error")
+        return _response(completion, kwargs["n"], kwargs["seed"])
+
+    return respond
+
+
+def _sizes(completions):
+    return [(call["n"], call["seed"]) for call in completions.calls]
+
+
+def test_large_n_is_split_and_merged(fake_completions, completion, make_message_list):
+    endpoint = ChatCompletionEndPoint(
+        "gpt-4o", max_n_per_request=4, backoff=lambda attempt: 0
+    )
+    completions = fake_completions(endpoint, _splittable(completion, fail_seeds={11}))
+
+    responses, res = asyncio.run(
+        endpoint.completions(make_message_list(), n=10, seed=10, retry=2)
+    )
+
+    # only the failed sub-request is sent again
+    assert sorted(_sizes(completions)) == [(2, 12), (4, 10), (4, 11), (4, 11)]
+    assert [m.content[0].text for m in responses][3:6] == ["10-3", "11-0", "11-1"]
+    assert len(responses) == len(res.choices) == 10
+    assert [choice.index for choice in res.choices] == list(range(10))
+    assert res.usage.prompt_tokens == 30
+    assert res.usage.completion_tokens == 10
+    assert res.usage.prompt_tokens_details.cached_tokens == 12
+
+
+def test_small_n_is_not_split(fake_completions, completion, make_message_list):
+    endpoint = ChatCompletionEndPoint("gpt-4o", max_n_per_request=4)
+    completions = fake_completions(endpoint, _splittable(completion))
+
+    responses, _ = asyncio.run(endpoint.completions(make_message_list(), n=4, seed=1))
+    assert _sizes(completions) == [(4, 1)]
+    assert len(responses) == 4
+    with pytest.raises(ValueError):
+        ChatCompletionEndPoint("gpt-4o", max_n_per_request=0)
+
+
+def test_split_frozen_prefix_raw(monkeypatch, completion, make_message_list):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    endpoint = ChatCompletionEndPoint("gpt-4o", max_n_per_request=3)
+    bodies = []
+
+    async def _post_body(client, body, options):
+        request = json.loads(body)
+        bodies.append(request)
+        return json.dumps(_response(completion, request["n"], 0)).encode()
+
+    monkeypatch.setattr(endpoint, "_post_body", _post_body)
+    endpoint.get_async_client = lambda: None
+    message_list = make_message_list()
+    message_list.freeze_prefix()
+
+    responses, res = asyncio.run(endpoint.completions(message_list, n=5, raw=True))
+    assert sorted(body["n"] for body in bodies) == [2, 3]
+    assert all(body["messages"] == message_list.to_dict() for body in bodies)
+    assert isinstance(res, ChatCompletionView)
+    assert len(responses) == len(res.choices) == 5
+    assert res.usage.total_tokens == 25
+
+
+def test_frozen_prefix_applies_sdk_options(monkeypatch, completion, make_message_list):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    endpoint = ChatCompletionEndPoint("gpt-4o")
+    posts = []
+
+    class _Client:
+        async def post(self, path, *, cast_to, content, options):
+            posts.append((json.loads(content), options))
+            return json.dumps(_response(completion, 1, 0)).encode()
+
+    endpoint.get_async_client = lambda: _Client()
+    message_list = make_message_list()
+    message_list.freeze_prefix()
+
+    responses, res = asyncio.run(
+        endpoint.completions(
+            message_list,
+            extra_headers={"X-Trace": "1"},
+            extra_query={"debug": "true"},
+            extra_body={"metadata": {"run": "a"}},
+        )
+    )
+    body, options = posts[0]
+    assert "extra_headers" not in body and "extra_body" not in body
+    assert body["metadata"] == {"run": "a"}
+    assert options == {"headers": {"X-Trace": "1"}, "params": {"debug": "true"}}
+    assert isinstance(res, ChatCompletion) and responses[0][0].text == "0-0"
@@ -0,0 +1,74 @@
+import asyncio
+
+from openai.types.chat import ChatCompletion
+
+from OpenAIChatHelper import (
+    AssistantMessage,
+    ChatCompletionEndPoint,
+    ChatCompletionView,
+)
+from OpenAIChatHelper.message import get_assistant_message_from_dict
+
+RESPONSE = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o",
+    "choices": [
+        {
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": "Positive"},
+        },
+        {
+            "index": 1,
+            "finish_reason": "tool_calls",
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": "call_1",
+                        "type": "function",
+                        "function": {"name": "lookup", "arguments": "{}"},
+                    }
+                ],
+            },
+        },
+    ],
+    "usage": {
+        "prompt_tokens": 10,
+        "completion_tokens": 2,
+        "total_tokens": 12,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    },
+}
+
+
+def test_chat_completion_view():
+    view = ChatCompletionView(RESPONSE)
+    assert view.id == "chatcmpl-1"
+    assert view.usage.total_tokens == 12
+    assert view.usage.prompt_tokens_details.cached_tokens == 0
+    assert view.usage.completion_tokens_details is None
+    completion = view.to_chat_completion()
+    assert isinstance(completion, ChatCompletion)
+    assert view.to_chat_completion() is completion
+    # unknown attributes fall back to the full model
+    assert view.object == "chat.completion"
+
+
+def test_get_assistant_message_from_dict():
+    message = get_assistant_message_from_dict(RESPONSE["choices"][1]["message"])
+    assert isinstance(message, AssistantMessage)
+    assert message.content is None
+    assert "lookup" in repr(message)
+
+
+def test_raw_completions(fake_completions, make_message_list):
+    endpoint = ChatCompletionEndPoint("gpt-4o")
+    fake_completions(endpoint, lambda kwargs: RESPONSE)
+    responses, res = asyncio.run(endpoint.completions(make_message_list(), raw=True))
+    assert isinstance(res, ChatCompletionView)
+    assert len(responses) == 2
+    assert responses[0][0].text == "Positive"
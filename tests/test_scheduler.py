@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from OpenAIChatHelper.traffic import RequestScheduler
+
+
+def test_scheduler_prefers_weighted_lane():
+    scheduler = RequestScheduler({"interactive": 4, "batch": 1}, max_concurrency=1)
+    order = []
+
+    async def call(name):
+        order.append(name)
+        await asyncio.sleep(0)
+
+    async def main():
+        # hold the only slot so that everything below is queued
+        await scheduler.acquire()
+        tasks = [
+            asyncio.ensure_future(scheduler.run(lambda: call("batch"), lane="batch"))
+            for _ in range(5)
+        ] + [
+            asyncio.ensure_future(
+                scheduler.run(lambda: call("interactive"), lane="interactive")
+            )
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    # interactive requests are served four times as often as batch requests
+    assert order[:5].count("interactive") >= 4
+
+
+def test_scheduler_is_fair_across_tenants():
+    scheduler = RequestScheduler({"batch": 1}, max_concurrency=1)
+    order = []
+
+    async def call(name):
+        order.append(name)
+
+    async def main():
+        await scheduler.acquire()
+        tasks = [
+            asyncio.ensure_future(scheduler.run(lambda: call("a"), tenant="a"))
+            for _ in range(3)
+        ] + [
+            asyncio.ensure_future(scheduler.run(lambda: call("b"), tenant="b"))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["a", "b", "a", "b", "a", "b"]
+
+
+def test_scheduler_drops_expired_requests():
+    scheduler = RequestScheduler(max_concurrency=1)
+
+    async def main():
+        await scheduler.acquire()
+        with pytest.raises(TimeoutError):
+            await scheduler.acquire(deadline=time.monotonic() + 0.01)
+        scheduler.release()
+
+    asyncio.run(main())
+    assert scheduler.dropped == 1
+    assert scheduler.in_flight == 0
+
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.acquire(lane="unknown"))
+
+
+def test_scheduler_follows_the_concurrency_limiter(fake_completions, make_message_list):
+    from OpenAIChatHelper import ChatCompletionEndPoint
+    from OpenAIChatHelper.traffic import AdaptiveConcurrencyLimiter
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    scheduler = RequestScheduler(max_concurrency=4)
+    endpoint = ChatCompletionEndPoint(
+        "gpt-4o", concurrency_limiter=limiter, scheduler=scheduler
+    )
+    completions = fake_completions(endpoint, delay=0.01)
+
+    async def main():
+        batch = [
+            asyncio.ensure_future(
+                endpoint.completions(make_message_list(f"batch {i}"), lane="batch")
+            )
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        await endpoint.completions(make_message_list("interactive"))
+        await asyncio.gather(*batch)
+
+    asyncio.run(main())
+    sent = [call["messages"][0]["content"][0]["text"] for call in completions.calls]
+    # the limiter's limit of 1 applies in the scheduler, whose lanes decide the order
+    assert sent[:2] == ["batch 0", "interactive"]
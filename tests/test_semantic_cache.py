@@ -0,0 +1,141 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from OpenAIChatHelper import AssistantMessage, TextContent
+from OpenAIChatHelper.vector import SemanticCache
+
+
+class _FakeEmbeddingEndPoint:
+    """Embeds a text as the bag of its lowercase words over a tiny vocabulary."""
+
+    vocabulary = ["how", "do", "i", "reset", "my", "password", "change", "email"]
+
+    async def embeddings(self, texts, model=None):
+        return np.array(
+            [
+                [text.lower().split().count(word) for word in self.vocabulary]
+                for text in texts
+            ],
+            dtype=np.float32,
+        )
+
+
+def _request(question, system="You are helpful."):
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": [{"type": "text", "text": system}]},
+            {"role": "user", "content": [{"type": "text", "text": question}]},
+        ],
+        "store": False,
+    }
+
+
+def test_semantic_cache_hits_similar_requests():
+    cache = SemanticCache(_FakeEmbeddingEndPoint(), threshold=0.9)
+    answer = [AssistantMessage(TextContent("Click 'forgot password'."))]
+
+    async def main():
+        cached, key = await cache.lookup(_request("How do I reset my password"))
+        assert cached is None
+        cache.add(key, answer, "response")
+        cached, _ = await cache.lookup(_request("how do i reset my password ?"))
+        assert cached is not None and cached[1] == "response"
+        assert cached[0][0][0].text == "Click 'forgot password'."
+        # a different system prompt never shares entries
+        cached, _ = await cache.lookup(
+            _request("How do I reset my password", system="Be brief.")
+        )
+        assert cached is None
+        cached, _ = await cache.lookup(_request("How do I change my email"))
+        assert cached is None
+
+    asyncio.run(main())
+    assert cache.hits == 1 and cache.misses == 3
+    assert cache.hit_rate == pytest.approx(0.25)
+
+
+def test_semantic_cache_eviction_and_ttl():
+    cache = SemanticCache(_FakeEmbeddingEndPoint(), max_entries=1, ttl=0.01)
+    answer = [AssistantMessage(TextContent("answer"))]
+
+    async def main():
+        for question in ["reset password", "change email"]:
+            _, key = await cache.lookup(_request(question))
+            cache.add(key, answer, None)
+        assert len(cache) == 1 and cache.evictions == 1
+        await asyncio.sleep(0.02)
+        cached, _ = await cache.lookup(_request("change email"))
+        assert cached is None
+
+    asyncio.run(main())
+    assert cache.expirations == 1
+    assert len(cache) == 0
+
+
+def _conversation(*turns):
+    request = _request(turns[-1])
+    system, last = request["messages"]
+    request["messages"] = [system] + [
+        {
+            "role": "user" if index % 2 == 0 else "assistant",
+            "content": [{"type": "text", "text": text}],
+        }
+        for index, text in enumerate(turns[:-1])
+    ]
+    request["messages"].append(last)
+    return request
+
+
+@pytest.mark.parametrize("match_history", [True, False])
+def test_semantic_cache_history(match_history):
+    cache = SemanticCache(_FakeEmbeddingEndPoint(), match_history=match_history)
+    answer = [AssistantMessage(TextContent("Done."))]
+
+    async def main():
+        _, key = await cache.lookup(
+            _conversation("reset my password", "Sure?", "do it")
+        )
+        cache.add(key, answer, None)
+        cached, _ = await cache.lookup(
+            _conversation("change my email", "Sure?", "do it")
+        )
+        return cached
+
+    cached = asyncio.run(main())
+    # the same last reply in another conversation only hits when history is ignored
+    assert (cached is None) == match_history
+
+
+class _FailingEmbeddingEndPoint:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    async def embeddings(self, texts, model=None):
+        await asyncio.sleep(self.delay)
+        raise RuntimeError("embedding outage")
+
+
+@pytest.mark.parametrize("delay", [0.0, 10.0])
+def test_semantic_cache_failures_are_misses(fake_completions, make_message_list, delay):
+    import time
+
+    from OpenAIChatHelper import ChatCompletionEndPoint
+
+    endpoint = ChatCompletionEndPoint(
+        "gpt-4o", semantic_cache=SemanticCache(_FailingEmbeddingEndPoint(delay))
+    )
+    fake_completions(endpoint)
+    message_list = make_message_list()
+
+    start = time.perf_counter()
+    if delay:
+        # a slow lookup is bounded by the time budget of the call
+        with pytest.raises(TimeoutError):
+            asyncio.run(endpoint.completions(message_list, timeout=0.2))
+    else:
+        responses, _ = asyncio.run(endpoint.completions(message_list, timeout=0.2))
+        assert responses[0][0].text == "Hi"
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,104 @@
+import asyncio
+
+from OpenAIChatHelper.traffic import SingleFlight, canonical_key
+
+
+def test_canonical_key():
+    assert canonical_key({"a": 1, "b": [1, 2]}) == canonical_key({"b": [1, 2], "a": 1})
+    assert canonical_key({"a": 1}) != canonical_key({"a": 2})
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    group = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return ["result"]
+
+    async def main():
+        return await asyncio.gather(*[group.do("key", fn) for _ in range(5)])
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(result == ["result"] and shared for result, shared in results)
+    assert len(group) == 0
+
+
+def test_single_flight_cancels_when_all_waiters_cancel():
+    group = SingleFlight()
+    cancelled = []
+
+    async def fn():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(None)
+            raise
+
+    async def main():
+        task = asyncio.ensure_future(group.do("key", fn))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert cancelled
+
+
+def test_endpoint_coalesces_only_matching_deterministic_calls(
+    fake_completions, make_message_list
+):
+    from OpenAIChatHelper import ChatCompletionEndPoint
+
+    endpoint = ChatCompletionEndPoint("gpt-4o", single_flight=True)
+    completions = fake_completions(endpoint, delay=0.01)
+    message_list = make_message_list()
+
+    def count_calls(*kwargs_list):
+        completions.calls.clear()
+
+        async def main():
+            await asyncio.gather(
+                *[endpoint.completions(message_list, **kw) for kw in kwargs_list]
+            )
+
+        asyncio.run(main())
+        return len(completions.calls)
+
+    assert count_calls({"temperature": 0}, {"temperature": 0}) == 1
+    assert count_calls({"seed": 1}, {"seed": 1}) == 1
+    # a different policy or budget is not shared
+    assert count_calls({"temperature": 0}, {"temperature": 0, "lane": "batch"}) == 2
+    assert count_calls({"temperature": 0}, {"temperature": 0, "retry": 1}) == 2
+    # callers wait until their own deadline
+    assert count_calls({"temperature": 0, "timeout": 5}, {"temperature": 0}) == 1
+    assert (
+        count_calls({"temperature": 0, "timeout": 5}, {"temperature": 0, "timeout": 5})
+        == 1
+    )
+    # sampled requests get their own samples unless the caller opts in
+    assert count_calls({}, {}) == 2
+    assert count_calls({"coalesce_sampled": True}, {"coalesce_sampled": True}) == 1
+
+
+def test_joiner_outlives_a_shorter_shared_deadline(fake_completions, make_message_list):
+    from OpenAIChatHelper import ChatCompletionEndPoint, DeadlineExceeded
+
+    endpoint = ChatCompletionEndPoint("gpt-4o", single_flight=True)
+    completions = fake_completions(endpoint, delay=0.05)
+    message_list = make_message_list()
+
+    async def main():
+        return await asyncio.gather(
+            endpoint.completions(message_list, temperature=0, timeout=0.01),
+            endpoint.completions(message_list, temperature=0, timeout=5),
+            return_exceptions=True,
+        )
+
+    short, long = asyncio.run(main())
+    assert isinstance(short, DeadlineExceeded)
+    # the caller with time left sent its own request
+    assert long[0][0].content[0].text == "Hi"
+    assert len(completions.calls) == 2
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import random
+
+import pytest
+from openai.types.chat import ChatCompletionChunk
+
+from OpenAIChatHelper import (
+    ChatCompletionEndPoint,
+    IncrementalJsonParser,
+)
+
+DOCUMENT = {
+    "results": [
+        {"name": 'quote " and \\ backslash', "score": -1.5e3, "tags": [None, True]},
+        {"name": "ü😀", "score": 0, "tags": []},
+    ],
+    "total": 2,
+}
+
+
+def test_parser_reports_closed_values():
+    text = json.dumps(DOCUMENT)
+    random.seed(0)
+    for _ in range(50):
+        parser = IncrementalJsonParser()
+        events = []
+        position = 0
+        while position < len(text):
+            size = random.randint(1, 6)
+            events += parser.feed(text[position : position + size])
+            position += size
+        events += parser.close()
+        assert parser.value == DOCUMENT
+        assert events == [
+            (("results", 0), DOCUMENT["results"][0]),
+            (("results", 1), DOCUMENT["results"][1]),
+            (("results",), DOCUMENT["results"]),
+            (("total",), 2),
+            ((), DOCUMENT),
+        ]
+
+
+def test_parser_waits_for_split_tokens():
+    parser = IncrementalJsonParser(max_depth=1)
+    assert parser.feed('[12, "ab') == [((0,), 12)]
+    assert parser.feed('c", 3') == [((1,), "abc")]
+    assert parser.feed(".5, tr") == [((2,), 3.5)]
+    assert parser.feed("ue]") == [((3,), True), ((), [12, "abc", 3.5, True])]
+
+
+@pytest.mark.parametrize("text", ['{"a": 1,}', "[1 2]", "[01]", "[1]x", "[1", "nul"])
+def test_parser_rejects_invalid_json(text):
+    parser = IncrementalJsonParser()
+    with pytest.raises(ValueError):
+        parser.feed(text)
+        parser.close()
+
+
+def _chunk(content=None, finish_reason=None):
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chatcmpl-1",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-4o",
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"content": content},
+                    "finish_reason": finish_reason,
+                }
+            ],
+        }
+    )
+
+
+class _FakeStream:
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeAsyncClient:
+    def __init__(self, text, finish_reason="stop"):
+        self.chat = self
+        self.completions = self
+        self.text = text
+        self.finish_reason = finish_reason
+        self.streams = []
+
+    async def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        chunks = [_chunk(self.text[i : i + 5]) for i in range(0, len(self.text), 5)] + [
+            _chunk(finish_reason=self.finish_reason)
+        ]
+        self.streams.append(_FakeStream(chunks))
+        return self.streams[-1]
+
+
+def _endpoint(monkeypatch, client):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    endpoint = ChatCompletionEndPoint("gpt-4o")
+    endpoint.get_async_client = lambda: client
+    return endpoint
+
+
+def test_stream_structured(monkeypatch, make_message_list):
+    client = _FakeAsyncClient(json.dumps(DOCUMENT))
+    endpoint = _endpoint(monkeypatch, client)
+
+    async def _collect():
+        return [
+            event
+            async for event in endpoint.stream_structured(
+                make_message_list("List results"),
+                response_format={"type": "json_object"},
+            )
+        ]
+
+    events = asyncio.run(_collect())
+    assert events[0] == (("results", 0), DOCUMENT["results"][0])
+    assert events[-1] == ((), DOCUMENT)
+    assert client.streams[0].closed
+
+
+def test_stream_structured_cut_off(monkeypatch, make_message_list):
+    client = _FakeAsyncClient(json.dumps(DOCUMENT)[:40], finish_reason="length")
+    endpoint = _endpoint(monkeypatch, client)
+
+    async def _collect():
+        return [
+            event
+            async for event in endpoint.stream_structured(
+                make_message_list("List results")
+            )
+        ]
+
+    with pytest.raises(ValueError):
+        asyncio.run(_collect())
+
+
+def test_stream_ordered_list(monkeypatch, make_message_list):
+    client = _FakeAsyncClient("Sure:\n\n1. **alpha**\n2. beta\n\nAnything else?")
+    endpoint = _endpoint(monkeypatch, client)
+
+    async def _collect():
+        return [
+            item
+            async for item in endpoint.stream_ordered_list(
+                make_message_list("List results")
+            )
+        ]
+
+    assert asyncio.run(_collect()) == ["alpha\n", "beta\n"]
+    assert client.streams[0].closed
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_dumps_non_string_keys(monkeypatch, use_orjson):
+    from OpenAIChatHelper.utils import Json
+
+    if not use_orjson:
+        monkeypatch.setattr(Json, "orjson", None)
+    assert Json.json_dumps({"logit_bias": {50256: -100}}) == (
+        b'{"logit_bias":{"50256":-100}}'
+    )
@@ -1,6 +1,10 @@
 import pytest
 
-from OpenAIChatHelper.utils import remove_markdown, split_ordered_list
+from OpenAIChatHelper.utils import (
+    OrderedListExtractor,
+    remove_markdown,
+    split_ordered_list,
+)
 
 
 def test_remove_markdown_default():
@@ -31,3 +35,47 @@ def test_split_markdown_ordered_list():
     assert splitted_list[0] == "item 1\n\n1. item 1.1\n1. item 1.2\n"
     assert splitted_list[1] == "item 2\n"
     assert splitted_list[2] == "item 3\n"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "1. **item 1**\n    1. *item 1.1*\n    2. item 1.2\n2. ***item 2***\n3. item 3",
+        "Ideas:\n\n1. First\n   more\n2. Second\n\n   para\n3. Third\n\nDone.\n4. no",
+        "Intro\n2. not a list\n\n1. a\n2. b\nlazy\n- bullet\n3. c",
+        "1) a\n2) b\n1. other list",
+        "no list here",
+        # code blocks
+        "Example:\n\n```\n1. not an item\n2. no\n```\n\n1. real\n2. real2\n",
+        "~~~\n1. a\n~~~~\n\n```\n2. b\n```\n7) c\n8) d\n9. e\n",
+        "    1. code\n\n2. a\n3. b\n",
+        "- a\n\n      code\n  2. x\n",
+        # lists nested in bullet lists
+        "- a\n  1. x\n  2. y\n- b\n\n1. top\n",
+        "- a\n\n  3. x\n  4. y\n\n1. top\n",
+        "- 1. inner\n  2. inner2\n",
+        "* a\n    1. deep\n    2. deeper\n",
+        "- a\n  1. x\n\n     more x\n  2. y\nlazy\n- b\n",
+        "- a\n3. x\n\n1. y\n",
+        # lists not starting at 1
+        "# Title\n3. x\n4. y\n",
+        "# H\n\n3) x\n---\n1. z\n",
+        "para\n===\n4. x\n",
+    ],
+)
+def test_ordered_list_extractor_matches_split(text):
+    extractor = OrderedListExtractor()
+    items = []
+    for start in range(0, len(text), 3):
+        items += extractor.feed(text[start : start + 3])
+    items += extractor.close()
+    assert items == split_ordered_list(text)
+
+
+def test_ordered_list_extractor_yields_early():
+    extractor = OrderedListExtractor()
+    assert extractor.feed("1. first\n2") == []
+    assert extractor.feed(". sec") == ["first\n"]
+    assert extractor.feed("ond\n\nOutro\n") == ["second\n"]
+    assert extractor.done
+    assert extractor.close() == []
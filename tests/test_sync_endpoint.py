@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from OpenAIChatHelper import (
+    BackgroundLoop,
+    DeadlineExceeded,
+    SubstitutionDict,
+    SyncChatCompletionEndPoint,
+)
+
+
+@pytest.fixture
+def endpoint(fake_completions):
+    loop = BackgroundLoop(max_workers=16, name="test-loop")
+    endpoint = SyncChatCompletionEndPoint("gpt-4o", background_loop=loop)
+    threads = set()
+
+    def echo(kwargs):
+        threads.add(threading.current_thread().name)
+        if kwargs.get("temperature") == 0.0:
+            raise RuntimeError("bad request")
+        return kwargs["messages"][0]["content"][0]["text"]
+
+    fake_completions(endpoint, echo, delay=0.05).threads = threads
+    yield endpoint
+    loop.close()
+
+
+def _substitution(word):
+    substitution_dict = SubstitutionDict()
+    substitution_dict["word"] = word
+    return substitution_dict
+
+
+def test_completions_sync_from_threads(endpoint, make_message_list):
+    results = {}
+
+    def _call(word):
+        responses, _ = endpoint.completions_sync(
+            make_message_list("Say {word}"), _substitution(word)
+        )
+        results[word] = responses[0][0].text
+
+    threads = [threading.Thread(target=_call, args=(str(i),)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {str(i): f"Say {i}" for i in range(8)}
+    # every request is sent from the loop thread, none blocks an executor thread
+    assert endpoint.get_async_client().chat.completions.threads == {"test-loop"}
+
+
+def test_completions_batch(endpoint, make_message_list):
+    message_lists = [make_message_list("Say {word}") for _ in range(16)]
+    start = time.perf_counter()
+    results = endpoint.completions_batch(
+        message_lists, [_substitution(str(i)) for i in range(16)], retry=1
+    )
+    # the requests ran concurrently
+    assert time.perf_counter() - start < 0.5
+    assert [responses[0][0].text for responses, _ in results] == [
+        f"Say {i}" for i in range(16)
+    ]
+
+    results = endpoint.completions_batch(
+        message_lists[:2],
+        [_substitution("a"), _substitution("b")],
+        return_exceptions=True,
+        retry=1,
+        temperature=0.0,
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(ValueError):
+        endpoint.completions_batch(message_lists, [None])
+
+
+def test_completions_sync_timeout(endpoint, make_message_list):
+    completions = endpoint.get_async_client().chat.completions
+    with pytest.raises(DeadlineExceeded):
+        endpoint.completions_sync(
+            make_message_list("Say {word}"), _substitution("slow"), timeout=0.01
+        )
+    # the timeout is the deadline of the call and so the HTTP timeout
+    assert 0 < completions.calls[-1]["timeout"] <= 0.01
+
+    results = endpoint.completions_batch(
+        [make_message_list("Say {word}"), make_message_list("Say {word}")],
+        [_substitution("a"), _substitution("b")],
+        timeout=0.01,
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, DeadlineExceeded) for result in results)
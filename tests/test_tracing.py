@@ -0,0 +1,129 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from OpenAIChatHelper import (
+    NOOP_SPAN,
+    ChatCompletionEndPoint,
+    CProfileHook,
+    JsonlSink,
+    RingBufferSink,
+    SamplingProfiler,
+    Tracer,
+    current_span,
+)
+
+
+def test_completions_spans(fake_completions, make_message_list):
+    sink = RingBufferSink()
+    endpoint = ChatCompletionEndPoint(
+        "gpt-4o", tracer=Tracer([sink]), backoff=lambda attempt: 0
+    )
+    fake_completions(endpoint, failures=1)
+
+    asyncio.run(endpoint.completions(make_message_list(), retry=2))
+
+    spans = {span.name: span for span in sink.spans()}
+    assert set(spans) == {
+        "completions",
+        "substitute",
+        "attempt",
+        "network",
+        "retry_sleep",
+        "parse",
+    }
+    root = spans["completions"]
+    assert root.parent_id is None and root.attributes == {"model": "gpt-4o"}
+    assert all(span.trace_id == root.trace_id for span in sink.spans())
+    attempts = sink.spans("attempt")
+    assert [span.attributes["attempt"] for span in attempts] == [1, 2]
+    assert attempts[0].attributes["error"] == "RuntimeError"
+    assert spans["network"].parent_id == attempts[1].span_id
+    assert spans["retry_sleep"].attributes["error"] == "RuntimeError"
+    assert sink.summary()["attempt"]["count"] == 2
+    assert current_span() is None
+
+
+def test_frozen_prefix_is_encoded_in_a_span(monkeypatch, make_message_list):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    sink = RingBufferSink()
+    endpoint = ChatCompletionEndPoint("gpt-4o", tracer=Tracer([sink]))
+    message_list = make_message_list()
+    message_list.freeze_prefix()
+    monkeypatch.setattr(endpoint, "_request_with_retry", _no_request)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(endpoint.completions(message_list))
+    assert [span.name for span in sink.spans()] == [
+        "substitute",
+        "encode",
+        "completions",
+    ]
+    assert sink.spans("completions")[0].attributes["error"] == "RuntimeError"
+
+
+async def _no_request(*args, **kwargs):
+    raise RuntimeError("not sent")
+
+
+def test_disabled_tracer():
+    sink = RingBufferSink()
+    tracer = Tracer([sink])
+    tracer.enabled = False
+    assert tracer.span("completions") is NOOP_SPAN
+    with tracer.span("completions") as span:
+        span.set_attribute("model", "gpt-4o")
+    tracer.record("network", 0.0, 1.0)
+    assert sink.spans() == []
+
+
+def test_jsonl_sink(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer([JsonlSink(str(path))])
+    with tracer.span("completions", model="gpt-4o"):
+        with tracer.span("parse"):
+            pass
+    tracer.close()
+    parse, completions = [json.loads(line) for line in path.read_text().splitlines()]
+    assert parse["parent_id"] == completions["span_id"]
+    assert completions["attributes"] == {"model": "gpt-4o"}
+    assert completions["duration"] >= parse["duration"] >= 0
+
+
+def test_failing_sink_does_not_break_requests():
+    class _Broken:
+        def export(self, span):
+            raise OSError("disk full")
+
+    sink = RingBufferSink()
+    tracer = Tracer([_Broken(), sink])
+    with tracer.span("completions"):
+        pass
+    assert len(sink.spans()) == 1
+
+
+def test_cprofile_hook():
+    hook = CProfileHook(sample_rate=1.0)
+    tracer = Tracer(profiler=hook)
+    for _ in range(2):
+        with tracer.span("completions"):
+            sum(range(1000))
+    assert hook.profiled == 2
+    assert "ncalls" in hook.print_stats(5)
+    with pytest.raises(ValueError):
+        CProfileHook(sample_rate=2)
+
+
+def test_sampling_profiler():
+    def _busy():
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+
+    with SamplingProfiler(interval=0.001) as profiler:
+        _busy()
+    assert profiler.samples > 0
+    assert any(name.startswith("_busy ") for name, _ in profiler.top(1000))
+    assert "_busy" in profiler.collapsed()
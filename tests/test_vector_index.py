@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from OpenAIChatHelper.vector import VectorIndex
+
+
+def _brute_force(vectors, queries, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+
+
+def test_exact_search_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(1000, 16)).astype(np.float32)
+    queries = rng.normal(size=(5, 16)).astype(np.float32)
+    index = VectorIndex(16, block_size=128)
+    index.add(vectors[:600])
+    index.add(vectors[600:])
+    scores, ids = index.search(queries, k=5)
+    assert ids.tolist() == _brute_force(vectors, queries, 5).tolist()
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+def test_search_pads_missing_results():
+    index = VectorIndex(2)
+    index.add(np.array([[1.0, 0.0]]), ids=np.array([42]))
+    scores, ids = index.search(np.array([1.0, 0.0]), k=3)
+    assert ids.tolist() == [[42, -1, -1]]
+    assert scores[0, 0] == pytest.approx(1.0)
+    assert np.isneginf(scores[0, 1:]).all()
+
+    # an empty index returns padding only
+    scores, ids = VectorIndex(2).search(np.array([[1.0, 0.0], [0.0, 1.0]]), k=2)
+    assert ids.tolist() == [[-1, -1], [-1, -1]]
+    assert np.isneginf(scores).all()
+
+
+def test_ivf_search_and_save_load(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(2000, 8)).astype(np.float32)
+    index = VectorIndex(8)
+    index.add(vectors)
+    index.train(n_lists=16)
+    # inserts after training are assigned to a cluster
+    new_ids = index.add(vectors[:10] * 2)
+    _, ids = index.search(vectors[:10], k=2, n_probe=16)
+    assert set(ids[:, :2].ravel()) == set(range(10)) | set(new_ids)
+
+    index.save(str(tmp_path))
+    loaded = VectorIndex.load(str(tmp_path), mmap=True)
+    assert len(loaded) == len(index) and loaded.is_trained
+    assert (
+        loaded.search(vectors[:3], k=4, n_probe=4)[1].tolist()
+        == index.search(vectors[:3], k=4, n_probe=4)[1].tolist()
+    )
+    loaded.add(vectors[:1])
+    assert len(loaded) == len(index) + 1
+
+    with pytest.raises(ValueError):
+        VectorIndex(8).search(vectors[:1], n_probe=1)